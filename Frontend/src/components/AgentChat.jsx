@@ -2,6 +2,17 @@ import React, { useState, useEffect, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import MarkdownRenderer from './MarkdownRenderer';
 
+const HISTORY_PAGE_SIZE = 50;
+// Response keys the chat reads from /v1/messages/ and /v1/resume/
+const RESPONSE_FIELDS = 'interrupt,preview,result';
+// Seconds each job status request waits for the run to finish
+const JOB_POLL_WAIT = 25;
+// Extra attempts at submitting a run after a network error; the same
+// Idempotency-Key makes a retry return the first submission's job
+const SUBMIT_RETRIES = 2;
+// thread id -> { etag, page } of the newest history page, revalidated with If-None-Match
+const historyCache = new Map();
+
 export default function AgentChat({setLoggedIn}) {
   const [query, setQuery] = useState('');
   const [messages, setMessages] = useState([]);
@@ -9,6 +20,7 @@ export default function AgentChat({setLoggedIn}) {
   const [threadId, setThreadId] = useState(null);
   const [waitingForFeedback, setWaitingForFeedback] = useState(false);
   const [feedbackMessage, setFeedbackMessage] = useState('');
+  const [historyCursor, setHistoryCursor] = useState({ firstIndex: 0, hasMoreBefore: false });
   const chatBoxRef = useRef(null);
   const { id } = useParams();
   const navigate = useNavigate();
@@ -29,37 +41,60 @@ export default function AgentChat({setLoggedIn}) {
     if (!id) {
       setMessages([]);
       setThreadId(null);
+      setHistoryCursor({ firstIndex: 0, hasMoreBefore: false });
     }
   }, [id])
 
+  const normalizeHistory = (history) => history
+    .map((item) => ({
+      type: item?.type || (item?.role === 'user' ? 'HumanMessage' : 'AIMessage'),
+      content: String(item?.content ?? '')
+    }))
+    .filter((m) => m.type !== 'AIMessage' || m.content.trim() !== '');
+
+  // One page of history; `before` pages back from a message index.
+  const fetchHistory = async (threadId, before) => {
+    const params = new URLSearchParams({ limit: String(HISTORY_PAGE_SIZE) });
+    if (before !== undefined) params.set('before', String(before));
+    const cached = before === undefined ? historyCache.get(threadId) : null;
+    const res = await fetch(`http://127.0.0.1:8000/v1/threads/${threadId}/history/?${params}`, {
+      method : "GET",
+      headers: {
+        'Content-Type': 'application/json',
+        "Authorization": `Token ${Token}`,
+        ...(cached ? { 'If-None-Match': cached.etag } : {}),
+      },
+    });
+    if (res.status === 304 && cached) return cached.page;
+    if (!res.ok) throw new Error('Failed to fetch data');
+
+    const response = await res.json();
+    const history = Array.isArray(response?.history) ? response.history : [];
+    const page = {
+      messages: normalizeHistory(history),
+      firstIndex: history.length ? history[0].index : 0,
+      hasMoreBefore: Boolean(response?.has_more_before),
+    };
+    const etag = res.headers.get('ETag');
+    if (before === undefined && etag) historyCache.set(threadId, { etag, page });
+    return page;
+  };
+
   useEffect(()=>{
     if (!id) return;
     setThreadId(id)
-    const fetchData = async ()=>{
-      console.log("ID IN FUNCTION -", id)
-      const res = await fetch(`http://127.0.0.1:8000/v1/threads/${id}/history/`, {
-        method : "GET",
-        headers: { 
-          'Content-Type': 'application/json',
-          "Authorization": `Token ${Token}`,
-        },
-      });
-      if (!res.ok) throw new Error('Failed to fetch data');
-
-      const response = await res.json();
-      console.log(response)
-      const history = Array.isArray(response?.history) ? response.history : [];
-      const normalized = history
-        .map((item) => ({
-          type: item?.type || (item?.role === 'user' ? 'HumanMessage' : 'AIMessage'),
-          content: String(item?.content ?? '')
-        }))
-        .filter((m) => m.type !== 'AIMessage' || m.content.trim() !== '');
-      setMessages(normalized)
-    }
-    fetchData()
+    fetchHistory(id).then((page) => {
+      setMessages(page.messages)
+      setHistoryCursor({ firstIndex: page.firstIndex, hasMoreBefore: page.hasMoreBefore })
+    }).catch(console.error)
   }, [id])
 
+  const loadEarlier = async () => {
+    const page = await fetchHistory(id, historyCursor.firstIndex);
+    setMessages((prev) => [...page.messages, ...prev]);
+    setHistoryCursor({ firstIndex: page.firstIndex, hasMoreBefore: page.hasMoreBefore });
+  };
+
   const handleFeedbackKeyDown = (e) => {
     if (e.key === 'Enter') {
       handleFeedbackSubmit(e);
@@ -72,6 +107,41 @@ export default function AgentChat({setLoggedIn}) {
     }
   }, [messages, loading]);
 
+  // Runs go to the background worker pool; long-poll the job until it
+  // interrupts or finishes, then return the /v1/messages/-style body.
+  const runJob = async (path, body) => {
+    const headers = { 'Content-Type': 'application/json', Authorization: `Token ${Token}` };
+    // One key per send or resume, reused by its retries
+    const idempotencyKey = crypto.randomUUID();
+    let submit;
+    for (let attempt = 0; ; attempt++) {
+      try {
+        submit = await fetch(`http://127.0.0.1:8000/v1/jobs/${path}`, {
+          method: 'POST',
+          headers: { ...headers, 'Idempotency-Key': idempotencyKey },
+          body: JSON.stringify(body),
+        });
+        break;
+      } catch (err) {
+        if (attempt >= SUBMIT_RETRIES) throw err;
+      }
+    }
+    if (!submit.ok) throw new Error('Failed to submit workflow');
+    const { job_id: jobId } = await submit.json();
+
+    for (;;) {
+      const res = await fetch(
+        `http://127.0.0.1:8000/v1/jobs/${jobId}/?wait=${JOB_POLL_WAIT}&fields=${RESPONSE_FIELDS}`,
+        { headers }
+      );
+      // 409 / 429: the run met a busy thread or the rate limits; job.error says which
+      if (!res.ok && res.status !== 409 && res.status !== 429) throw new Error('Failed to fetch job status');
+      const job = await res.json();
+      if (job.status === 'failed') throw new Error(job.error || 'Workflow failed');
+      if (job.response) return job.response;
+    }
+  };
+
   // -- network logic kept the same --
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -82,22 +152,8 @@ export default function AgentChat({setLoggedIn}) {
     setQuery('');
 
     try {
-      const url = threadId
-        ? `http://127.0.0.1:8000/v1/messages/?thread_id=${threadId}`
-        : 'http://127.0.0.1:8000/v1/messages/';
-
-      const res = await fetch(url, {
-        method: 'POST',
-        headers: { 
-          'Content-Type': 'application/json',
-          "Authorization": `Token ${Token}`,
-        },
-        body: JSON.stringify({ user_prompt: query }),
-      });
-
-      if (!res.ok) throw new Error('Failed to fetch data');
-
-      const response = await res.json();
+      const path = threadId ? `messages/?thread_id=${threadId}` : 'messages/';
+      const response = await runJob(path, { user_prompt: query });
       if (response.thread_id && !threadId) setThreadId(response.thread_id);
       if (response.thread_id && !id) {
         navigate(`/chat/${response.thread_id}`);
@@ -146,15 +202,7 @@ export default function AgentChat({setLoggedIn}) {
     setWaitingForFeedback(false);
 
     try {
-      const res = await fetch(`http://127.0.0.1:8000/v1/resume/?thread_id=${threadId}`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ feedback: feedbackMessage }),
-      });
-
-      if (!res.ok) throw new Error('Failed to resume workflow');
-
-      const response = await res.json();
+      const response = await runJob(`resume/?thread_id=${threadId}`, { feedback: feedbackMessage });
       let botReply = '';
 
       if (response.status === 'interrupt') {
@@ -249,6 +297,9 @@ export default function AgentChat({setLoggedIn}) {
           )}
 
           <div className="msg-list">
+            {historyCursor.hasMoreBefore && (
+              <button className="load-earlier" onClick={loadEarlier}>Load earlier messages</button>
+            )}
             {messages.map((msg, idx) => (
               <div key={idx} className={`msg ${msg.content === 'HumanMessage' ? 'msg-right' : 'msg-left'}`}>
                 {msg.type !== 'HumanMessage' && <div className="avatar">B</div>}
@@ -325,6 +376,7 @@ export default function AgentChat({setLoggedIn}) {
         .welcome p { margin:0; color:#64748b; }
 
         .msg-list { display:flex; flex-direction:column; gap:18px; margin-top:16px; }
+        .load-earlier { align-self:center; border:1px solid #e5e7eb; background:#fff; color:#475569; border-radius:999px; padding:6px 14px; font-size:12px; cursor:pointer; }
         .msg { display:flex; gap:12px; align-items:flex-end; }
         .msg-left { justify-content:flex-start; }
         .msg-right { justify-content:flex-end; flex-direction:row-reverse; }
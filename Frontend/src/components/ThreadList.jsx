@@ -35,7 +35,7 @@ export default function ThreadList() {
   const filtered = useMemo(() => {
     if (!query.trim()) return threads;
     const q = query.trim().toLowerCase();
-    return threads.filter((t) => String(t).toLowerCase().includes(q));
+    return threads.filter((t) => `${t.thread_id} ${t.title}`.toLowerCase().includes(q));
   }, [threads, query]);
 
   const renderId = (tid) => {
@@ -76,7 +76,8 @@ export default function ThreadList() {
           <div style={{ padding: 14, color: '#64748b' }}>No threads</div>
         ) : (
           <ul style={{ listStyle: 'none', padding: 0, margin: 0 }}>
-            {filtered.map((tid) => {
+            {filtered.map((thread) => {
+              const tid = thread.thread_id;
               const isActive = id === tid;
               return (
                 <li key={tid}>
@@ -94,7 +95,7 @@ export default function ThreadList() {
                     }}
                   >
                     <span style={{ fontSize: 18 }}>{iconFor(tid)}</span>
-                    <span style={{ overflow: 'hidden', textOverflow: 'ellipsis', whiteSpace: 'nowrap' }}>{renderId(tid)}</span>
+                    <span style={{ overflow: 'hidden', textOverflow: 'ellipsis', whiteSpace: 'nowrap' }}>{thread.title || renderId(tid)}</span>
                     {isActive ? <span style={{ marginLeft: 'auto', fontSize: 12, color: '#6366f1' }}>active</span> : null}
                   </Link>
                 </li>
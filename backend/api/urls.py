@@ -1,5 +1,8 @@
 from django.urls import path
 from home.views import PromptInputView, ResumeWorkflowView, ThreadHistoryView, ThreadsListView
+from home.views import AsyncPromptInputView, AsyncResumeWorkflowView
+from home.views import PromptStreamView, ResumeStreamView
+from home.views import JobMetricsView, JobStatusView, PromptJobView, ResumeJobView
 from home.views import ConnectGmailView, OAuth2CallbackView
 from home.views import (
     ConnectCalendarView,
@@ -15,6 +18,16 @@ urlpatterns = [
     # path('accounts/google/login/callback/', GoogleLogin.as_view()),
     path('messages/', PromptInputView.as_view(), name="messages"),
     path('resume/', ResumeWorkflowView.as_view(), name="resume_workflow"),
+    path('messages/stream/', PromptStreamView.as_view(), name="messages_stream"),
+    path('resume/stream/', ResumeStreamView.as_view(), name="resume_stream"),
+    # async twins; run under ASGI (backend/asgi.py)
+    path('async/messages/', AsyncPromptInputView.as_view(), name="async_messages"),
+    path('async/resume/', AsyncResumeWorkflowView.as_view(), name="async_resume_workflow"),
+    # background jobs: submit, then long-poll the job
+    path('jobs/messages/', PromptJobView.as_view(), name="jobs_messages"),
+    path('jobs/resume/', ResumeJobView.as_view(), name="jobs_resume"),
+    path('jobs/metrics/', JobMetricsView.as_view(), name="jobs_metrics"),
+    path('jobs/<uuid:job_id>/', JobStatusView.as_view(), name="job_status"),
     path('threads/<str:thread_id>/history/', ThreadHistoryView.as_view(), name="thread_history"),
     path('threads/', ThreadsListView.as_view(), name="threads_list"),
 
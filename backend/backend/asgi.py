@@ -3,6 +3,11 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The async workflow endpoints (``/v1/async/messages/``, ``/v1/async/resume/``)
+are meant to be served from here, e.g. ``uvicorn backend.asgi:application``:
+one event loop then keeps many LLM-bound conversations in flight and shares a
+single aiosqlite checkpointer connection (see ``src.agent.registry``).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
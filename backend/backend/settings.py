@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -82,6 +85,11 @@ CORS_ALLOW_CREDENTIALS = True
 
 CORS_ALLOW_ALL_ORIGINS = True 
 
+# Conditional history requests (ETag / If-None-Match) and Idempotency-Key
+# retries from the React app
+CORS_ALLOW_HEADERS = (*default_headers, "if-none-match", "idempotency-key")
+CORS_EXPOSE_HEADERS = ["ETag", "Idempotent-Replayed", "Retry-After"]
+
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -91,6 +99,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'home.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 
@@ -177,4 +189,9 @@ SOCIALACCOUNT_PROVIDERS = {
             "access_type": "online",
         }
     }
-}
\ No newline at end of file
+}
+
+# Compile the agent workflow and open the checkpointer when a server process
+# starts (see home.apps.HomeConfig.ready); AGENT_WARM_ON_STARTUP=0 defers it
+# to the first request.
+AGENT_WARM_ON_STARTUP = os.getenv("AGENT_WARM_ON_STARTUP", "1") != "0"
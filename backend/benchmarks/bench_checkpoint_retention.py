@@ -0,0 +1,74 @@
+"""
+get_state latency and database size before and after checkpoint compaction.
+
+    python -m benchmarks.bench_checkpoint_retention [--threads 200] [--steps 50] [--keep-last 5]
+
+Fills a scratch checkpoint database with `threads` conversations of `steps`
+super-steps each (real checkpoints written through the compiled workflow,
+each adding a message), then reads the latest state of random threads.
+The same reads are repeated after `src.agent.retention.compact()`.
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+
+from benchmarks.common import report, setup_django
+
+
+def fill(app, threads, steps):
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    for t in range(threads):
+        config = {"configurable": {"thread_id": f"thread-{t}"}}
+        for s in range(steps):
+            message = (HumanMessage if s % 2 == 0 else AIMessage)(f"message {s} of thread {t} " + "x" * 200)
+            app.update_state(config, {"messages": [message], "user_prompt": message.content}, as_node="intent")
+
+
+def measure(app, threads, reads):
+    samples = []
+    for _ in range(reads):
+        config = {"configurable": {"thread_id": f"thread-{random.randrange(threads)}"}}
+        start = time.perf_counter()
+        app.get_state(config)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--keep-last", type=int, default=5)
+    parser.add_argument("--reads", type=int, default=500)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    from src.agent import retention
+    from src.agent.graph import create_workflow
+
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    app = create_workflow(SqliteSaver(conn))
+    print(f"writing {args.threads} threads x {args.steps} steps ...")
+    fill(app, args.threads, args.steps)
+
+    before_stats = retention.stats(db_path, top=1)
+    before = measure(app, args.threads, args.reads)
+
+    retention.compact(db_path, keep_last=args.keep_last, ttl_days=365, interrupt_ttl_days=365)
+    after_stats = retention.stats(db_path, top=1)
+    after = measure(app, args.threads, args.reads)
+
+    for label, stats in (("before", before_stats), ("after", after_stats)):
+        print(f"{label:<12} checkpoints={stats['checkpoints']:>7}  file={stats['file_bytes'] / 2**20:8.1f} MiB")
+    report("before", before)
+    report("after", after)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
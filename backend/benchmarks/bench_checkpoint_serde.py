@@ -0,0 +1,112 @@
+"""
+Checkpoint size and (de)serialization time: msgpack vs zstd vs zstd with a dictionary.
+
+    python -m benchmarks.bench_checkpoint_serde [--threads 100] [--steps 10] [--level 3]
+
+Runs `threads` conversations of `steps` super-steps through the compiled
+workflow (each step adds a message and updates the draft fields, like a
+LinkedIn/email dialogue) with an uncompressed saver, then re-encodes every
+stored checkpoint and write with each serializer. The dictionary is trained
+on the first half of the threads and measured on the second half.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import report, setup_django
+
+
+def fill(app, threads, steps):
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    for t in range(threads):
+        config = {"configurable": {"thread_id": f"thread-{t}"}}
+        for s in range(steps):
+            if s % 2 == 0:
+                message = HumanMessage(f"linkedin topic: release {t}.{s} of the checkpoint store, make it shorter")
+            else:
+                message = AIMessage(f"We shipped release {t}.{s} today: checkpoints are smaller and reads "
+                                    f"no longer wait for writers. Thanks to everyone who tested it! #release")
+            app.update_state(config, {
+                "messages": [message],
+                "user_prompt": message.content,
+                "intent": "linkedin",
+                "topic": f"release {t}.{s}",
+                "generated_text": message.content,
+                "preview": f"📱 LINKEDIN POST PREVIEW\n{'=' * 40}\n\n{message.content}\n\n{'=' * 40}\n"
+                           f"Ready to post? Please review above.",
+            }, as_node="intent")
+
+
+def payloads(path, thread_ids):
+    import sqlite3
+
+    marks = ",".join("?" * len(thread_ids))
+    with sqlite3.connect(path) as conn:
+        return [row for table, col in (("checkpoints", "checkpoint"), ("writes", "value"))
+                for row in conn.execute(f"SELECT type, {col} FROM {table}"
+                                        f" WHERE thread_id IN ({marks}) AND {col} IS NOT NULL", thread_ids)]
+
+
+def measure(label, codec, rows, inner):
+    objects = [inner.loads_typed(row) for row in rows]
+    encoded, dumps, loads = [], [], []
+    for obj in objects:
+        start = time.perf_counter()
+        pair = codec.dumps_typed(obj)
+        dumps.append(time.perf_counter() - start)
+        encoded.append(pair)
+    for pair in encoded:
+        start = time.perf_counter()
+        codec.loads_typed(pair)
+        loads.append(time.perf_counter() - start)
+    total = sum(len(data) for _, data in encoded)
+    print(f"{label}: {total / 2**10:9.1f} KiB total, {total / len(encoded):7.0f} bytes/payload")
+    report("  dumps", dumps, unit="us", scale=1e6)
+    report("  loads", loads, unit="us", scale=1e6)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=100)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--level", type=int, default=3)
+    parser.add_argument("--dict-size", type=int, default=32 * 1024)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+
+    from src.agent import serde
+    from src.agent.checkpointer import PooledSqliteSaver
+    from src.agent.graph import create_workflow
+
+    plain = serde.ZstdSerializer(compress=False)
+    saver = PooledSqliteSaver(db_path, serde=plain)
+    app = create_workflow(saver)
+    print(f"writing {args.threads} threads x {args.steps} steps ...")
+    fill(app, args.threads, args.steps)
+    saver.close()
+
+    half = args.threads // 2
+    train = payloads(db_path, [f"thread-{t}" for t in range(half)])
+    rows = payloads(db_path, [f"thread-{t}" for t in range(half, args.threads)])
+    dict_path = serde.train_dictionary([data for _, data in train], args.dict_size, tempfile.mkdtemp())
+    dictionary, known = serde.load_dictionaries(dict_path)
+    print(f"{len(rows)} payloads measured, dictionary {os.path.getsize(dict_path)} bytes "
+          f"trained on {len(train)} payloads")
+
+    base = measure("msgpack", plain, rows, plain)
+    for label, codec in (
+        (f"zstd-{args.level}", serde.ZstdSerializer(level=args.level)),
+        (f"zstd-{args.level}+dict", serde.ZstdSerializer(level=args.level, dictionary=dictionary,
+                                                         known_dictionaries=known)),
+    ):
+        size = measure(label, codec, rows, plain)
+        print(f"  {base / size:.2f}x smaller than msgpack")
+
+
+if __name__ == "__main__":
+    main()
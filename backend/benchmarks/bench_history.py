@@ -0,0 +1,97 @@
+"""
+Thread history read: app.get_state() through the graph vs. src.agent.history.
+
+    python -m benchmarks.bench_history [--turns 500] [--reads 200]
+
+Writes one long conversation (`turns` messages plus a LinkedIn draft) with
+the process checkpointer, then times the history endpoint's work:
+"get_state" is the old ThreadHistoryView body (compiled graph get_state,
+serialize_state, messages formatted again); "read_state" is the new view
+body; "intent only" is `?channels=intent`, which never loads the messages;
+"page of 50" is `?limit=50` and "304" the If-None-Match check alone.
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.common import report, setup_django
+
+WORDS = "draft post email launch team update thanks review feedback product customer weekly".split()
+
+
+def fill(app, thread_id, turns):
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    config = {"configurable": {"thread_id": thread_id}}
+    for n in range(turns):
+        text = " ".join(random.choice(WORDS) for _ in range(40))
+        app.update_state(config, {
+            "messages": [(HumanMessage if n % 2 == 0 else AIMessage)(f"turn {n}: {text}")],
+            "intent": "linkedin",
+            "generated_text": text,
+        }, as_node="intent")
+
+
+def old_view(app, thread_id):
+    from src.agent.graph import serialize_state
+
+    state = app.get_state({"configurable": {"thread_id": thread_id}})
+    serialized = serialize_state(state.values)
+    history = [{"type": m.__class__.__name__, "content": m.content, "timestamp": getattr(m, "timestamp", None)}
+               for m in state.values.get("messages", [])]
+    return serialized, history
+
+
+def new_view(thread_id, channels=None):
+    from src.agent.graph import serialize_state
+    from src.agent.history import read_state
+
+    serialized = serialize_state(read_state(thread_id, channels))
+    return serialized, serialized.get("messages", [])
+
+
+def page_view(thread_id, limit):
+    from src.agent.graph import serialize_state
+    from src.agent.history import read_page
+
+    page = read_page(thread_id, limit=limit)
+    return serialize_state(page["state"]), serialize_state({"messages": page["messages"]})["messages"]
+
+
+def measure(fn, reads):
+    samples = []
+    for _ in range(reads):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from src.agent.history import latest_checkpoint_id
+    from src.agent.registry import get_app
+
+    app = get_app()
+    print(f"writing {args.turns} turns ...")
+    fill(app, "thread-0", args.turns)
+
+    old, new = old_view(app, "thread-0"), new_view("thread-0")
+    assert old[0] == new[0] and [h["content"] for h in old[1]] == [h["content"] for h in new[1]]
+
+    report("get_state", measure(lambda: old_view(app, "thread-0"), args.reads))
+    report("read_state", measure(lambda: new_view("thread-0"), args.reads))
+    report("intent only", measure(lambda: new_view("thread-0", ["intent"]), args.reads))
+    report("page of 50", measure(lambda: page_view("thread-0", 50), args.reads))
+    report("304", measure(lambda: latest_checkpoint_id("thread-0"), args.reads))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Cold-start time of the backend: Django setup, the API views, manage.py.
+
+    python -m benchmarks.bench_import_time [--repeat 5] [--top 15] [--target-ms 1500]
+
+Each case runs in a fresh interpreter, `repeat` times; the median wall time
+is reported. "setup" is django.setup() without warming the workflow,
+"views" additionally imports home.views (what a worker does before its
+first request), "check" is `manage.py check`, and "boot" is setup with
+AGENT_WARM_ON_STARTUP on (compiles the workflow and loads the intent
+classifier, as a server process does).
+
+Then prints the `top` slowest modules (cumulative `-X importtime`) of the
+"views" case. Exits 1 when "views" is slower than `target-ms`, so the
+cold-start budget can be checked in CI.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Cold import of home.views, without warming (ms)
+COLD_START_TARGET_MS = 1500
+
+SETUP = "import django; django.setup()"
+CASES = {
+    "setup": ([sys.executable, "-c", SETUP], {"AGENT_WARM_ON_STARTUP": "0"}),
+    "views": ([sys.executable, "-c", SETUP + "; import home.views"], {"AGENT_WARM_ON_STARTUP": "0"}),
+    "check": ([sys.executable, "manage.py", "check"], {}),
+    "boot": ([sys.executable, "-c", SETUP + "; import home.views"], {"AGENT_WARM_ON_STARTUP": "1"}),
+}
+
+
+def run(cmd, env, stderr=subprocess.DEVNULL):
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": "backend.settings", "PYTHONPATH": BACKEND, **env}
+    start = time.perf_counter()
+    result = subprocess.run(cmd, cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=stderr, check=True)
+    return time.perf_counter() - start, result
+
+
+def slowest_imports(top):
+    """
+    (cumulative ms, module) of the `top` slowest imports in the "views" case.
+    """
+    cmd, env = CASES["views"]
+    _, result = run([cmd[0], "-X", "importtime", *cmd[1:]], env, stderr=subprocess.PIPE)
+    rows = []
+    for line in result.stderr.decode().splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        rows.append((int(cumulative) / 1000, name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--target-ms", type=float, default=COLD_START_TARGET_MS)
+    args = parser.parse_args()
+
+    medians = {}
+    for label, (cmd, env) in CASES.items():
+        samples = [run(cmd, env)[0] for _ in range(args.repeat)]
+        medians[label] = statistics.median(samples) * 1000
+        print(f"{label:<8} median={medians[label]:8.0f} ms  min={min(samples) * 1000:8.0f} ms")
+
+    print("\nSlowest imports of 'views' (cumulative):")
+    for ms, name in slowest_imports(args.top):
+        print(f"{ms:9.1f} ms  {name}")
+
+    ok = medians["views"] <= args.target_ms
+    print(f"\ncold start (views) {medians['views']:.0f} ms, target {args.target_ms:.0f} ms: {'PASS' if ok else 'FAIL'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
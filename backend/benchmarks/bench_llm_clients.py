@@ -0,0 +1,114 @@
+"""
+Per-call cost of building a ChatGroq client vs. the shared LLM registry.
+
+    python -m benchmarks.bench_llm_clients [--calls 50]
+
+Runs against a local HTTPS stub of the chat-completions API (self-signed
+certificate made with `openssl`), so the numbers contain client construction,
+TCP connect and the TLS handshake but no model time. "before" mirrors the old
+code, a new ChatGroq per call; "after" uses `src.agent.llm.get_llm()`, which
+keeps one client and its keep-alive connection pool.
+"""
+
+import argparse
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import report
+
+COMPLETION = json.dumps({
+    "id": "bench", "object": "chat.completion", "created": 0, "model": "bench",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "email"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    # One write per response and no Nagle delay, so the stub itself adds
+    # no latency on reused connections
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        # one handler instance per accepted connection
+        type(self).connections += 1
+        super().setup()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(COMPLETION)))
+        self.end_headers()
+        self.wfile.write(COMPLETION)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(workdir):
+    cert, key = os.path.join(workdir, "cert.pem"), os.path.join(workdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", key, "-out", cert, "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, cert
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    server, cert = start_stub(tempfile.mkdtemp())
+    # Both the per-call clients and the registry trust the stub's certificate
+    os.environ["SSL_CERT_FILE"] = cert
+    os.environ["GROQ_API_BASE"] = f"https://127.0.0.1:{server.server_address[1]}"
+    os.environ["GROQ_API_KEY"] = "bench"
+
+    from langchain_groq import ChatGroq
+    from src.agent import llm
+
+    prompt = "classify: send mail to bob@example.com"
+
+    StubHandler.connections = 0
+    before = []
+    for _ in range(args.calls):
+        start = time.perf_counter()
+        ChatGroq(model="openai/gpt-oss-120b", temperature=0.1).invoke(prompt)
+        before.append(time.perf_counter() - start)
+    before_connections = StubHandler.connections
+
+    StubHandler.connections = 0
+    after = []
+    for _ in range(args.calls):
+        start = time.perf_counter()
+        llm.get_llm("email_extract").invoke(prompt)
+        after.append(time.perf_counter() - start)
+
+    print(f"{args.calls} calls against a local HTTPS stub (http2={llm.HTTP2})")
+    report("before", before)
+    report("after", after)
+    print(f"connections opened: before={before_connections} after={StubHandler.connections}")
+
+    llm.reset()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Checkpoint storage vs. conversation length, inline messages vs. the message store.
+
+    python -m benchmarks.bench_message_store [--turns 50 100 200] [--words 60]
+
+Writes one conversation of `turns` messages (distinct text of `words` words
+each, one checkpoint per message) through the compiled workflow twice: with
+a plain SqliteSaver, where every checkpoint carries the whole message list,
+and with PooledSqliteSaver, which stores each message once in
+`message_blobs`. Both use the configured checkpoint serializer.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.common import setup_django
+
+WORDS = ("draft post email subject recipient release checkpoint shorter friendly tone audience launch "
+         "team update thanks schedule meeting review feedback summary product customer weekly").split()
+
+
+def converse(app, turns, words):
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    config = {"configurable": {"thread_id": "thread-0"}}
+    start = time.perf_counter()
+    for n in range(turns):
+        text = " ".join(random.choice(WORDS) for _ in range(words))
+        message = (HumanMessage if n % 2 == 0 else AIMessage)(f"turn {n}: {text}")
+        app.update_state(config, {"messages": [message]}, as_node="intent")
+    return time.perf_counter() - start
+
+
+def stored_bytes(path):
+    with sqlite3.connect(path) as conn:
+        checkpoints = conn.execute("SELECT COALESCE(SUM(LENGTH(checkpoint)), 0) FROM checkpoints").fetchone()[0]
+        has_blobs = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'message_blobs'").fetchone()
+        blobs = conn.execute("SELECT COALESCE(SUM(LENGTH(blob)), 0) FROM message_blobs").fetchone()[0] \
+            if has_blobs else 0
+    return checkpoints, blobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--words", type=int, default=60)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    from src.agent.checkpointer import PooledSqliteSaver
+    from src.agent.graph import create_workflow
+    from src.agent.serde import get_serde
+
+    print(f"{'turns':>6} {'saver':<8} {'checkpoints':>12} {'messages':>10} {'total KiB':>10} {'write s':>8}")
+    for turns in args.turns:
+        for label in ("inline", "store"):
+            path = os.path.join(tempfile.mkdtemp(), "checkpoints.db")
+            if label == "inline":
+                conn = sqlite3.connect(path, check_same_thread=False)
+                saver = SqliteSaver(conn, serde=get_serde())
+            else:
+                saver = PooledSqliteSaver(path)
+            random.seed(turns)
+            elapsed = converse(create_workflow(saver), turns, args.words)
+            (conn if label == "inline" else saver).close()
+            checkpoints, blobs = stored_bytes(path)
+            print(f"{turns:>6} {label:<8} {checkpoints:>12} {blobs:>10} {(checkpoints + blobs) / 1024:>10.1f} "
+                  f"{elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+LLM calls against a rate-limited provider, with and without the shared limiter.
+
+    python -m benchmarks.bench_rate_limiter [--rpm 1200] [--calls 1400] [--threads 32]
+
+A fake provider accepts `rpm` requests per minute (a bucket of one minute's
+requests, refilled continuously, as Groq enforces it) and answers 429 past
+that. `threads` callers make `calls` calls in total through a chat model
+whose tokens are negligible. "direct" sends them straight away, as the nodes
+did before; "limited" attaches `ratelimit.client_options`, so calls queue on the
+same-sized bucket instead. Reports 429s, calls per second and queue wait.
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import report, setup_django
+
+MODEL = "bench-model"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rpm", type=int, default=1200)
+    parser.add_argument("--calls", type=int, default=1400)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args()
+
+    setup_django()
+    os.environ["LLM_RATE_LIMITS"] = json.dumps({MODEL: {"rpm": args.rpm, "tpm": 10 ** 9}})
+    os.environ["LLM_RATE_LIMIT_BUDGET"] = "600"
+
+    from langchain_core.language_models import FakeListChatModel
+    from src.agent import ratelimit
+
+    limits = ratelimit.limits_for(MODEL)
+
+    for mode in ("direct", "limited"):
+        ratelimit.reset()
+        provider = ratelimit.MemoryBuckets()
+
+        class Provider(FakeListChatModel):
+            responses: list = []
+
+            def _call(self, messages, stop=None, run_manager=None, **kwargs):
+                try:
+                    provider.reserve(MODEL, limits, 1, max_wait=0)
+                except ratelimit.RateLimited:
+                    raise RuntimeError("429 Too Many Requests")
+                return "ok"
+
+        options = ratelimit.client_options(MODEL) if mode == "limited" else {}
+        model = Provider(**options)
+
+        def call(_):
+            start = time.perf_counter()
+            try:
+                model.invoke("hi")
+                return time.perf_counter() - start, True
+            except RuntimeError:
+                return time.perf_counter() - start, False
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            outcomes = list(pool.map(call, range(args.calls)))
+        elapsed = time.perf_counter() - start
+        rejected = sum(1 for _, ok in outcomes if not ok)
+        print(f"\n{mode}: {args.calls} calls, {rejected} answered 429, "
+              f"{(args.calls - rejected) / elapsed:.0f} successful calls/s")
+        report("latency", [t for t, _ in outcomes])
+
+
+if __name__ == "__main__":
+    main()
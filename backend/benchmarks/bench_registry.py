@@ -0,0 +1,61 @@
+"""
+Per-request overhead of compiling the workflow vs. reusing the registry.
+
+    python -m benchmarks.bench_registry [--requests 50]
+
+"before" mirrors the old behaviour: every request builds the StateGraph,
+compiles it and opens a fresh sqlite3 connection. "after" goes through
+`src.agent.registry.get_app()`. Both then read the (empty) thread state so
+the numbers include one checkpoint lookup per request.
+"""
+
+import argparse
+import sqlite3
+import time
+
+from benchmarks.common import report, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    from src.agent import registry
+    from src.agent.graph import build_workflow
+
+    config = {"configurable": {"thread_id": "bench"}}
+    leaked = []
+
+    before = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        app = build_workflow().compile(checkpointer=SqliteSaver(conn))
+        app.get_state(config)
+        before.append(time.perf_counter() - start)
+        leaked.append(conn)  # the old code never closed these
+
+    registry.warm()
+    after = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        app = registry.get_app()
+        app.get_state(config)
+        after.append(time.perf_counter() - start)
+
+    print(f"{args.requests} requests")
+    report("before", before)
+    report("after", after)
+    print(f"open connections: before={len(leaked)} after=1")
+
+    for conn in leaked:
+        conn.close()
+    registry.shutdown()
+
+
+if __name__ == "__main__":
+    main()
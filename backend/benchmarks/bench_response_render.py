@@ -0,0 +1,78 @@
+"""
+Size and encode time of a workflow interrupt response.
+
+    python -m benchmarks.bench_response_render [--messages 10 100 500] [--repeat 200]
+
+Builds the 202 body of /v1/messages/ for a thread of `messages` messages
+and renders it three ways: the raw state through DRF's JSONRenderer (what
+the view returned before), the serialized state through ORJSONRenderer,
+and `?fields=interrupt,preview,result` through ORJSONRenderer.
+"""
+
+import argparse
+import time
+
+from benchmarks.common import report, setup_django
+
+TEXT = ("Thanks for the update on the release. I will review the draft and send feedback "
+        "on the subject line, the audience and the tone before the weekly meeting. ")
+
+
+def interrupt_result(messages):
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    history = [(HumanMessage if n % 2 == 0 else AIMessage)(f"turn {n}: {TEXT}") for n in range(messages)]
+    preview = f"📧 EMAIL PREVIEW\n{'=' * 40}\n\nTo: bob@example.com\nSubject: Running late\n\nBody:\n{TEXT}"
+    return {
+        "status": "interrupt",
+        "interrupt": {"message": "Review the email above.", "preview": None, "thread_id": "t-bench"},
+        "state": {"messages": history, "user_prompt": "mail bob", "user_id": 1, "intent": "email",
+                  "to": "bob@example.com", "subject": "Running late", "body": TEXT, "preview": preview,
+                  "needs_input": False, "human_message": None, "awaiting": "decision"},
+    }
+
+
+def drf_body(result):
+    from rest_framework.renderers import JSONRenderer
+
+    payload = {"status": "interrupt", "message": "Workflow interrupted - human input required",
+               "interrupt": result["interrupt"], "thread_id": "t-bench", "state": result["state"]}
+    return JSONRenderer().render(payload)
+
+
+def orjson_body(result, fields=None):
+    from home.renderers import ORJSONRenderer
+    from home.views import workflow_payload
+
+    payload, _ = workflow_payload(result, "t-bench", "Workflow interrupted - human input required", fields)
+    return ORJSONRenderer().render(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+
+    variants = {
+        "drf": drf_body,
+        "orjson": orjson_body,
+        "fields": lambda result: orjson_body(result, {"interrupt", "preview", "result"}),
+    }
+    for messages in args.messages:
+        result = interrupt_result(messages)
+        print(f"\n{messages} messages")
+        for label, render in variants.items():
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                body = render(result)
+                samples.append(time.perf_counter() - start)
+            report(label, samples)
+            print(f"{'':<12} {len(body)} bytes")
+
+
+if __name__ == "__main__":
+    main()
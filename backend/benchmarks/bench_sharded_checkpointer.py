@@ -0,0 +1,77 @@
+"""
+Checkpoint write throughput versus shard count.
+
+    python -m benchmarks.bench_sharded_checkpointer [--processes 8] [--puts 2000] [--shards 1 2 4 8]
+
+`processes` worker processes (like gunicorn workers) each write `puts`
+checkpoints (with their pending writes) of a few KB to random threads through
+`open_checkpointer()`. With one file every commit takes the same write lock;
+with N shards, writers to different shards proceed in parallel.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import setup_django
+
+
+def worker(path, shards, puts, start_barrier, results):
+    from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+    from src.agent.checkpointer import open_checkpointer
+
+    saver = open_checkpointer(path, shards)
+    payload = "x" * 4096
+    start_barrier.wait()
+    start = time.perf_counter()
+    for n in range(puts):
+        thread_id = f"thread-{random.randrange(1000)}"
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+        checkpoint = create_checkpoint(empty_checkpoint(), None, n)
+        checkpoint["channel_values"] = {"user_prompt": payload}
+        saved = saver.put(config, checkpoint, {"source": "loop", "step": n}, {})
+        saver.put_writes(saved, [("messages", payload)], task_id=f"task-{n}")
+    results.put(time.perf_counter() - start)
+    saver.close()
+
+
+def run(shards, processes, puts):
+    path = os.path.join(tempfile.mkdtemp(), "checkpoints.db")
+    # create the files up front so workers don't race on the schema
+    from src.agent.checkpointer import open_checkpointer
+    open_checkpointer(path, shards).close()
+
+    barrier = multiprocessing.Barrier(processes)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=worker, args=(path, shards, puts, barrier, results))
+               for _ in range(processes)]
+    for p in workers:
+        p.start()
+    elapsed = max(results.get() for _ in workers)
+    for p in workers:
+        p.join()
+    return processes * puts / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--puts", type=int, default=2000, help="per process")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    setup_django()
+    multiprocessing.set_start_method("fork")
+    print(f"{args.processes} processes x {args.puts} checkpoint puts, {os.cpu_count()} CPUs")
+    baseline = None
+    for shards in args.shards:
+        rate = run(shards, args.processes, args.puts)
+        baseline = baseline or rate
+        print(f"shards={shards:<3} {rate:10.0f} puts/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
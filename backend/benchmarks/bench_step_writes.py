@@ -0,0 +1,150 @@
+"""
+Bytes written to the checkpointer per super-step of a scripted dialogue.
+
+    python -m benchmarks.bench_step_writes [--history 0 200] [--words 60]
+
+Runs an email dialogue (missing recipient, draft, edit, cancel) and a
+LinkedIn one (draft, edit, cancel) through the compiled workflow with a
+scripted model, on a plain SqliteSaver so nothing is deduplicated. Before
+each dialogue the thread gets `history` earlier messages of `words` words.
+Prints, per super-step, the checkpoint bytes and the bytes and channels of
+the writes the step's tasks produced; a node that returns its whole state
+writes every channel (the message list included) at every step.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sqlite3
+import tempfile
+from typing import Any
+
+from benchmarks.common import setup_django
+
+WORDS = ("draft post email subject recipient release checkpoint shorter friendly tone audience launch "
+         "team update thanks schedule meeting review feedback summary product customer weekly").split()
+
+# First words of a system prompt -> scripted answer
+ANSWERS = [
+    ("Classify the user's request", None),
+    ("You extract email details from a single user input",
+     json.dumps({"to": "", "subject": "", "body": "I will be late today", "sender_name": "",
+                 "missing": ["to", "subject"]})),
+    ("You generate a Gmail-ready draft",
+     json.dumps({"to": "bob@example.com", "subject": "Running late", "body": "Hi Bob, I will be late today."})),
+    ("Edit the email based on human feedback",
+     json.dumps({"to": "bob@example.com", "subject": "Running late",
+                 "body": "Hi Bob, I will be 10 minutes late today."})),
+    ("You are a strict extractor for LinkedIn", json.dumps({"topic": "Shipping agents to production",
+                                                            "missing": []})),
+    ("You write complete, high-signal LinkedIn posts", "Lessons from shipping agents to production."),
+    ("You are an expert LinkedIn copy editor", "Three lessons from shipping agents to production."),
+]
+
+DIALOGUES = {
+    "email": ("mail that I will be late today", ["bob@example.com", "edit", "say 10 minutes", "cancel"]),
+    "linkedin": ("write a linkedin post about shipping agents", ["edit", "make it a list", "cancel"]),
+}
+
+
+def scripted_factory(intent):
+    from langchain_core.language_models import FakeListChatModel
+
+    class ScriptedLLM(FakeListChatModel):
+        responses: list = []
+
+        def _call(self, messages, stop=None, run_manager=None, **kwargs):
+            text = messages[0].content.strip()
+            for prefix, answer in ANSWERS:
+                if text.startswith(prefix):
+                    return intent if answer is None else answer
+            raise ValueError(f"No scripted answer for prompt: {text[:60]!r}")
+
+    return lambda *args, **kwargs: ScriptedLLM()
+
+
+def seed(app, config, history, words):
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    for n in range(history):
+        text = " ".join(random.choice(WORDS) for _ in range(words))
+        message = (HumanMessage if n % 2 == 0 else AIMessage)(f"turn {n}: {text}")
+        app.update_state(config, {"messages": [message]}, as_node="intent")
+
+
+def converse(app, config, prompt, replies):
+    from langchain_core.messages import HumanMessage
+    from langgraph.types import Command
+
+    inputs: list[Any] = [{"messages": [HumanMessage(content=prompt)], "user_prompt": prompt, "user_id": 1}]
+    inputs += [Command(resume=reply) for reply in replies]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for graph_input in inputs:
+            for _ in app.stream(graph_input, config):
+                pass
+
+
+def step_bytes(path, after_rowid):
+    """
+    (step, checkpoint bytes, write bytes, channels written) per checkpoint
+    saved after `after_rowid`, in order.
+    """
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute(
+            "SELECT checkpoint_id, LENGTH(checkpoint) + LENGTH(metadata), metadata FROM checkpoints"
+            " WHERE rowid > ? ORDER BY checkpoint_id", (after_rowid,)).fetchall()
+        steps = []
+        for checkpoint_id, size, metadata in rows:
+            writes = conn.execute(
+                "SELECT channel, LENGTH(value) FROM writes WHERE checkpoint_id = ?", (checkpoint_id,)).fetchall()
+            channels = sorted({c for c, _ in writes if ":" not in c and not c.startswith("__")})
+            steps.append((json.loads(metadata).get("step"), size, sum(n or 0 for _, n in writes), channels))
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--history", type=int, nargs="+", default=[0, 200])
+    parser.add_argument("--words", type=int, default=60)
+    args = parser.parse_args()
+
+    setup_django()
+    os.environ.update({"INTENT_CONFIDENCE_THRESHOLD": "2", "LLM_CACHE": "0"})
+
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    from src.agent import llm
+    from src.agent.graph import create_workflow
+    from src.agent.serde import get_serde
+
+    for history in args.history:
+        for name, (prompt, replies) in DIALOGUES.items():
+            path = os.path.join(tempfile.mkdtemp(), "checkpoints.db")
+            conn = sqlite3.connect(path, check_same_thread=False)
+            saver = SqliteSaver(conn, serde=get_serde())
+            saver.setup()
+            app = create_workflow(saver)
+            config = {"configurable": {"thread_id": f"{name}-{history}"}}
+            llm.reset()
+            llm.PROVIDERS["groq"] = scripted_factory(name)
+
+            random.seed(history)
+            seed(app, config, history, args.words)
+            seeded = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM checkpoints").fetchone()[0]
+            converse(app, config, prompt, replies)
+            conn.close()
+
+            steps = step_bytes(path, seeded)
+            print(f"\n{name} dialogue, {history} earlier messages")
+            print(f"{'step':>5} {'checkpoint':>11} {'writes':>9}  channels written")
+            for step, size, written, channels in steps:
+                print(f"{step:>5} {size:>11} {written:>9}  {', '.join(channels)}")
+            print(f"{'total':>5} {sum(s[1] for s in steps):>11} {sum(s[2] for s in steps):>9}  "
+                  f"({len(steps)} super-steps, "
+                  f"{sum(s[1] + s[2] for s in steps) / max(1, len(steps)) / 1024:.1f} KiB per step)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Per-thread leases under concurrent resumes from several processes.
+
+    python -m benchmarks.bench_thread_leases [--processes 4] [--threads 4] [--rounds 20] [--hold-ms 20]
+
+Every thread of every worker process takes a thread lease `rounds` times and
+holds it for `hold-ms`, standing in for a resume. "same" points all of them
+at one conversation: at most one may hold it at any moment, the rest queue.
+"distinct" gives every worker thread its own conversation: nothing should
+wait beyond the lease table's write. "fail-fast" is "same" with `wait=0`,
+the duplicate-resume case, counting 409s. Reports the most leases held on one
+conversation at once, acquire latency, and rounds per second.
+"""
+
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import report, setup_django
+
+
+def worker(index, mode, db_path, threads, rounds, hold, inside, peak, results):
+    setup_django(db_path)
+    from src.agent import thread_locks
+
+    wait = 0 if mode == "fail-fast" else 60
+
+    def play(n):
+        thread_id = "t-shared" if mode != "distinct" else f"t-{index}-{n}"
+        waits, busy = [], 0
+        for _ in range(rounds):
+            start = time.perf_counter()
+            try:
+                with thread_locks.thread_lease(thread_id, wait=wait):
+                    waits.append(time.perf_counter() - start)
+                    if mode != "distinct":
+                        with inside.get_lock():
+                            inside.value += 1
+                            peak.value = max(peak.value, inside.value)
+                    time.sleep(hold)
+                    if mode != "distinct":
+                        with inside.get_lock():
+                            inside.value -= 1
+            except thread_locks.ThreadBusy:
+                busy += 1
+        return waits, busy
+
+    with ThreadPoolExecutor(threads) as pool:
+        outcomes = list(pool.map(play, range(threads)))
+    results.put(([w for waits, _ in outcomes for w in waits], sum(busy for _, busy in outcomes)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--hold-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    for mode in ("same", "distinct", "fail-fast"):
+        inside, peak = multiprocessing.Value("i", 0), multiprocessing.Value("i", 0)
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=worker, args=(
+            i, mode, db_path, args.threads, args.rounds, args.hold_ms / 1000, inside, peak, results))
+            for i in range(args.processes)]
+        start = time.perf_counter()
+        for proc in procs:
+            proc.start()
+        outcomes = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - start
+
+        waits = [w for proc_waits, _ in outcomes for w in proc_waits]
+        busy = sum(b for _, b in outcomes)
+        print(f"\n{mode}: {len(waits)} leases, {busy} busy (409), "
+              f"at most {peak.value if mode != 'distinct' else '-'} holder(s) at once, "
+              f"{len(waits) / elapsed:.0f} rounds/s")
+        report("acquire", waits)
+
+
+if __name__ == "__main__":
+    main()
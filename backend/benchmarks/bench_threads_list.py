@@ -0,0 +1,95 @@
+"""
+Thread listing: scanning the checkpoint tables vs. the thread catalog.
+
+    python -m benchmarks.bench_threads_list [--checkpoints 200000] [--threads 100]
+
+"before" is the old ThreadsListView query, SELECT DISTINCT thread_id over
+the checkpoint and write tables, against a scratch checkpoint database
+filled with synthetic rows. "after" reads one cursor page of the user's
+threads from `home.ThreadCatalog` (in a throwaway test database), which only
+touches the (user, last_activity) index.
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+
+from benchmarks.common import report, setup_django
+
+
+def fill_checkpoints(db_path, checkpoints, threads):
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    SqliteSaver(conn).setup()
+    blob = os.urandom(512)
+    conn.executemany(
+        "INSERT INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,"
+        " type, checkpoint, metadata) VALUES (?, '', ?, NULL, 'msgpack', ?, '{}')",
+        ((f"thread-{i % threads}", f"{i:012d}", blob) for i in range(checkpoints)),
+    )
+    conn.executemany(
+        "INSERT INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value)"
+        " VALUES (?, '', ?, 'task', 0, 'messages', 'msgpack', ?)",
+        ((f"thread-{i % threads}", f"{i:012d}", blob) for i in range(checkpoints)),
+    )
+    conn.commit()
+    return conn
+
+
+def scan_threads(conn):
+    # The old view's query path
+    thread_ids = set()
+    for table in ["checkpoints", "writes"]:
+        for (thread_id,) in conn.execute(f"SELECT DISTINCT thread_id FROM {table}"):
+            thread_ids.add(thread_id)
+    return thread_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--checkpoints", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from rest_framework.test import APIRequestFactory, force_authenticate
+    from home.models import ThreadCatalog
+    from home.views import ThreadsListView
+
+    connection.creation.create_test_db(verbosity=0)
+    user = User.objects.create_user("bench")
+    ThreadCatalog.objects.bulk_create(
+        ThreadCatalog(thread_id=f"thread-{i}", user=user, title=f"thread {i}") for i in range(args.threads))
+
+    print(f"filling {args.checkpoints} checkpoints over {args.threads} threads ...")
+    conn = fill_checkpoints(db_path, args.checkpoints, args.threads)
+
+    before = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        scan_threads(conn)
+        before.append(time.perf_counter() - start)
+
+    factory = APIRequestFactory()
+    view = ThreadsListView.as_view()
+    after = []
+    for _ in range(args.requests):
+        request = factory.get("/v1/threads/", HTTP_HOST="localhost")
+        force_authenticate(request, user=user)
+        start = time.perf_counter()
+        response = view(request)
+        response.render()
+        after.append(time.perf_counter() - start)
+
+    report("before", before)
+    report("after", after)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Run every benchmark from the `backend/` directory, e.g.
+`python -m benchmarks.bench_registry`.
+"""
+
+import os
+import statistics
+import tempfile
+
+
+def setup_django(checkpoint_db: str = None) -> str:
+    """
+    Point the checkpointer at a scratch database and initialise Django.
+    Returns the checkpoint database path.
+    """
+    if checkpoint_db is None:
+        checkpoint_db = os.path.join(tempfile.mkdtemp(), "checkpoints.db")
+    os.environ["CHECKPOINT_DB"] = checkpoint_db
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+    import django
+    django.setup()
+    return checkpoint_db
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(label, samples, unit="ms", scale=1000):
+    print(f"{label:<12} p50={statistics.median(samples) * scale:9.3f} {unit}  "
+          f"p95={percentile(samples, 95) * scale:9.3f} {unit}  "
+          f"mean={statistics.mean(samples) * scale:9.3f} {unit}")
@@ -0,0 +1,135 @@
+"""
+Concurrent run/resume stress test of the checkpoint database.
+
+    python -m benchmarks.stress_checkpointer [--processes 4] [--threads 8] [--conversations 25]
+
+Each of `processes` worker processes (like gunicorn workers) runs `threads`
+threads, and every thread plays `conversations` LinkedIn conversations:
+run until the preview interrupt, read the state back as the history view
+does, then resume with "cancel". LLM calls are answered by a local fake, so
+the time is spent in the graph and the checkpointer.
+
+"before" is the old setup, a plain SqliteSaver on one shared connection with
+default settings; "after" is `PooledSqliteSaver`. Reported: conversations per
+second, latency, and how many calls failed with "database is locked".
+
+`--hold-lock N` adds a process that repeatedly holds the write lock for N
+seconds, as `manage.py checkpoints compact` does while it vacuums a large
+database; with N above the old 5 s default timeout, writers start failing.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import report, setup_django
+
+
+def worker(mode, db_path, threads, conversations, results):
+    # The nodes log every step; keep that out of the measurement
+    sys.stdout = open(os.devnull, "w")
+
+    from langchain_core.language_models import FakeListChatModel
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    from src.agent import graph, llm
+    from src.agent.checkpointer import PooledSqliteSaver
+
+    class FakeLLM(FakeListChatModel):
+        responses: list = []
+
+        def _call(self, messages, stop=None, run_manager=None, **kwargs):
+            prompt = messages[0].content
+            return "linkedin" if prompt.startswith("Classify") else "We shipped v2 today."
+
+    llm.PROVIDERS["groq"] = lambda **kwargs: FakeLLM(tags=kwargs.get("tags"))
+    llm.reset()
+
+    if mode == "before":
+        saver = SqliteSaver(sqlite3.connect(db_path, check_same_thread=False))
+    else:
+        saver = PooledSqliteSaver(db_path)
+    app = graph.create_workflow(saver)
+    graph.get_app = lambda name="default": app
+
+    def conversation(n):
+        thread_id = f"{os.getpid()}-{n}"
+        start = time.perf_counter()
+        try:
+            graph.run_workflow_api("linkedin topic: We shipped v2 today", 1, thread_id)
+            app.get_state({"configurable": {"thread_id": thread_id}})
+            graph.resume_workflow_api("cancel", thread_id)
+        except Exception as e:
+            return time.perf_counter() - start, "database is locked" in str(e), traceback.format_exc(limit=1)
+        return time.perf_counter() - start, False, None
+
+    with ThreadPoolExecutor(threads) as pool:
+        outcomes = list(pool.map(conversation, range(threads * conversations)))
+    results.put(outcomes)
+
+
+def lock_holder(db_path, hold, stop):
+    conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    while not stop.wait(0.5):
+        conn.execute("BEGIN IMMEDIATE")
+        time.sleep(hold)
+        conn.execute("COMMIT")
+    conn.close()
+
+
+def run(mode, processes, threads, conversations, hold):
+    db_path = os.path.join(tempfile.mkdtemp(), "checkpoints.db")
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    with sqlite3.connect(db_path) as conn:
+        SqliteSaver(conn).setup()
+
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=worker, args=(mode, db_path, threads, conversations, results))
+               for _ in range(processes)]
+    stop = multiprocessing.Event()
+    holder = multiprocessing.Process(target=lock_holder, args=(db_path, hold, stop)) if hold else None
+
+    start = time.perf_counter()
+    if holder:
+        holder.start()
+    for p in workers:
+        p.start()
+    outcomes = [o for _ in workers for o in results.get()]
+    for p in workers:
+        p.join()
+    elapsed = time.perf_counter() - start
+    if holder:
+        stop.set()
+        holder.join()
+
+    latencies = [o[0] for o in outcomes]
+    failed = [o for o in outcomes if o[2]]
+    locked = sum(1 for o in outcomes if o[1])
+    print(f"{mode:<12} {len(outcomes) / elapsed:8.1f} conversations/s  "
+          f"failed={len(failed)}  database is locked={locked}")
+    report(mode, latencies)
+    if failed:
+        print("  first failure:", failed[0][2].strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--conversations", type=int, default=25, help="per thread")
+    parser.add_argument("--hold-lock", type=float, default=0, help="seconds a competing writer holds the lock")
+    args = parser.parse_args()
+
+    setup_django()
+    multiprocessing.set_start_method("fork")
+    for mode in ("before", "after"):
+        run(mode, args.processes, args.threads, args.conversations, args.hold_lock)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from django.contrib import admin
-from .models import ServiceCredential
+from .models import ServiceCredential, ThreadCatalog
 # Register your models here.
-admin.site.register(ServiceCredential)
\ No newline at end of file
+admin.site.register(ServiceCredential)
+admin.site.register(ThreadCatalog)
\ No newline at end of file
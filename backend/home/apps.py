@@ -1,6 +1,30 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
+
+# manage.py commands that serve requests; others (migrate, shell, test,
+# checkpoints, ...) start without compiling the workflow
+SERVER_COMMANDS = {"runserver"}
+
+
+def serving() -> bool:
+    """
+    False when running a manage.py command other than the development server.
+    """
+    if os.path.basename(sys.argv[0]) != "manage.py":
+        return True  # gunicorn, uvicorn, daphne, ...
+    return len(sys.argv) > 1 and sys.argv[1] in SERVER_COMMANDS
 
 
 class HomeConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "home"
+
+    def ready(self):
+        # Compile the agent workflow once per process so the first request
+        # doesn't pay for graph construction and the checkpointer connection.
+        if getattr(settings, "AGENT_WARM_ON_STARTUP", True) and serving():
+            from src.agent.registry import warm
+            warm()
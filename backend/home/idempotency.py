@@ -0,0 +1,175 @@
+"""
+`Idempotency-Key` support for the workflow endpoints.
+
+A client that retries a POST (a timeout, a flaky network, a double submit)
+sends the same `Idempotency-Key` header again. The first request with a key
+claims an `IdempotencyRecord` row and runs; its response is stored on the
+row and replayed, with `Idempotent-Replayed: true`, to every retry within
+IDEMPOTENCY_TTL_SECONDS, so the LLM pipeline and its side effects (sending
+the email, posting to LinkedIn) run once. A retry that arrives while the
+first request is still running waits for it (up to IDEMPOTENCY_WAIT_SECONDS,
+then 409) instead of starting a second run.
+
+Keys are scoped to the user. Reusing a key with a different endpoint, query
+string or body is a client bug and answers 422. Server errors (5xx), 409s and
+429s are not stored, so a retry after one runs the request again.
+
+Settings (environment):
+    IDEMPOTENCY_TTL_SECONDS   how long responses are replayed (default 86400)
+    IDEMPOTENCY_WAIT_SECONDS  how long a retry waits for the original (default 60)
+"""
+
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from home.models import IdempotencyRecord
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_WAIT_SECONDS = 60
+# An unfinished record older than this belongs to a request that died
+STALE_AFTER = timedelta(minutes=15)
+# Answers that mean "try again later"; never replayed
+RETRYABLE = (status.HTTP_409_CONFLICT, status.HTTP_429_TOO_MANY_REQUESTS)
+# How often a retry re-reads a record owned by another process
+POLL_INTERVAL = 0.1
+
+
+class IdempotencyError(Exception):
+    """
+    The key cannot be used for this request; answer with `status`.
+    """
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+
+def ttl() -> timedelta:
+    return timedelta(seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", DEFAULT_TTL_SECONDS)))
+
+
+def wait_seconds() -> float:
+    return float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", DEFAULT_WAIT_SECONDS))
+
+
+# record id -> set once the request that owns it, running in this process, finished
+_done_events: Dict[int, threading.Event] = {}
+
+
+def fingerprint(request) -> str:
+    """
+    Hash of what makes two requests "the same": method, path, query and body.
+    """
+    query = sorted(request.query_params.lists())
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(json.dumps([request.method, request.path, query, body]).encode()).hexdigest()
+
+
+def claim(user_id: int, key: str, request_fingerprint: str,
+          wait: Optional[float] = None) -> Tuple[IdempotencyRecord, bool]:
+    """
+    (record, replay). With `replay` False the caller owns the new record and
+    must run the request, then call `finish`; otherwise the record holds the
+    response to return. Waits for a record that is still running.
+    """
+    deadline = time.monotonic() + (wait_seconds() if wait is None else wait)
+    while True:
+        now = timezone.now()
+        IdempotencyRecord.objects.filter(user_id=user_id, created_at__lt=now - ttl()).delete()
+        IdempotencyRecord.objects.filter(
+            user_id=user_id, key=key, response_code__isnull=True, created_at__lt=now - STALE_AFTER,
+        ).delete()
+        try:
+            with transaction.atomic():
+                record = IdempotencyRecord.objects.create(user_id=user_id, key=key,
+                                                          fingerprint=request_fingerprint)
+        except IntegrityError:
+            record = IdempotencyRecord.objects.filter(user_id=user_id, key=key).first()
+            if record is None:
+                continue  # the original failed and let go of the key; claim it
+        else:
+            _done_events[record.pk] = threading.Event()
+            return record, False
+
+        if record.fingerprint != request_fingerprint:
+            raise IdempotencyError(f"{HEADER} was already used for a different request",
+                                   status.HTTP_422_UNPROCESSABLE_ENTITY)
+        if record.response_code is not None:
+            return record, True
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise IdempotencyError("A request with this key is still being processed", status.HTTP_409_CONFLICT)
+        done = _done_events.get(record.pk)
+        if done is not None:
+            done.wait(remaining)
+        else:
+            time.sleep(min(POLL_INTERVAL, remaining))
+
+
+def finish(record: IdempotencyRecord, response: Optional[Response]) -> None:
+    """
+    Store `response` for replay, or give the key up when the request failed
+    (no response, 5xx, 409 or 429) so that a retry runs again.
+    """
+    try:
+        code = response.status_code if response is not None else None
+        if code is None or code >= 500 or code in RETRYABLE:
+            IdempotencyRecord.objects.filter(pk=record.pk).delete()
+        else:
+            IdempotencyRecord.objects.filter(pk=record.pk).update(
+                response=response.data, response_code=code, finished_at=timezone.now(),
+            )
+    finally:
+        done = _done_events.pop(record.pk, None)
+        if done is not None:
+            done.set()
+
+
+def idempotent(method):
+    """
+    Make a DRF `post` handler honour the `Idempotency-Key` header.
+    Requests without the header run as before.
+    """
+
+    @functools.wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return method(view, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            record, replay = claim(request.user.id, key, fingerprint(request))
+        except IdempotencyError as e:
+            return Response({"error": str(e)}, status=e.status)
+        if replay:
+            print(f"[IDEMPOTENCY] Replaying response for key {key}")
+            response = Response(record.response, status=record.response_code)
+            response[REPLAYED_HEADER] = "true"
+            return response
+
+        response = None
+        try:
+            response = method(view, request, *args, **kwargs)
+        finally:
+            finish(record, response)
+        return response
+
+    return wrapper
@@ -0,0 +1,218 @@
+"""
+Background execution of workflow runs and resumes.
+
+`submit()` records a `WorkflowJob` row and hands the work to a bounded
+thread pool (JOB_WORKERS threads per process), so the request that submitted
+it returns at once with the job id instead of waiting on every LLM and
+Google API call. The worker stores the body the synchronous endpoint would
+have returned; `wait()` long-polls a job until it finishes.
+
+Job rows live in the Django database, so any web process can report on any
+job. The pool and its queue-depth counters (`metrics()`) are per process.
+Each process refreshes the `heartbeat_at` of the jobs it holds every
+HEARTBEAT_INTERVAL; an active job whose heartbeat is STALE_AFTER old was lost
+with the process that queued it and is marked failed.
+A user may have JOB_MAX_PER_USER jobs queued or running at once, and a
+process queues at most JOB_QUEUE_LIMIT jobs that wait for a worker.
+"""
+
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from home.models import WorkflowJob
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_PER_USER = 2
+DEFAULT_QUEUE_LIMIT = 100
+# Longest a status request may wait for a job to finish
+MAX_WAIT_SECONDS = 30
+# How often a process refreshes the heartbeat of the jobs it holds
+HEARTBEAT_INTERVAL = 30
+# Active jobs without a heartbeat for this long were lost with their process
+STALE_AFTER = timedelta(seconds=4 * HEARTBEAT_INTERVAL)
+# How often a job running in another process is re-read while waiting
+POLL_INTERVAL = 0.5
+
+# Returns the response body and status code, or raises JobRejected
+Work = Callable[[], Tuple[Dict[str, Any], int]]
+
+
+class JobRejected(Exception):
+    """
+    The job was not accepted, or its work could not run yet (a busy thread,
+    the rate limits); answer with `status` and `retry_after` seconds.
+    """
+
+    def __init__(self, message: str, status: int, retry_after: int):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_heartbeat: Optional[threading.Thread] = None
+# job id -> set once that job, running in this process, has finished
+_done_events: Dict[str, threading.Event] = {}
+_counts = Counter()
+
+
+def worker_count() -> int:
+    return max(1, int(os.getenv("JOB_WORKERS", DEFAULT_WORKERS)))
+
+
+def max_jobs_per_user() -> int:
+    return int(os.getenv("JOB_MAX_PER_USER", DEFAULT_MAX_PER_USER))
+
+
+def queue_limit() -> int:
+    return int(os.getenv("JOB_QUEUE_LIMIT", DEFAULT_QUEUE_LIMIT))
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _heartbeat
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=worker_count(), thread_name_prefix="workflow-job")
+    if _heartbeat is None:
+        _heartbeat = threading.Thread(target=_beat, name="workflow-job-heartbeat", daemon=True)
+        _heartbeat.start()
+    return _executor
+
+
+def _beat() -> None:
+    """
+    Keep the heartbeat of this process's queued and running jobs fresh.
+    """
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL)
+        held = list(_done_events)
+        if not held:
+            continue
+        try:
+            WorkflowJob.objects.filter(pk__in=held, status__in=WorkflowJob.ACTIVE).update(
+                heartbeat_at=timezone.now())
+        except Exception as e:
+            print(f"[JOBS] Heartbeat failed - {e}")
+        finally:
+            close_old_connections()
+
+
+def _expire_stale(user_id: Optional[int]) -> None:
+    WorkflowJob.objects.filter(
+        user_id=user_id, status__in=WorkflowJob.ACTIVE, heartbeat_at__lt=timezone.now() - STALE_AFTER,
+    ).exclude(pk__in=list(_done_events)).update(
+        status=WorkflowJob.FAILED, error="Job lost: its worker process exited", finished_at=timezone.now(),
+    )
+
+
+def submit(work: Work, user_id: Optional[int], thread_id: str, kind: str) -> WorkflowJob:
+    """
+    Queue `work` (returning the response body and status code) on the
+    worker pool. Raises JobRejected when the user is at their concurrency
+    cap (429) or this process's queue is full (503).
+    """
+    _expire_stale(user_id)
+    active = WorkflowJob.objects.filter(user_id=user_id, status__in=WorkflowJob.ACTIVE).count()
+    if active >= max_jobs_per_user():
+        with _lock:
+            _counts["rejected"] += 1
+        raise JobRejected(f"Too many running jobs ({active}); wait for one to finish", 429, 1)
+
+    with _lock:
+        if _counts["queued"] >= queue_limit():
+            _counts["rejected"] += 1
+            raise JobRejected("Job queue is full, try again shortly", 503, 5)
+        _counts["queued"] += 1
+    try:
+        job = WorkflowJob.objects.create(user_id=user_id, thread_id=thread_id, kind=kind)
+        done = _done_events[str(job.id)] = threading.Event()
+        _get_executor().submit(_execute, job.id, work, done)
+    except Exception:
+        with _lock:
+            _counts["queued"] -= 1
+        raise
+    with _lock:
+        _counts["submitted"] += 1
+    print(f"[JOBS] Queued {kind} job {job.id} for thread {thread_id}")
+    return job
+
+
+def _execute(job_id, work: Work, done: threading.Event) -> None:
+    with _lock:
+        _counts["queued"] -= 1
+        _counts["running"] += 1
+    close_old_connections()
+    fields: Dict[str, Any] = {"status": WorkflowJob.FAILED}
+    try:
+        now = timezone.now()
+        WorkflowJob.objects.filter(pk=job_id).update(status=WorkflowJob.RUNNING, started_at=now, heartbeat_at=now)
+        try:
+            body, code = work()
+        except JobRejected as e:
+            print(f"[JOBS] Job {job_id} rejected - {e}")
+            fields.update(error=str(e), response_code=e.status, retry_after=e.retry_after)
+        except Exception as e:
+            print(f"[JOBS] Job {job_id} failed - {e}")
+            fields["error"] = str(e)
+        else:
+            status = WorkflowJob.INTERRUPT if body.get("status") == "interrupt" else WorkflowJob.DONE
+            fields = {"status": status, "response": body, "response_code": code}
+        WorkflowJob.objects.filter(pk=job_id).update(finished_at=timezone.now(), **fields)
+    finally:
+        with _lock:
+            _counts["running"] -= 1
+            _counts[fields["status"]] += 1
+        done.set()
+        _done_events.pop(str(job_id), None)
+        close_old_connections()
+
+
+def wait(job: WorkflowJob, timeout: float) -> WorkflowJob:
+    """
+    The job once it has finished, or as it is after `timeout` seconds.
+    """
+    deadline = time.monotonic() + min(timeout, MAX_WAIT_SECONDS)
+    while job.status in WorkflowJob.ACTIVE and (remaining := deadline - time.monotonic()) > 0:
+        done = _done_events.get(str(job.pk))
+        if done is not None:
+            done.wait(remaining)
+        else:
+            # Running in another process (or just finished here)
+            time.sleep(min(POLL_INTERVAL, remaining))
+        job.refresh_from_db()
+    return job
+
+
+def queue_position(job: WorkflowJob) -> int:
+    """
+    Queued jobs submitted before this one (0 when it is next).
+    """
+    return WorkflowJob.objects.filter(status=WorkflowJob.QUEUED, created_at__lt=job.created_at).count()
+
+
+def metrics() -> Dict[str, int]:
+    """
+    Worker pool size, jobs waiting for / holding a worker in this process,
+    and totals since it started.
+    """
+    with _lock:
+        counts = dict(_counts)
+    return {
+        "workers": worker_count(),
+        "queue_limit": queue_limit(),
+        "queued": counts.get("queued", 0),
+        "running": counts.get("running", 0),
+        "submitted": counts.get("submitted", 0),
+        "rejected": counts.get("rejected", 0),
+        "interrupted": counts.get(WorkflowJob.INTERRUPT, 0),
+        "done": counts.get(WorkflowJob.DONE, 0),
+        "failed": counts.get(WorkflowJob.FAILED, 0),
+    }
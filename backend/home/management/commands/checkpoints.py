@@ -0,0 +1,131 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.models import ThreadCatalog
+from src.agent import catalog, retention, serde
+from src.agent.checkpointer import dedup_messages, iter_payloads, recompress, reshard
+from src.agent.registry import checkpoint_db_path, checkpoint_db_paths
+
+
+class Command(BaseCommand):
+    help = ("Report checkpoint storage, apply the retention policy and compact the database, "
+            "move checkpoints into a new shard layout, (re)compress stored checkpoints, "
+            "move inline message lists of old checkpoints into the message store, "
+            "or add thread catalog rows for threads that only exist as checkpoints.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["stats", "compact", "reshard", "recompress", "train-dict", "dedup",
+                                                   "catalog"])
+        parser.add_argument("--db", action="append",
+                            help="Checkpoint database file (repeatable; default: every configured shard)")
+        parser.add_argument("--top", type=int, default=20, help="Threads to list in stats (0 for all)")
+        parser.add_argument("--keep-last", type=int, help="Checkpoints kept per thread")
+        parser.add_argument("--ttl-days", type=float, help="Delete threads idle for longer")
+        parser.add_argument("--interrupt-ttl-days", type=float,
+                            help="Delete threads waiting on an interrupt for longer")
+        parser.add_argument("--shards", type=int, help="reshard: number of shards to write")
+        parser.add_argument("--dict-dir", default="checkpoint_dicts", help="train-dict: output directory")
+        parser.add_argument("--dict-size", type=int, default=64 * 1024, help="train-dict: dictionary bytes")
+        parser.add_argument("--samples", type=int, default=5000, help="train-dict: payloads sampled per table")
+
+    def handle(self, *args, **options):
+        paths = options["db"] or checkpoint_db_paths()
+
+        if options["action"] == "reshard":
+            self.reshard(paths, options["shards"])
+            return
+        if options["action"] == "train-dict":
+            self.train_dict(paths, options)
+            return
+
+        for path in paths:
+            if options["action"] == "compact":
+                self.compact(path, options)
+            elif options["action"] == "recompress":
+                self.recompress(path)
+            elif options["action"] == "dedup":
+                self.dedup(path)
+            elif options["action"] == "catalog":
+                self.catalog(path)
+            else:
+                self.stats(path, options["top"])
+
+    def vacuum(self, path):
+        conn = retention.connect(path)
+        try:
+            retention.enable_incremental_vacuum(conn)
+            retention.incremental_vacuum(conn)
+        finally:
+            conn.close()
+
+    def dedup(self, path):
+        before = retention.file_bytes(path)
+        rewritten = dedup_messages(path)
+        self.vacuum(path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Deduplicated {path}: {rewritten} checkpoints rewritten, "
+            f"{before} -> {retention.file_bytes(path)} bytes"))
+
+    def catalog(self, path):
+        added = catalog.backfill(path)
+        self.stdout.write(self.style.SUCCESS(f"Cataloged {path}: {added} threads added"))
+
+    def recompress(self, path):
+        before = retention.file_bytes(path)
+        rewritten = recompress(path, serde.get_serde())
+        self.vacuum(path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Recompressed {path}: {rewritten['checkpoints']} checkpoints, {rewritten['writes']} writes "
+            f"and {rewritten['message_blobs']} messages, "
+            f"{before} -> {retention.file_bytes(path)} bytes"))
+
+    def train_dict(self, paths, options):
+        codec = serde.get_serde()
+        samples = [codec.unpack(type_, data)[1]
+                   for path in paths for type_, data in iter_payloads(path, options["samples"])]
+        if len(samples) < 100:
+            raise CommandError(f"Only {len(samples)} stored payloads; run some conversations first")
+        out = serde.train_dictionary(samples, options["dict_size"], options["dict_dir"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Trained on {len(samples)} payloads -> {out}. "
+            f"Set CHECKPOINT_ZSTD_DICT={out} and run `checkpoints recompress`."))
+
+    def reshard(self, sources, shards):
+        if not shards:
+            raise CommandError("--shards is required")
+        missing = [p for p in sources if not os.path.exists(p)]
+        if missing:
+            raise CommandError(f"No such checkpoint database: {', '.join(missing)}")
+        try:
+            copied = reshard(sources, checkpoint_db_path(), shards)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Copied {copied['checkpoints']} checkpoints and {copied['writes']} writes into {shards} shards. "
+            f"Restart with CHECKPOINT_SHARDS={shards}, then remove {', '.join(sources)}."))
+
+    def compact(self, path, options):
+        report = retention.compact(path, options["keep_last"], options["ttl_days"],
+                                   options["interrupt_ttl_days"])
+        ThreadCatalog.objects.filter(thread_id__in=report["expired_threads"]).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {path}: {len(report['expired_threads'])} expired threads, "
+            f"{report['pruned_checkpoints']} checkpoints pruned, "
+            f"{report['bytes_before']} -> {report['bytes_after']} bytes"))
+
+    def stats(self, path, top):
+        stats = retention.stats(path, top or None)
+        self.stdout.write(f"Checkpoint database {path}")
+        self.stdout.write(f"  threads             {stats['thread_count']}")
+        self.stdout.write(f"  checkpoints         {stats['checkpoints']} ({stats['checkpoint_bytes']} bytes)")
+        self.stdout.write(f"  writes              {stats['writes']} ({stats['write_bytes']} bytes)")
+        self.stdout.write(f"  stored messages     {stats['messages']} ({stats['message_bytes']} bytes)")
+        self.stdout.write(f"  on disk             {stats['file_bytes']} bytes incl. WAL "
+                          f"({stats['free_bytes']} free)")
+        self.stdout.write(f"  incremental vacuum  {'on' if stats['incremental_vacuum'] else 'off'}")
+        if stats["threads"]:
+            self.stdout.write("")
+            self.stdout.write(f"  {'thread':<40} {'checkpoints':>11} {'writes':>7} {'bytes':>12}")
+            for t in stats["threads"]:
+                self.stdout.write(f"  {t['thread_id']:<40} {t['checkpoints']:>11} {t['writes']:>7} {t['bytes']:>12}")
@@ -0,0 +1,37 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from src.agent import intent_classifier
+
+
+class Command(BaseCommand):
+    help = "Train or evaluate the local intent classifier used before the LLM fallback."
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["train", "eval"])
+        parser.add_argument("--dataset", help="Labeled JSONL set (default: bundled train/eval set)")
+        parser.add_argument("--model", help="Model file (default: INTENT_MODEL_PATH or the bundled path)")
+        parser.add_argument("--threshold", type=float, help="Confidence threshold for the fallback rate")
+
+    def handle(self, *args, **options):
+        if options["model"]:
+            # get_model() reads the path from the environment
+            os.environ["INTENT_MODEL_PATH"] = options["model"]
+
+        if options["action"] == "train":
+            dataset = options["dataset"] or intent_classifier.DEFAULT_TRAIN_SET
+            intent_classifier.train(dataset)
+            self.stdout.write(self.style.SUCCESS(
+                f"Trained on {dataset} -> {intent_classifier.model_path()}"))
+            return
+
+        dataset = options["dataset"] or intent_classifier.DEFAULT_EVAL_SET
+        report = intent_classifier.evaluate(dataset, options["threshold"])
+        self.stdout.write(f"Evaluated on {dataset}")
+        self.stdout.write(f"  samples             {report['samples']}")
+        self.stdout.write(f"  threshold           {report['threshold']:.2f}")
+        self.stdout.write(f"  accuracy            {report['accuracy']:.1%}")
+        self.stdout.write(f"  fallback rate       {report['fallback_rate']:.1%}")
+        self.stdout.write(f"  confident accuracy  {report['confident_accuracy']:.1%}")
+        self.stdout.write(f"  latency p50 / p95   {report['p50_ms']:.2f} / {report['p95_ms']:.2f} ms")
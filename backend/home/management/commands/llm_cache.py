@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from src.agent import llm_cache
+
+
+class Command(BaseCommand):
+    help = "Show, purge or clear the persistent LLM response cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["stats", "purge", "clear"])
+
+    def handle(self, *args, **options):
+        cache = llm_cache.get_cache()
+        if cache is None:
+            raise CommandError("The LLM response cache is disabled (LLM_CACHE=0)")
+
+        if options["action"] == "clear":
+            cache.clear()
+            self.stdout.write(self.style.SUCCESS(f"Cleared {cache.path}"))
+            return
+        if options["action"] == "purge":
+            removed = cache.purge_expired()
+            self.stdout.write(self.style.SUCCESS(f"Removed {removed} expired entries from {cache.path}"))
+            return
+
+        stats = cache.stats()
+        self.stdout.write(f"LLM response cache {cache.path}")
+        self.stdout.write(f"  entries             {stats['entries']} (max {cache.max_entries})")
+        self.stdout.write(f"  stored              {stats['value_bytes']} bytes")
+        self.stdout.write(f"  hits on entries     {stats['stored_hits']}")
+        self.stdout.write(f"  ttl                 {cache.ttl:.0f} s")
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("home", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ThreadCatalog",
+            fields=[
+                (
+                    "thread_id",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                ("title", models.CharField(blank=True, max_length=120)),
+                ("last_intent", models.CharField(blank=True, max_length=32)),
+                ("pending_interrupt", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("last_activity", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="threads",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-last_activity"],
+                        name="home_thread_user_id_78726e_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:46
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0002_thread_catalog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkflowJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('thread_id', models.CharField(max_length=255)),
+                ('kind', models.CharField(max_length=16)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('interrupt', 'Waiting for input'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=16)),
+                ('response', models.JSONField(blank=True, null=True)),
+                ('response_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='workflow_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'status'], name='home_workfl_user_id_660d3c_idx'), models.Index(fields=['status', 'created_at'], name='home_workfl_status_9bdeaf_idx')],
+            },
+        ),
+    ]
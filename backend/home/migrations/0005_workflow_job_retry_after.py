@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0004_idempotency_record'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflowjob',
+            name='retry_after',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
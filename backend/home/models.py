@@ -1,5 +1,8 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -29,3 +32,98 @@ class ServiceCredential(models.Model):
 
     def __str__(self):
         return f"{self.user_id} - {self.service}"
+
+
+class ThreadCatalog(models.Model):
+    """
+    One row per conversation thread, kept up to date after every graph run
+    so thread lists never have to scan the checkpoint tables.
+    """
+    thread_id = models.CharField(max_length=255, primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="threads", null=True)
+
+    title = models.CharField(max_length=120, blank=True)
+    last_intent = models.CharField(max_length=32, blank=True)
+    pending_interrupt = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_activity = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-last_activity"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.thread_id}"
+
+
+class WorkflowJob(models.Model):
+    """
+    A workflow run or resume executed by the background worker pool
+    (home/jobs.py). Holds the response body once the run finished.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    INTERRUPT = "interrupt"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (INTERRUPT, "Waiting for input"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+    ACTIVE = (QUEUED, RUNNING)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="workflow_jobs", null=True)
+    thread_id = models.CharField(max_length=255)
+    kind = models.CharField(max_length=16)  # "run" or "resume"
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+
+    response = models.JSONField(null=True, blank=True)
+    response_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    # Set when the run met a busy thread or the rate limits (409 / 429)
+    retry_after = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the process that queued the job while it is queued or running
+    heartbeat_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "status"]),
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.kind} {self.thread_id} ({self.status})"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    The response to a request sent with an `Idempotency-Key` header, replayed
+    to retries of that request (home/idempotency.py). `response` stays empty
+    while the original request is still running.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="idempotency_records")
+    key = models.CharField(max_length=255)
+    # Hash of the endpoint, query string and body the key was first used with
+    fingerprint = models.CharField(max_length=64)
+
+    response = models.JSONField(null=True, blank=True)
+    response_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("user", "key")
+        indexes = [
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.key}"
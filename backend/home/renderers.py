@@ -0,0 +1,34 @@
+"""
+JSON renderer for the DRF views, backed by orjson.
+
+orjson encodes dicts, lists, strings, numbers, datetimes and UUIDs natively
+and several times faster than the stdlib encoder behind DRF's JSONRenderer;
+`_default` covers the few other types DRF's encoder knows about.
+"""
+
+from decimal import Decimal
+
+import orjson
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+
+
+def _default(obj):
+    if isinstance(obj, (Decimal, Promise)):
+        return str(obj)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "__iter__"):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
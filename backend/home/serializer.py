@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from .models import ThreadCatalog
 
 class UserDetailsSerializer(serializers.ModelSerializer):
     class Meta:
@@ -27,4 +28,9 @@ class RegisterSerializer(serializers.ModelSerializer):
 
         user.save()
         return user
-    
\ No newline at end of file
+
+
+class ThreadCatalogSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ThreadCatalog
+        fields = ["thread_id", "title", "last_intent", "pending_interrupt", "created_at", "last_activity"]
@@ -1,3 +1,1615 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from home import jobs
+from home.models import IdempotencyRecord, ThreadCatalog, WorkflowJob
+from src.agent import (
+    checkpointer, graph, history, intent_classifier, llm, llm_cache, message_store, ratelimit, registry, retention,
+    serde, thread_locks,
+)
+from src.agent.checkpointer import PooledSqliteSaver
+from src.agent.nodes import slots
+from src.agent.nodes.intent import detect_intent, intent_node
+
+# Tests use a fake model that answers from a script and records which
+# prompt it was called with, so the number of provider calls can be checked.
+
+# First words of each system prompt -> label for the call
+PROMPT_LABELS = [
+    ("Classify the user's request", "intent"),
+    ("Route the user's request to a channel", "route_extract"),
+    ("You extract email details from a single user input", "email_extract"),
+    ("You extract the remaining email details", "email_extract_rest"),
+    ("You extract email details from a single HUMAN FEEDBACK", "email_feedback"),
+    ("You generate a Gmail-ready draft", "email_draft"),
+    ("Edit the email based on human feedback", "email_edit"),
+    ("You are a strict extractor for LinkedIn", "linkedin_extract"),
+    ("Extract LinkedIn information from human feedback", "linkedin_feedback"),
+    ("You write complete, high-signal LinkedIn posts", "linkedin_draft"),
+    ("You are an expert LinkedIn copy editor", "linkedin_edit"),
+]
+
+
+class ScriptedLLM(FakeListChatModel):
+    """
+    Answers from `script[label]` in order and counts calls per label.
+    """
+
+    script: Any = None
+    calls: Any = None
+    responses: list = []
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        text = messages[0].content.strip()
+        label = next((name for prefix, name in PROMPT_LABELS if text.startswith(prefix)), "unknown")
+        self.calls[label] += 1
+        return self.script[label].pop(0)
+
+    # Streamed calls (the SSE endpoints) yield the scripted answer word by word
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for word in re.findall(r"\S+\s*", self._call(messages)):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for chunk in self._stream(messages, stop, run_manager, **kwargs):
+            yield chunk
+
+
+class WorkflowTestCase(SimpleTestCase):
+    """
+    Runs the real graph on an in-memory checkpointer with ScriptedLLM
+    standing in for every model handed out by the LLM registry.
+    """
+
+    intent_threshold = "2"
+    # Tests without a database skip the thread catalog writes
+    record_threads = False
+
+    def setUp(self):
+        self.calls = Counter()
+        self.script = {}
+        self.app = graph.create_workflow(MemorySaver())
+        self.async_app = graph.create_workflow(MemorySaver(), use_async=True)
+
+        def factory(*args, **kwargs):
+            return ScriptedLLM(script=self.script, calls=self.calls, tags=kwargs.get("tags"))
+
+        llm.reset()
+        self.addCleanup(llm.reset)
+        patches = [mock.patch.dict(llm.PROVIDERS, {"groq": factory})]
+        patches.append(mock.patch("src.agent.graph.get_app", return_value=self.app))
+        patches.append(mock.patch("src.agent.graph.aget_app", mock.AsyncMock(return_value=self.async_app)))
+        if not self.record_threads:
+            patches.append(mock.patch("src.agent.graph.record_run"))
+            patches.append(mock.patch("src.agent.graph.arecord_run", mock.AsyncMock()))
+        # Thread leases live next to the checkpoints; keep them out of the working tree
+        lease_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(lease_dir.cleanup)
+        self.addCleanup(thread_locks.reset)
+        # Route through the LLM so every test scripts (and counts) the intent call
+        # and count every call instead of answering repeats from the response cache
+        patches.append(mock.patch.dict(os.environ, {
+            "INTENT_CONFIDENCE_THRESHOLD": self.intent_threshold,
+            "LLM_CACHE": "0",
+            "CHECKPOINT_DB": os.path.join(lease_dir.name, "checkpoints.db"),
+        }))
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def take_calls(self):
+        calls = dict(self.calls)
+        self.calls.clear()
+        return calls
+
+
+class SinglePassResumeTests(WorkflowTestCase):
+
+    def test_each_llm_call_runs_once_per_resume(self):
+        self.script.update({
+            "intent": ["email"],
+            "email_extract": [json.dumps({"to": "", "subject": "", "body": "I will be late today",
+                                          "sender_name": "", "missing": ["to", "subject"]})],
+            "email_feedback": [json.dumps({"to": "bob@example.com", "subject": "", "body": "",
+                                           "sender_name": "bob", "missing": ["subject", "body"]})],
+            "email_draft": [json.dumps({"to": "bob@example.com", "subject": "Running late",
+                                        "body": "Hi Bob, I will be late today."})],
+            "email_edit": [json.dumps({"to": "bob@example.com", "subject": "Running late",
+                                       "body": "Hi Bob, I will be 10 minutes late today."})],
+        })
+
+        result = graph.run_workflow_api("mail that I will be late today", 1, "t-resume")
+        self.assertEqual(result["status"], "interrupt")
+        self.assertEqual(self.take_calls(), {"intent": 1, "email_extract": 1})
+
+        with mock.patch.object(self.app, "get_state", wraps=self.app.get_state) as get_state:
+            result = graph.resume_workflow_api("send it to bob@example.com", "t-resume")
+            self.assertEqual(result["status"], "interrupt")
+            self.assertIn("Running late", result["state"]["preview"])
+            self.assertEqual(self.take_calls(), {"email_feedback": 1, "email_draft": 1})
+
+            result = graph.resume_workflow_api("edit", "t-resume")
+            self.assertEqual(result["status"], "interrupt")
+            self.assertEqual(self.take_calls(), {})
+
+            result = graph.resume_workflow_api("say 10 minutes", "t-resume")
+            self.assertEqual(result["status"], "interrupt")
+            self.assertIn("10 minutes", result["state"]["body"])
+            self.assertEqual(self.take_calls(), {"email_edit": 1})
+
+            result = graph.resume_workflow_api("cancel", "t-resume")
+            self.assertEqual(result["error"], "Workflow cancelled by user")
+            self.assertEqual(self.take_calls(), {})
+
+            get_state.assert_not_called()
+
+
+class MissingFieldDialogueTests(WorkflowTestCase):
+    """
+    Completed LLM stages are checkpointed as tasks, so answering a
+    missing-field prompt only pays for processing the new answer.
+    """
+
+    def email_script(self):
+        def fields(to="", body=""):
+            return json.dumps({"to": to, "subject": "", "body": body, "sender_name": "",
+                               "missing": [k for k, v in (("to", to), ("body", body)) if not v]})
+        self.script.update({
+            "intent": ["email"],
+            "email_extract": [fields()],
+            "email_feedback": [fields(), fields(body="I will be late today")],
+            "email_draft": [json.dumps({"to": "bob@example.com", "subject": "Running late",
+                                        "body": "Hi Bob, I will be late today."})],
+        })
+
+    def linkedin_script(self):
+        def topic(text=""):
+            return json.dumps({"topic": text, "tone": "", "length": "", "audience": "",
+                               "hashtags": [], "mentions": [], "urls": [], "missing": [] if text else ["topic"]})
+        self.script.update({
+            "intent": ["linkedin"],
+            "linkedin_extract": [topic()],
+            "linkedin_feedback": [topic(), topic(), topic("Shipping agents to production")],
+            "linkedin_draft": ["Lessons from shipping agents to production."],
+        })
+
+    def run_dialogue(self, prompt, answers, run, resume):
+        result = run(prompt, 1, "t-dialogue")
+        rounds = [self.take_calls()]
+        for answer in answers:
+            self.assertEqual(result["status"], "interrupt")
+            result = resume(answer, "t-dialogue")
+            rounds.append(self.take_calls())
+        return result, rounds
+
+    def check_email(self, run, resume):
+        self.email_script()
+        result, rounds = self.run_dialogue(
+            "send a mail", ["not sure yet", "tell them I will be late today", "bob@example.com"], run, resume)
+        self.assertEqual(rounds, [
+            {"intent": 1, "email_extract": 1},
+            {"email_feedback": 1},
+            {"email_feedback": 1},
+            # a bare address is filled in without the LLM
+            {"email_draft": 1},
+        ])
+        self.assertIn("Running late", result["state"]["preview"])
+
+    def check_linkedin(self, run, resume):
+        self.linkedin_script()
+        result, rounds = self.run_dialogue(
+            "write a linkedin post", ["something", "about work", "Shipping agents to production"], run, resume)
+        self.assertEqual(rounds, [
+            {"intent": 1, "linkedin_extract": 1},
+            {"linkedin_feedback": 1},
+            {"linkedin_feedback": 1},
+            {"linkedin_feedback": 1, "linkedin_draft": 1},
+        ])
+        self.assertIn("Lessons from shipping agents", result["state"]["preview"])
+
+    def test_email_dialogue(self):
+        self.check_email(graph.run_workflow_api, graph.resume_workflow_api)
+
+    def test_linkedin_dialogue(self):
+        self.check_linkedin(graph.run_workflow_api, graph.resume_workflow_api)
+
+    def test_async_email_dialogue(self):
+        self.check_email(lambda *a: asyncio.run(graph.arun_workflow_api(*a)),
+                         lambda *a: asyncio.run(graph.aresume_workflow_api(*a)))
+
+    def test_async_linkedin_dialogue(self):
+        self.check_linkedin(lambda *a: asyncio.run(graph.arun_workflow_api(*a)),
+                            lambda *a: asyncio.run(graph.aresume_workflow_api(*a)))
+
+
+class DeltaUpdateTests(WorkflowTestCase):
+    """
+    Nodes return only the state keys they changed, so the conversation is
+    not written again at every step.
+    """
+
+    def written_channels(self, thread_id):
+        config = {"configurable": {"thread_id": thread_id}}
+        return [{channel for _, channel, _ in item.pending_writes
+                 if ":" not in channel and not channel.startswith("__")}
+                for item in reversed(list(self.app.checkpointer.list(config)))]
+
+    def test_intent_update_holds_only_the_intent(self):
+        state = {"user_prompt": "mail bob", "messages": [HumanMessage("mail bob")], "to": "old@example.com"}
+        with mock.patch("src.agent.nodes.intent.classify", return_value=("email", 0.99)), \
+                mock.patch.dict(os.environ, {"INTENT_CONFIDENCE_THRESHOLD": "0.5"}):
+            command = intent_node(state)
+        self.assertEqual(command.goto, "compose_email")
+        self.assertEqual(command.update, {"intent": "email", "slots_prefilled": False})
+        self.assertEqual(state["to"], "old@example.com")
+
+    def test_messages_are_written_only_with_the_input(self):
+        self.script.update({
+            "intent": ["email"],
+            "email_extract": [json.dumps({"to": "bob@example.com", "subject": "Running late",
+                                          "body": "I will be late today", "sender_name": "bob", "missing": []})],
+        })
+        graph.run_workflow_api("mail bob that I will be late today", 1, "t-delta")
+        graph.resume_workflow_api("cancel", "t-delta")
+
+        steps = self.written_channels("t-delta")
+        self.assertEqual(steps[0], {"messages", "user_prompt", "user_id"})
+        self.assertEqual(steps[1], {"intent", "slots_prefilled"})
+        self.assertTrue(all("messages" not in channels for channels in steps[1:]))
+        self.assertEqual(steps[-2], {"approved", "awaiting", "error"})
+
+    def test_linkedin_edit_updates_the_post(self):
+        self.script.update({
+            "intent": ["linkedin"],
+            "linkedin_extract": [json.dumps({"topic": "Shipping agents to production", "missing": []})],
+            "linkedin_draft": ["Lessons from shipping agents to production."],
+            "linkedin_edit": ["Three lessons from shipping agents to production."],
+        })
+        graph.run_workflow_api("write a linkedin post about agents #ai", 1, "t-li-edit")
+        graph.resume_workflow_api("edit", "t-li-edit")
+        result = graph.resume_workflow_api("make it three lessons", "t-li-edit")
+
+        self.assertEqual(result["state"]["generated_text"], "Three lessons from shipping agents to production.")
+        self.assertEqual(result["state"]["hashtags"], ["#ai"])
+        self.assertNotIn("text", result["state"])
+
+
+class IntentClassifierTests(WorkflowTestCase):
+
+    intent_threshold = str(intent_classifier.DEFAULT_THRESHOLD)
+
+    def test_eval_set(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            intent_classifier.train(path=os.path.join(tmp, "model.joblib"))
+            self.assertTrue(os.path.exists(os.path.join(tmp, "model.joblib")))
+        report = intent_classifier.evaluate()
+        self.assertGreaterEqual(report["accuracy"], 0.9)
+        self.assertGreaterEqual(report["confident_accuracy"], 0.95)
+        self.assertLessEqual(report["fallback_rate"], 0.2)
+
+    def test_confident_prompt_skips_llm(self):
+        self.script.update({
+            "linkedin_extract": [json.dumps({"topic": "AI agents in production", "missing": []})],
+            "linkedin_draft": ["Lessons from shipping AI agents."],
+        })
+        result = graph.run_workflow_api("write a linkedin post about ai agents in production", 1, "t-intent")
+        self.assertEqual(result["state"]["intent"], "linkedin")
+        self.assertNotIn("intent", self.take_calls())
+
+    def test_low_confidence_falls_back_to_llm(self):
+        self.script.update({"intent": ["calendar"]})
+        with mock.patch("src.agent.nodes.intent.classify", return_value=("chat", 0.3)):
+            state = detect_intent({"user_prompt": "friday?"})
+        self.assertEqual(state["intent"], "calendar")
+        self.assertEqual(self.take_calls(), {"intent": 1})
+
+
+class RouteAndExtractTests(WorkflowTestCase):
+    """
+    With INTENT_ROUTE_AND_EXTRACT on, one LLM call both routes and fills the
+    channel's fields; the compose node skips its own extraction.
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.dict(os.environ, {"INTENT_ROUTE_AND_EXTRACT": "1"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def route(self, intent, slots):
+        self.script["route_extract"] = [json.dumps({"intent": intent, "slots": slots})]
+
+    def test_email_first_turn_is_one_call(self):
+        self.route("email", {"to": "bob@example.com", "subject": "Running late",
+                             "body": "I will be 10 minutes late today.", "sender_name": "bob", "missing": []})
+        result = graph.run_workflow_api("mail bob@example.com that I'm 10 minutes late", 1, "t-route")
+        self.assertEqual(result["status"], "interrupt")
+        self.assertIn("To: bob@example.com", result["state"]["preview"])
+        self.assertEqual(self.take_calls(), {"route_extract": 1})
+
+    def test_linkedin_missing_topic_still_asks(self):
+        self.route("linkedin", {"topic": "", "missing": ["topic"]})
+        self.script["linkedin_feedback"] = [json.dumps({"topic": "Shipping agents to production"})]
+        self.script["linkedin_draft"] = ["Lessons from shipping agents to production."]
+
+        result = graph.run_workflow_api("write a linkedin post", 1, "t-route")
+        self.assertIn("Missing LinkedIn information", result["interrupt"]["message"])
+        self.assertEqual(self.take_calls(), {"route_extract": 1})
+
+        result = graph.resume_workflow_api("Shipping agents to production", "t-route")
+        self.assertEqual(self.take_calls(), {"linkedin_feedback": 1, "linkedin_draft": 1})
+
+    def test_calendar_slots_reach_the_tool(self):
+        self.route("calendar", {"summary": "Team Sync", "description": "project updates",
+                                "start": "2025-10-12T10:00:00+05:30", "end": "2025-10-12T11:00:00+05:30"})
+        with mock.patch("src.agent.nodes.compose_cal_events.set_event_tool") as tool:
+            tool.invoke.return_value = {"status": "success", "message": "created"}
+            graph.run_workflow_api("team sync tomorrow 10 to 11", 1, "t-route")
+        self.assertEqual(tool.invoke.call_args[0][0]["summary"], "Team Sync")
+        self.assertEqual(self.take_calls(), {"route_extract": 1})
+
+    def test_async_email_first_turn_is_one_call(self):
+        self.route("email", {"to": "bob@example.com", "subject": "Running late",
+                             "body": "I will be 10 minutes late today.", "sender_name": "bob", "missing": []})
+        result = asyncio.run(graph.arun_workflow_api("mail bob that I'm late", 1, "t-route"))
+        self.assertEqual(result["status"], "interrupt")
+        self.assertEqual(self.take_calls(), {"route_extract": 1})
+
+
+class SlotPrefillTests(WorkflowTestCase):
+
+    def test_prefill_email(self):
+        self.assertEqual(slots.prefill_email("send mail to krishnabudumuru7@gmail.com"),
+                         {"to": "krishnabudumuru7@gmail.com", "sender_name": "krishnabudumuru"})
+        self.assertEqual(
+            slots.prefill_email("email subject: Invoice body: please find it attached. to: jane.doe@example.com"),
+            {"to": "jane.doe@example.com", "subject": "Invoice", "body": "please find it attached.",
+             "sender_name": "jane"})
+        self.assertEqual(slots.prefill_email("write an email to my manager"), {})
+
+    def test_prefill_linkedin(self):
+        found = slots.prefill_linkedin(
+            "post about #AI and #ML with @satya, see https://example.com/blog#top. cc bob@x.com")
+        self.assertEqual(found, {"hashtags": ["#AI", "#ML"], "mentions": ["@satya"],
+                                 "urls": ["https://example.com/blog#top"]})
+        self.assertEqual(slots.prefill_linkedin("topic: We shipped v2 today!")["topic"], "We shipped v2 today!")
+
+    def test_bare_address(self):
+        self.assertEqual(slots.bare_address(" to: Bob@Example.com. "), "Bob@Example.com")
+        self.assertIsNone(slots.bare_address("send it to bob@example.com"))
+
+    def test_email_markers_skip_extraction(self):
+        self.script["intent"] = ["email"]
+        result = graph.run_workflow_api(
+            "mail to: bob@example.com subject: Running late body: I will be 10 minutes late today.", 1, "t-slots")
+        self.assertEqual(result["status"], "interrupt")
+        self.assertIn("Subject: Running late", result["state"]["preview"])
+        self.assertEqual(self.take_calls(), {"intent": 1})
+
+    def test_email_address_narrows_extraction(self):
+        self.script["intent"] = ["email"]
+        self.script["email_extract_rest"] = [json.dumps({"subject": "Running late", "body": "I will be late today.",
+                                                         "missing": []})]
+        result = graph.run_workflow_api("tell bob@example.com I will be late today", 1, "t-slots")
+        self.assertEqual(result["state"]["to"], "bob@example.com")
+        self.assertEqual(result["state"]["sender_name"], "bob")
+        self.assertEqual(self.take_calls(), {"intent": 1, "email_extract_rest": 1})
+
+    def test_linkedin_tags_come_from_text(self):
+        self.script.update({
+            "intent": ["linkedin"],
+            # a wrong hashtag from the model must not win over the exact match
+            "linkedin_extract": [json.dumps({"topic": "We shipped v2", "hashtags": ["#wrong"], "missing": []})],
+            "linkedin_draft": ["We shipped v2 today."],
+        })
+        result = graph.run_workflow_api("share on linkedin that we shipped v2 #launch @team", 1, "t-slots")
+        self.assertIn("Mentions: @team\n\n#launch", result["state"]["preview"])
+        self.assertNotIn("#wrong", result["state"]["preview"])
+        self.assertEqual(self.take_calls(), {"intent": 1, "linkedin_extract": 1, "linkedin_draft": 1})
+
+    def test_linkedin_topic_marker_skips_extraction(self):
+        self.script.update({"intent": ["linkedin"], "linkedin_draft": ["We shipped v2 today."]})
+        graph.run_workflow_api("linkedin topic: We shipped v2 today #launch", 1, "t-slots")
+        self.assertEqual(self.take_calls(), {"intent": 1, "linkedin_draft": 1})
+
+
+class LLMRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        llm.reset()
+        self.addCleanup(llm.reset)
+        self.built = []
+
+        def factory(**kwargs):
+            self.built.append(kwargs)
+            return mock.Mock(name=kwargs["model"])
+
+        for patcher in (mock.patch.dict(llm.PROVIDERS, {"groq": factory}),
+                        mock.patch.dict(os.environ, {"LLM_CACHE": "0"})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_clients_are_shared(self):
+        self.assertIs(llm.get_llm("email_extract"), llm.get_llm("email_extract"))
+        # same provider/model/temperature -> same client
+        self.assertIs(llm.get_llm("email_extract"), llm.get_llm("email_feedback"))
+        self.assertIsNot(llm.get_llm("email_extract"), llm.get_llm("email_draft"))
+        self.assertEqual(len(self.built), 2)
+        self.assertIs(self.built[0]["http_client"], self.built[1]["http_client"])
+
+    def test_tags_are_part_of_the_key(self):
+        llm.get_llm("linkedin_draft")
+        self.assertEqual(self.built[0]["tags"], ["draft"])
+        self.assertEqual(self.built[0]["temperature"], 0.7)
+
+    def test_models_come_from_configuration(self):
+        overrides = {"chat": {"model": "llama-3.3-70b-versatile", "temperature": 0.2}}
+        with mock.patch.dict(os.environ, {"AGENT_MODELS": json.dumps(overrides)}):
+            llm.get_llm("chat")
+        self.assertEqual(self.built[0]["model"], "llama-3.3-70b-versatile")
+        self.assertEqual(self.built[0]["temperature"], 0.2)
+        self.assertEqual(self.built[0]["tags"], ["chat"])
+
+    def test_async_clients_per_loop(self):
+        async def get():
+            return llm.get_llm("intent"), llm.get_llm("intent")
+
+        first, again = asyncio.run(get())
+        self.assertIs(first, again)
+        self.assertIn("http_async_client", self.built[0])
+        asyncio.run(get())
+        self.assertIsNot(self.built[0]["http_async_client"], self.built[1]["http_async_client"])
+
+
+class LLMCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = llm_cache.SQLiteLLMCache(os.path.join(self.tmp.name, "cache.db"), ttl=60, max_entries=2)
+        self.addCleanup(self.cache.close)
+
+    def model(self, *responses):
+        return FakeListChatModel(responses=list(responses), cache=self.cache)
+
+    def test_repeated_prompt_is_served_from_cache(self):
+        model = self.model("first", "second")
+        self.assertEqual(model.invoke("extract: to bob@example.com").content, "first")
+        # whitespace-only differences share the entry
+        self.assertEqual(model.invoke("  extract:   to bob@example.com\n").content, "first")
+        self.assertEqual(model.invoke("extract: something else").content, "second")
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 2, 2))
+
+    def test_key_includes_model_parameters(self):
+        self.model("a").invoke("hello")
+        self.assertEqual(FakeListChatModel(responses=["b"], cache=self.cache, sleep=0.5).invoke("hello").content, "b")
+
+    def test_ttl_and_lru_eviction(self):
+        model = self.model("a", "b", "c")
+        model.invoke("one")
+        model.invoke("two")
+        model.invoke("one")  # hit: "two" is now least recently used
+        model.invoke("three")
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+        self.assertIsNotNone(self.cache.lookup(*self._key(model, "one")))
+        self.assertIsNone(self.cache.lookup(*self._key(model, "two")))
+
+        self.cache.ttl = 0
+        self.assertIsNone(self.cache.lookup(*self._key(model, "one")))
+
+    def _key(self, model, text):
+        return dumps([HumanMessage(text)]), model._get_llm_string()
+
+    def test_registry_policy(self):
+        built = {}
+
+        def factory(**kwargs):
+            built[kwargs["model"], kwargs.get("temperature")] = kwargs
+            return mock.Mock()
+
+        overrides = {"email_edit": {"cache": True}}
+        env = {"LLM_CACHE_DB": os.path.join(self.tmp.name, "registry.db"), "LLM_CACHE": "1",
+               "AGENT_MODELS": json.dumps(overrides)}
+        llm.reset()
+        self.addCleanup(llm.reset)
+        with mock.patch.dict(llm.PROVIDERS, {"groq": factory}), mock.patch.dict(os.environ, env):
+            llm.get_llm("email_extract")
+            llm.get_llm("email_draft")
+            llm.get_llm("email_edit")
+
+        self.assertIsInstance(built["openai/gpt-oss-120b", 0.1]["cache"], llm_cache.SQLiteLLMCache)
+        self.assertNotIn("cache", built["llama-3.1-8b-instant", 0.7])
+        # opted in, but generation at temperature 0.7 is never cached
+        self.assertNotIn("cache", built["openai/gpt-oss-120b", 0.7])
+
+
+class ThreadCatalogTests(WorkflowTestCase, TestCase):
+
+    record_threads = True
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.other = User.objects.create_user("bob", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_runs_maintain_the_catalog(self):
+        self.script.update({
+            "intent": ["linkedin"],
+            "linkedin_draft": ["We shipped v2 today."],
+        })
+        graph.run_workflow_api("linkedin topic: We shipped v2   today #launch", self.user.id, "t-catalog")
+
+        entry = ThreadCatalog.objects.get(thread_id="t-catalog")
+        self.assertEqual(entry.user, self.user)
+        self.assertEqual(entry.title, "linkedin topic: We shipped v2 today #launch")
+        self.assertEqual(entry.last_intent, "linkedin")
+        self.assertTrue(entry.pending_interrupt)
+
+        graph.resume_workflow_api("cancel", "t-catalog")
+        entry.refresh_from_db()
+        self.assertFalse(entry.pending_interrupt)
+        self.assertEqual(entry.title, "linkedin topic: We shipped v2 today #launch")
+        self.assertEqual(entry.user, self.user)
+
+    def test_other_users_run_does_not_take_the_thread(self):
+        self.script.update({
+            "intent": ["linkedin", "linkedin"],
+            "linkedin_draft": ["We shipped v2 today.", "Hiring!"],
+        })
+        graph.run_workflow_api("linkedin topic: We shipped v2 today", self.user.id, "t-owned")
+        graph.resume_workflow_api("cancel", "t-owned")
+        graph.run_workflow_api("linkedin topic: Hiring", self.other.id, "t-owned")
+
+        entry = ThreadCatalog.objects.get(thread_id="t-owned")
+        self.assertEqual(entry.user, self.user)
+        self.assertFalse(entry.pending_interrupt)
+        response = self.client.get("/v1/threads/")
+        self.assertEqual([t["thread_id"] for t in response.data["threads"]], ["t-owned"])
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get("/v1/threads/").data["threads"], [])
+
+    def test_backfill_from_checkpoints(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "checkpoints.db")
+        saver = PooledSqliteSaver(path)
+        self.addCleanup(saver.close)
+        self.script.update({
+            "intent": ["linkedin", "linkedin"],
+            "linkedin_draft": ["We shipped v2 today.", "Hiring!"],
+        })
+        with mock.patch("src.agent.graph.get_app", return_value=graph.create_workflow(saver)):
+            graph.run_workflow_api("linkedin topic: We shipped v2 today", self.user.id, "t-old")
+            graph.run_workflow_api("linkedin topic: Hiring", self.other.id, "t-kept")
+        ThreadCatalog.objects.filter(thread_id="t-old").delete()
+        ThreadCatalog.objects.filter(thread_id="t-kept").update(title="renamed")
+
+        call_command("checkpoints", "catalog", "--db", path, stdout=mock.Mock())
+
+        entry = ThreadCatalog.objects.get(thread_id="t-old")
+        self.assertEqual(entry.user, self.user)
+        self.assertEqual(entry.title, "linkedin topic: We shipped v2 today")
+        self.assertEqual(entry.last_intent, "linkedin")
+        self.assertTrue(entry.pending_interrupt)
+        # existing rows are left alone
+        self.assertEqual(ThreadCatalog.objects.get(thread_id="t-kept").title, "renamed")
+        self.assertEqual([t["thread_id"] for t in self.client.get("/v1/threads/").data["threads"]], ["t-old"])
+
+    def test_list_is_per_user_and_cursor_paginated(self):
+        start = timezone.now()
+        for i in range(5):
+            ThreadCatalog.objects.create(thread_id=f"mine-{i}", user=self.user, title=f"thread {i}")
+            # last_activity is auto_now; space the rows out explicitly
+            ThreadCatalog.objects.filter(thread_id=f"mine-{i}").update(
+                last_activity=start + timedelta(seconds=i))
+        ThreadCatalog.objects.create(thread_id="theirs", user=self.other)
+
+        response = self.client.get("/v1/threads/", {"page_size": 3})
+        self.assertEqual(response.status_code, 200)
+        first = [t["thread_id"] for t in response.data["threads"]]
+        # most recently active first
+        self.assertEqual(first, ["mine-4", "mine-3", "mine-2"])
+        self.assertIsNone(response.data["previous"])
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual([t["thread_id"] for t in response.data["threads"]], ["mine-1", "mine-0"])
+        self.assertIsNone(response.data["next"])
+
+
+class StreamingEndpointTests(WorkflowTestCase, TestCase):
+    """
+    /v1/messages/stream/ and /v1/resume/stream/ send the run as Server-Sent Events.
+    """
+
+    def setUp(self):
+        super().setUp()
+        token = Token.objects.create(user=User.objects.create_user("alice", password="pw"))
+        self.headers = {"Authorization": f"Token {token.key}"}
+
+    async def post_stream(self, path, body):
+        response = await AsyncClient().post(path, body, content_type="application/json", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/event-stream"))
+        text = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        frames = []
+        for block in filter(None, text.split("\n\n")):
+            event, data = block.split("\n", 1)
+            frame = json.loads(data.removeprefix("data: "))
+            self.assertEqual(event, f"event: {frame['type']}")
+            frames.append(frame)
+        return frames
+
+    async def test_prompt_and_resume_stream(self):
+        self.script.update({
+            "intent": ["linkedin"],
+            "linkedin_draft": ["We shipped v2 today."],
+        })
+        frames = await self.post_stream("/v1/messages/stream/?thread_id=t-stream",
+                                        {"user_prompt": "linkedin topic: We shipped v2 today"})
+
+        self.assertEqual(frames[0], {"type": "status", "message": "Starting workflow...", "thread_id": "t-stream"})
+        steps = [(f["type"], f["node"]) for f in frames if f["type"] in ("node_start", "node_complete")]
+        self.assertEqual(steps[:4], [("node_start", "intent"), ("node_complete", "intent"),
+                                     ("node_start", "compose_linkedin"), ("node_complete", "compose_linkedin")])
+        tokens = [f for f in frames if f["type"] == "token"]
+        self.assertEqual(len(tokens), 4)
+        self.assertEqual({(f["node"], f["channel"]) for f in tokens}, {("compose_linkedin", "draft")})
+        self.assertEqual("".join(f["content"] for f in tokens), "We shipped v2 today.")
+        # tokens arrive while the draft node runs, not after it
+        self.assertLess(frames.index(tokens[-1]), frames.index({"type": "node_complete", "node": "compose_linkedin"}))
+        self.assertEqual(frames[-1]["type"], "interrupt")
+        self.assertIn("interrupt", frames[-1])
+        self.assertEqual(self.take_calls(), {"intent": 1, "linkedin_draft": 1})
+
+        frames = await self.post_stream("/v1/resume/stream/?thread_id=t-stream", {"feedback": "cancel"})
+        self.assertEqual(frames[0]["type"], "status")
+        self.assertEqual(frames[-1]["type"], "complete")
+        self.assertIn("state", frames[-1])
+        self.assertNotIn("error", [f["type"] for f in frames])
+
+    async def test_stream_requires_token(self):
+        response = await AsyncClient().post("/v1/messages/stream/", {"user_prompt": "hi"},
+                                            content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+
+
+class RetentionTests(WorkflowTestCase):
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "checkpoints.db")
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.addCleanup(conn.close)
+        self.app = graph.create_workflow(SqliteSaver(conn))
+        patcher = mock.patch("src.agent.graph.get_app", return_value=self.app)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_threads(self):
+        self.script.update({
+            "intent": ["linkedin", "linkedin"],
+            "linkedin_draft": ["We shipped v2 today.", "Hiring!"],
+        })
+        graph.run_workflow_api("linkedin topic: We shipped v2 today", 1, "t-waiting")
+        graph.run_workflow_api("linkedin topic: Hiring", 1, "t-done")
+        graph.resume_workflow_api("cancel", "t-done")
+
+    def test_compact_keeps_latest_state(self):
+        self.run_threads()
+        config = {"configurable": {"thread_id": "t-waiting"}}
+        before = self.app.get_state(config)
+        self.assertGreater(retention.stats(self.path)["checkpoints"], 4)
+
+        report = retention.compact(self.path, keep_last=1, ttl_days=30, interrupt_ttl_days=7)
+        self.assertEqual(report["expired_threads"], [])
+        stats = retention.stats(self.path)
+        self.assertEqual(stats["checkpoints"], 2)
+        self.assertTrue(stats["incremental_vacuum"])
+        self.assertEqual({t["thread_id"] for t in stats["threads"]}, {"t-waiting", "t-done"})
+
+        after = self.app.get_state(config)
+        self.assertEqual(after.values, before.values)
+        self.assertEqual(after.interrupts, before.interrupts)
+        self.assertEqual(graph.resume_workflow_api("cancel", "t-waiting")["error"], "Workflow cancelled by user")
+
+    def test_abandoned_interrupts_expire_first(self):
+        self.run_threads()
+        conn = retention.connect(self.path)
+        self.addCleanup(conn.close)
+        in_8_days = time.time() + 8 * 86400
+        self.assertEqual(retention.expired_threads(conn, 30, 7, now=in_8_days), ["t-waiting"])
+        self.assertEqual(sorted(retention.expired_threads(conn, 30, 7, now=in_8_days + 30 * 86400)),
+                         ["t-done", "t-waiting"])
+
+
+class PooledCheckpointerTests(WorkflowTestCase):
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.saver = PooledSqliteSaver(os.path.join(tmp.name, "checkpoints.db"), readers=2)
+        self.addCleanup(self.saver.close)
+        self.app = graph.create_workflow(self.saver)
+        patcher = mock.patch("src.agent.graph.get_app", return_value=self.app)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_do_not_wait_for_the_writer(self):
+        self.script.update({"intent": ["linkedin"], "linkedin_draft": ["We shipped v2 today."]})
+        graph.run_workflow_api("linkedin topic: We shipped v2 today", 1, "t-read")
+        config = {"configurable": {"thread_id": "t-read"}}
+
+        with self.saver.lock:  # a write in progress
+            with ThreadPoolExecutor(1) as pool:
+                state = pool.submit(self.app.get_state, config).result(timeout=5)
+                history = pool.submit(lambda: list(self.app.get_state_history(config))).result(timeout=5)
+        self.assertEqual(state.values["topic"], "We shipped v2 today")
+        self.assertTrue(state.interrupts)
+        self.assertGreater(len(history), 1)
+
+    def test_write_while_a_listing_is_suspended(self):
+        self.script.update({"intent": ["linkedin"], "linkedin_draft": ["We shipped v2 today."]})
+        graph.run_workflow_api("linkedin topic: We shipped v2 today", 1, "t-list")
+        listing = self.saver.list({"configurable": {"thread_id": "t-list"}})
+        latest = next(listing)
+
+        # Same thread, reader still checked out by the generator
+        self.saver.put_writes(latest.config, [("note", "written mid-listing")], "task-1")
+        self.assertGreater(len(list(listing)), 0)
+        self.assertIn(("task-1", "note", "written mid-listing"), self.saver.get_tuple(latest.config).pending_writes)
+        self.assertEqual(latest.checkpoint["channel_values"]["topic"], "We shipped v2 today")
+
+    def test_concurrent_runs_and_resumes(self):
+        threads = 16
+        self.script.update({
+            "intent": ["linkedin"] * threads,
+            "linkedin_draft": ["We shipped v2 today."] * threads,
+        })
+
+        def conversation(i):
+            first = graph.run_workflow_api("linkedin topic: We shipped v2 today", 1, f"t-{i}")
+            second = graph.resume_workflow_api("cancel", f"t-{i}")
+            return first["status"], second.get("error")
+
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(conversation, range(threads)))
+        self.assertEqual(results, [("interrupt", "Workflow cancelled by user")] * threads)
+
+
+class ShardedCheckpointerTests(WorkflowTestCase):
+
+    threads = [f"t-{i}" for i in range(8)]
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "checkpoints.db")
+
+    def use_app(self, saver):
+        self.addCleanup(saver.close)
+        self.app = graph.create_workflow(saver)
+        patcher = mock.patch("src.agent.graph.get_app", return_value=self.app)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_threads(self):
+        self.script.update({
+            "intent": ["linkedin"] * len(self.threads),
+            "linkedin_draft": [f"Post for {t}" for t in self.threads],
+        })
+        for t in self.threads:
+            graph.run_workflow_api(f"linkedin topic: Post for {t}", 1, t)
+
+    def thread_ids(self, path):
+        with sqlite3.connect(path) as conn:
+            return {row[0] for row in conn.execute("SELECT DISTINCT thread_id FROM checkpoints")}
+
+    def test_threads_live_on_their_shard(self):
+        saver = checkpointer.open_checkpointer(self.path, shards=3)
+        self.use_app(saver)
+        self.run_threads()
+
+        paths = checkpointer.shard_paths(self.path, 3)
+        for i, path in enumerate(paths):
+            self.assertEqual(self.thread_ids(path),
+                             {t for t in self.threads if checkpointer.shard_index(t, 3) == i})
+        for t in self.threads:
+            state = self.app.get_state({"configurable": {"thread_id": t}})
+            self.assertEqual(state.values["generated_text"], f"Post for {t}")
+            self.assertEqual(graph.resume_workflow_api("cancel", t)["error"], "Workflow cancelled by user")
+
+        ids = [c.checkpoint["id"] for c in saver.list(None)]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(list(saver.list(None, limit=5))), 5)
+
+    def test_reshard_from_single_file(self):
+        self.use_app(checkpointer.PooledSqliteSaver(self.path))
+        self.run_threads()
+        before = {t: self.app.get_state({"configurable": {"thread_id": t}}).values for t in self.threads}
+
+        checkpointer.reshard([self.path], self.path, 4)
+        self.use_app(checkpointer.open_checkpointer(self.path, shards=4))
+        for t in self.threads:
+            self.assertEqual(self.app.get_state({"configurable": {"thread_id": t}}).values, before[t])
+        with self.assertRaises(ValueError):
+            checkpointer.reshard(checkpointer.shard_paths(self.path, 4), self.path, 4)
+
+    def test_alist_merges_shards_lazily(self):
+        self.use_app(checkpointer.open_checkpointer(self.path, shards=3))
+        self.run_threads()
+        expected = [c.checkpoint["id"] for c in self.app.checkpointer.list(None)]
+        pulled = Counter()
+
+        def counted(shard):
+            alist = shard.alist
+
+            async def wrapper(*args, **kwargs):
+                async for item in alist(*args, **kwargs):
+                    pulled[id(shard)] += 1
+                    yield item
+            return wrapper
+
+        async def run():
+            saver = (await registry.aget_app()).checkpointer
+            try:
+                for shard in saver.shards:
+                    shard.alist = counted(shard)
+                ids = [c.checkpoint["id"] async for c in saver.alist(None)]
+                pulled.clear()
+                first = await anext(saver.alist(None))
+                return ids, first.checkpoint["id"], sum(pulled.values())
+            finally:
+                await registry.ashutdown()
+
+        with mock.patch.dict(os.environ, {"CHECKPOINT_DB": self.path, "CHECKPOINT_SHARDS": "3"}):
+            ids, first, pulled_for_first = asyncio.run(run())
+        self.assertEqual(ids, expected)
+        self.assertEqual(first, expected[0])
+        # the newest checkpoint needs one row from each shard, not every row
+        self.assertEqual(pulled_for_first, 3)
+        self.assertGreater(len(expected), 3)
+
+    def test_async_app_is_sharded(self):
+        self.script.update({"intent": ["linkedin"], "linkedin_draft": ["Async post"]})
+        env = {"CHECKPOINT_DB": self.path, "CHECKPOINT_SHARDS": "2"}
+
+        async def run():
+            app = await registry.aget_app()
+            try:
+                config = {"configurable": {"thread_id": "t-async"}}
+                state = {"messages": [HumanMessage(content="linkedin topic: Async post")],
+                         "user_prompt": "linkedin topic: Async post", "user_id": 1}
+                intr, values = await graph._arun_until_interrupt(app, state, config)
+                return intr, values
+            finally:
+                await registry.ashutdown()
+
+        with mock.patch.dict(os.environ, env):
+            intr, values = asyncio.run(run())
+        self.assertIsNotNone(intr)
+        self.assertEqual(values["generated_text"], "Async post")
+        owner = checkpointer.shard_paths(self.path, 2)[checkpointer.shard_index("t-async", 2)]
+        self.assertEqual(self.thread_ids(owner), {"t-async"})
+
+
+class CompressedCheckpointTests(WorkflowTestCase):
+
+    threads = [f"t-{i}" for i in range(6)]
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.path = os.path.join(tmp.name, "checkpoints.db")
+
+    def use_app(self, codec):
+        saver = PooledSqliteSaver(self.path, serde=codec)
+        self.addCleanup(saver.close)
+        self.app = graph.create_workflow(saver)
+        patcher = mock.patch("src.agent.graph.get_app", return_value=self.app)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_threads(self):
+        self.script.update({
+            "intent": ["linkedin"] * len(self.threads),
+            "linkedin_draft": [f"We shipped release {t} today, with faster checkpoints." for t in self.threads],
+        })
+        for t in self.threads:
+            graph.run_workflow_api(f"linkedin topic: release {t}", 1, t)
+
+    def states(self):
+        return {t: self.app.get_state({"configurable": {"thread_id": t}}).values for t in self.threads}
+
+    def types(self):
+        with sqlite3.connect(self.path) as conn:
+            return {row[0] for row in conn.execute("SELECT type FROM checkpoints")}
+
+    def test_round_trip(self):
+        codec = serde.ZstdSerializer()
+        state = {"messages": [HumanMessage(content="hello " * 100)], "topic": "x" * 500, "n": 3}
+        type_, data = codec.dumps_typed(state)
+        self.assertEqual(type_, "msgpack+zstd")
+        self.assertEqual(codec.loads_typed((type_, data)), state)
+        self.assertEqual(codec.dumps_typed(None), codec.inner.dumps_typed(None))
+
+    def test_old_rows_stay_readable_and_recompress(self):
+        self.use_app(serde.ZstdSerializer(compress=False))
+        self.run_threads()
+        before = self.states()
+        self.assertEqual(self.types(), {"msgpack"})
+
+        codec = serde.ZstdSerializer()
+        self.use_app(codec)
+        self.assertEqual(self.states(), before)
+
+        size = retention.stats(self.path)["checkpoint_bytes"]
+        rewritten = checkpointer.recompress(self.path, codec)
+        self.assertGreater(rewritten["checkpoints"], 0)
+        self.assertEqual(self.types(), {"msgpack+zstd"})
+        self.assertLess(retention.stats(self.path)["checkpoint_bytes"], size)
+        self.assertEqual(self.states(), before)
+        self.assertEqual(checkpointer.recompress(self.path, codec), {"checkpoints": 0, "writes": 0, "message_blobs": 0})
+
+        # switching compression off again decompresses in place
+        checkpointer.recompress(self.path, serde.ZstdSerializer(compress=False))
+        self.assertEqual(self.types(), {"msgpack"})
+        self.assertEqual(self.states(), before)
+
+    def test_dictionary(self):
+        self.use_app(serde.ZstdSerializer(compress=False))
+        self.threads = [f"t-{i}" for i in range(40)]
+        self.run_threads()
+        before = self.states()
+        samples = [data for _, data in checkpointer.iter_payloads(self.path)]
+        path = serde.train_dictionary(samples, 4096, self.tmp)
+
+        with mock.patch.dict(os.environ, {"CHECKPOINT_ZSTD_DICT": path}):
+            serde.reset()
+            self.addCleanup(serde.reset)
+            codec = serde.get_serde()
+        self.assertIsNotNone(codec.dictionary)
+        checkpointer.recompress(self.path, codec)
+        self.use_app(codec)
+        self.assertEqual(self.states(), before)
+
+        # rows compressed with a dictionary need it to be read back
+        with self.assertRaises(ValueError):
+            self.use_app(serde.ZstdSerializer())
+            self.states()
+
+
+class MessageStoreTests(WorkflowTestCase):
+
+    turns = 30
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "checkpoints.db")
+        self.config = {"configurable": {"thread_id": "t-long"}}
+
+    def converse(self, app, turns=None):
+        for n in range(turns or self.turns):
+            # distinct text, as in a real conversation, so zstd cannot fold the copies together
+            message = HumanMessage(f"turn {n}: {os.urandom(100).hex()}", id=f"m-{n}")
+            app.update_state(self.config, {"messages": [message]}, as_node="intent")
+
+    def query(self, sql):
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute(sql).fetchall()
+
+    def test_messages_are_stored_once(self):
+        saver = PooledSqliteSaver(self.path)
+        self.addCleanup(saver.close)
+        app = graph.create_workflow(saver)
+        self.converse(app)
+
+        state = app.get_state(self.config)
+        self.assertEqual([m.id for m in state.values["messages"]], [f"m-{n}" for n in range(self.turns)])
+        self.assertEqual(self.query("SELECT COUNT(*) FROM message_blobs"), [(self.turns,)])
+        sizes = [size for size, in self.query("SELECT LENGTH(checkpoint) FROM checkpoints ORDER BY checkpoint_id")]
+        # inline, the last checkpoint would hold 30 x 200+ bytes of messages
+        self.assertLess(sizes[-1], 20 * self.turns + 500)
+
+        history = list(app.get_state_history(self.config))
+        self.assertEqual([len(h.values.get("messages", [])) for h in history][:3],
+                         [self.turns, self.turns - 1, self.turns - 2])
+
+        saver.delete_thread("t-long")
+        self.assertEqual(self.query("SELECT COUNT(*) FROM message_blobs"), [(0,)])
+
+    def test_old_checkpoints_are_migrated(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.converse(graph.create_workflow(SqliteSaver(conn)), 10)
+        conn.close()
+
+        saver = PooledSqliteSaver(self.path)
+        self.addCleanup(saver.close)
+        app = graph.create_workflow(saver)
+        before = app.get_state(self.config).values
+        before_bytes = retention.stats(self.path)["checkpoint_bytes"]
+
+        self.assertGreater(checkpointer.dedup_messages(self.path), 0)
+        self.assertEqual(app.get_state(self.config).values, before)
+        self.assertEqual(self.query("SELECT COUNT(*) FROM message_blobs"), [(10,)])
+        self.assertLess(retention.stats(self.path)["checkpoint_bytes"], before_bytes)
+        self.assertEqual(checkpointer.dedup_messages(self.path), 0)
+
+    def test_async_saver(self):
+        env = {"CHECKPOINT_DB": self.path, "CHECKPOINT_SHARDS": "1"}
+
+        async def run():
+            app = await registry.aget_app()
+            try:
+                for n in range(5):
+                    await app.aupdate_state(self.config, {"messages": [HumanMessage(f"turn {n}", id=f"m-{n}")]},
+                                            as_node="intent")
+                state = await app.aget_state(self.config)
+                history = [h async for h in app.aget_state_history(self.config)]
+                return state, history
+            finally:
+                await registry.ashutdown()
+
+        with mock.patch.dict(os.environ, env):
+            state, history = asyncio.run(run())
+        self.assertEqual([m.content for m in state.values["messages"]], [f"turn {n}" for n in range(5)])
+        self.assertEqual(len(history[1].values["messages"]), 4)
+        self.assertEqual(self.query("SELECT COUNT(*) FROM message_blobs"), [(5,)])
+
+
+class ThreadHistoryTests(WorkflowTestCase, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.saver = checkpointer.open_checkpointer(os.path.join(tmp.name, "checkpoints.db"), shards=2)
+        self.addCleanup(self.saver.close)
+        self.app = graph.create_workflow(self.saver)
+        for target, value in (("src.agent.graph.get_app", self.app),
+                              ("src.agent.registry.get_checkpointer", self.saver)):
+            patcher = mock.patch(target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("alice", password="pw"))
+        self.script.update({"intent": ["linkedin"], "linkedin_draft": ["We shipped v2 today."]})
+        graph.run_workflow_api("linkedin topic: We shipped v2 today", 1, "t-history")
+
+    def test_matches_get_state(self):
+        state = self.app.get_state({"configurable": {"thread_id": "t-history"}})
+        self.assertEqual(history.read_state("t-history"), state.values)
+        self.assertEqual(history.read_state("t-history", ["intent", "topic", "__start__"]),
+                         {"intent": "linkedin", "topic": "We shipped v2 today"})
+        self.assertIsNone(history.read_state("t-missing"))
+
+        with mock.patch("src.agent.message_store.load") as load:
+            history.read_state("t-history", ["generated_text"])
+        load.assert_not_called()
+
+    def test_endpoint(self):
+        response = self.client.get("/v1/threads/t-history/history/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["history"],
+                         [{"type": "HumanMessage", "content": "linkedin topic: We shipped v2 today"}])
+        self.assertEqual(response.data["state"]["generated_text"], "We shipped v2 today.")
+
+        response = self.client.get("/v1/threads/t-history/history/", {"channels": "intent, generated_text"})
+        self.assertEqual(response.data["state"], {"intent": "linkedin", "generated_text": "We shipped v2 today."})
+        self.assertEqual(response.data["history"], [])
+
+        response = self.client.get("/v1/threads/t-missing/history/")
+        self.assertEqual(response.data["history"], [])
+
+    def add_messages(self, count):
+        config = {"configurable": {"thread_id": "t-history"}}
+        for n in range(count):
+            self.app.update_state(config, {"messages": [HumanMessage(f"more {n}")]}, as_node="intent")
+
+    def test_pages(self):
+        self.add_messages(6)  # 7 messages in all
+
+        data = self.client.get("/v1/threads/t-history/history/", {"limit": 3}).data
+        self.assertEqual([m["index"] for m in data["history"]], [4, 5, 6])
+        self.assertEqual(data["history"][-1]["content"], "more 5")
+        self.assertEqual(data["total_messages"], 7)
+        self.assertTrue(data["has_more_before"])
+        self.assertFalse(data["has_more_after"])
+        self.assertNotIn("messages", data["state"])
+
+        data = self.client.get("/v1/threads/t-history/history/", {"before": 4, "limit": 3}).data
+        self.assertEqual([m["index"] for m in data["history"]], [1, 2, 3])
+        data = self.client.get("/v1/threads/t-history/history/", {"before": 1, "limit": 3}).data
+        self.assertEqual([m["index"] for m in data["history"]], [0])
+        self.assertFalse(data["has_more_before"])
+        data = self.client.get("/v1/threads/t-history/history/", {"after": 4}).data
+        self.assertEqual([m["index"] for m in data["history"]], [5, 6])
+        data = self.client.get("/v1/threads/t-history/history/", {"after": 6}).data
+        self.assertEqual(data["history"], [])
+
+        self.assertEqual(self.client.get("/v1/threads/t-history/history/", {"limit": "x"}).status_code, 400)
+
+        # only the page's messages are read from the message store
+        with mock.patch("src.agent.message_store.load", wraps=message_store.load) as load:
+            self.client.get("/v1/threads/t-history/history/", {"limit": 2})
+        self.assertEqual(len(load.call_args.args[2]), 2)
+
+    def test_etag(self):
+        url = "/v1/threads/t-history/history/"
+        response = self.client.get(url, {"limit": 10})
+        latest = self.saver.get_tuple({"configurable": {"thread_id": "t-history"}}).checkpoint["id"]
+        self.assertEqual(response["ETag"], f'"{latest}"')
+
+        response = self.client.get(url, {"limit": 10}, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        self.add_messages(1)
+        response = self.client.get(url, {"after": 0}, HTTP_IF_NONE_MATCH=f'"{latest}"')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], f'"{latest}"')
+        self.assertEqual([m["content"] for m in response.data["history"]], ["more 0"])
+
+        self.assertNotIn("ETag", self.client.get("/v1/threads/t-missing/history/"))
+
+
+class WorkflowResponseTests(WorkflowTestCase, TestCase):
+    """
+    /v1/messages/ and /v1/resume/ render with orjson and honour ?fields=.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("alice", password="pw"))
+        self.script.update({"intent": ["linkedin"], "linkedin_draft": ["We shipped v2 today."]})
+
+    def test_full_state_is_serialized(self):
+        response = self.client.post("/v1/messages/?thread_id=t-render",
+                                    {"user_prompt": "linkedin topic: We shipped v2 today"}, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response["Content-Type"], "application/json")
+        body = json.loads(response.content)
+        self.assertEqual(body["state"]["messages"],
+                         [{"type": "HumanMessage", "content": "linkedin topic: We shipped v2 today"}])
+        self.assertEqual(body["state"]["intent"], "linkedin")
+
+    def test_fields_projection(self):
+        url = "/v1/messages/?thread_id=t-fields&fields=interrupt,preview,result"
+        body = json.loads(self.client.post(url, {"user_prompt": "linkedin topic: We shipped v2 today"},
+                                           format="json").content)
+        self.assertEqual(set(body), {"status", "message", "thread_id", "interrupt", "state"})
+        self.assertEqual(set(body["state"]), {"preview"})
+        self.assertIn("We shipped v2 today.", body["state"]["preview"])
+
+        body = json.loads(self.client.post("/v1/resume/?thread_id=t-fields&fields=interrupt",
+                                           {"feedback": "edit"}, format="json").content)
+        self.assertEqual(set(body), {"status", "message", "thread_id", "interrupt"})
+
+    def test_serialize_state(self):
+        state = {"messages": [HumanMessage("hi")], "intent": "chat", "result": {"status": "ok"},
+                 "when": timedelta(seconds=1)}
+        self.assertEqual(graph.serialize_state(state), {
+            "messages": [{"type": "HumanMessage", "content": "hi"}], "intent": "chat",
+            "result": {"status": "ok"}, "when": "0:00:01"})
+        self.assertEqual(graph.serialize_state(state, {"intent", "missing"}), {"intent": "chat"})
+
+
+class WorkflowJobTests(WorkflowTestCase, TransactionTestCase):
+    """
+    Runs submitted to /v1/jobs/ execute on the worker pool; the job endpoint
+    long-polls them. Worker threads need committed rows, hence TransactionTestCase.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.script.update({"intent": ["linkedin"], "linkedin_draft": ["We shipped v2 today."]})
+
+    def poll(self, job_id, **params):
+        return self.client.get(f"/v1/jobs/{job_id}/", {"wait": 10, **params})
+
+    def test_run_and_resume_in_background(self):
+        response = self.client.post("/v1/jobs/messages/?thread_id=t-job",
+                                    {"user_prompt": "linkedin topic: We shipped v2 today"}, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response["Location"], f"/v1/jobs/{response.data['job_id']}/")
+
+        response = self.poll(response.data["job_id"], fields="interrupt,preview")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], WorkflowJob.INTERRUPT)
+        self.assertEqual(response.data["response_code"], 202)
+        self.assertEqual(set(response.data["response"]), {"status", "message", "thread_id", "interrupt", "state"})
+        self.assertIn("We shipped v2 today.", response.data["response"]["state"]["preview"])
+
+        response = self.client.post("/v1/jobs/resume/?thread_id=t-job", {"feedback": "cancel"}, format="json")
+        response = self.poll(response.data["job_id"])
+        self.assertEqual(response.data["status"], WorkflowJob.DONE)
+        self.assertEqual(response.data["response"]["state"]["error"], "Workflow cancelled by user")
+
+    def test_per_user_cap_and_metrics(self):
+        release = threading.Event()
+
+        def slow_run(user_prompt, user_id, thread_id):
+            release.wait(10)
+            raise RuntimeError("provider down")
+
+        with mock.patch("home.views.run_workflow_api", slow_run), \
+                mock.patch.dict(os.environ, {"JOB_MAX_PER_USER": "1"}):
+            first = self.client.post("/v1/jobs/messages/", {"user_prompt": "hi"}, format="json")
+            second = self.client.post("/v1/jobs/messages/", {"user_prompt": "hi"}, format="json")
+            self.assertEqual(second.status_code, 429)
+            self.assertEqual(second["Retry-After"], "1")
+
+            response = self.client.get(f"/v1/jobs/{first.data['job_id']}/")
+            self.assertEqual(response.status_code, 202)
+            self.assertIn(response.data["status"], WorkflowJob.ACTIVE)
+
+            release.set()
+            response = self.poll(first.data["job_id"])
+        self.assertEqual(response.data["status"], WorkflowJob.FAILED)
+        self.assertEqual(response.data["error"], "provider down")
+
+        metrics = jobs.metrics()
+        self.assertEqual((metrics["queued"], metrics["running"]), (0, 0))
+        self.assertGreaterEqual(metrics["rejected"], 1)
+        self.assertEqual(self.client.get("/v1/jobs/metrics/").status_code, 403)
+
+    def test_retried_submission_returns_the_same_job(self):
+        prompt = {"user_prompt": "linkedin topic: We shipped v2 today"}
+        first = self.client.post("/v1/jobs/messages/?thread_id=t-job-key", prompt, format="json",
+                                 HTTP_IDEMPOTENCY_KEY="k-job")
+        retry = self.client.post("/v1/jobs/messages/?thread_id=t-job-key", prompt, format="json",
+                                 HTTP_IDEMPOTENCY_KEY="k-job")
+        self.assertEqual((first.status_code, retry.status_code), (202, 202))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.data["job_id"], first.data["job_id"])
+        self.assertEqual(WorkflowJob.objects.count(), 1)
+        self.poll(first.data["job_id"])
+
+    def test_busy_thread_ends_job_with_409(self):
+        with thread_locks.thread_lease("t-job-busy", wait=0):
+            response = self.client.post("/v1/jobs/resume/?thread_id=t-job-busy", {"feedback": "cancel"},
+                                        format="json")
+            response = self.poll(response.data["job_id"])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(response.data["status"], WorkflowJob.FAILED)
+        self.assertEqual(response.data["response_code"], 409)
+
+    def test_only_jobs_without_heartbeat_expire(self):
+        long_running = WorkflowJob.objects.create(user=self.user, thread_id="t-long", kind="run",
+                                                  status=WorkflowJob.RUNNING)
+        lost = WorkflowJob.objects.create(user=self.user, thread_id="t-lost", kind="run",
+                                          status=WorkflowJob.RUNNING)
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        WorkflowJob.objects.filter(pk=long_running.pk).update(created_at=an_hour_ago, started_at=an_hour_ago)
+        WorkflowJob.objects.filter(pk=lost.pk).update(heartbeat_at=timezone.now() - jobs.STALE_AFTER * 2)
+
+        response = self.client.post("/v1/jobs/messages/", {"user_prompt": "linkedin topic: v2"}, format="json")
+        self.assertEqual(response.status_code, 202)
+        long_running.refresh_from_db()
+        lost.refresh_from_db()
+        self.assertEqual(long_running.status, WorkflowJob.RUNNING)
+        self.assertEqual(lost.status, WorkflowJob.FAILED)
+        self.poll(response.data["job_id"])
+
+    def test_other_users_job_is_hidden(self):
+        job = WorkflowJob.objects.create(user=User.objects.create_user("bob"), thread_id="t-bob", kind="run")
+        self.assertEqual(self.client.get(f"/v1/jobs/{job.id}/").status_code, 404)
+
+
+class ThreadLeaseTests(WorkflowTestCase, TestCase):
+    """
+    One run per thread at a time; other threads are not held up.
+    """
+
+    def test_busy_thread_fails_fast_or_queues(self):
+        with thread_locks.thread_lease("t-a", wait=0):
+            with self.assertRaises(thread_locks.ThreadBusy):
+                with thread_locks.thread_lease("t-a", wait=0):
+                    pass
+            with thread_locks.thread_lease("t-b", wait=0):
+                self.assertIsNotNone(thread_locks.store_for("t-b").holder("t-b"))
+
+        held, queued = threading.Event(), []
+
+        def holder():
+            with thread_locks.thread_lease("t-a", wait=0):
+                held.set()
+                time.sleep(0.2)
+
+        worker = threading.Thread(target=holder)
+        worker.start()
+        held.wait(5)
+        start = time.monotonic()
+        with thread_locks.thread_lease("t-a", wait=5):
+            queued.append(time.monotonic() - start)
+        worker.join()
+        self.assertGreater(queued[0], 0.1)
+        self.assertIsNone(thread_locks.store_for("t-a").holder("t-a"))
+
+    def test_expired_lease_is_taken_over(self):
+        store = thread_locks.store_for("t-crashed")
+        self.assertTrue(store.try_acquire("t-crashed", "dead-process", ttl=0.01))
+        self.assertFalse(store.try_acquire("t-crashed", "other", ttl=60))
+        time.sleep(0.05)
+        with thread_locks.thread_lease("t-crashed", wait=0):
+            self.assertNotEqual(store.holder("t-crashed"), "dead-process")
+
+    def test_one_renewer_keeps_every_lease_alive(self):
+        with mock.patch.dict(os.environ, {"THREAD_LEASE_TTL": "0.3"}), \
+                thread_locks.thread_lease("t-r1", wait=0), thread_locks.thread_lease("t-r2", wait=0):
+            time.sleep(0.6)
+            for thread_id in ("t-r1", "t-r2"):
+                self.assertIsNotNone(thread_locks.store_for(thread_id).holder(thread_id))
+            renewers = [t for t in threading.enumerate() if t.name.startswith("lease-")]
+            self.assertEqual([t.name for t in renewers], ["lease-renewer"])
+
+    def test_duplicate_resume_gets_409(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("alice", password="pw"))
+        self.script.update({"intent": ["linkedin"], "linkedin_draft": ["We shipped v2 today."]})
+        response = client.post("/v1/messages/?thread_id=t-dup", {"user_prompt": "linkedin topic: v2"},
+                               format="json")
+        self.assertEqual(response.status_code, 202)
+
+        with thread_locks.thread_lease("t-dup", wait=0):
+            response = client.post("/v1/resume/?thread_id=t-dup", {"feedback": "cancel"}, format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(self.app.get_state({"configurable": {"thread_id": "t-dup"}}).next, ("human_gate",))
+
+        response = client.post("/v1/resume/?thread_id=t-dup", {"feedback": "cancel"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+
+class IdempotencyKeyTests(WorkflowTestCase, TransactionTestCase):
+    """
+    Retries with the same Idempotency-Key replay the first response instead
+    of running the workflow again. Concurrent requests need committed rows.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("alice", password="pw"))
+        self.script.update({"intent": ["linkedin"], "linkedin_draft": ["We shipped v2 today."]})
+
+    def post(self, url, data, key, client=None):
+        return (client or self.client).post(url, data, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_browser_may_send_key_and_read_replay_headers(self):
+        origin = {"HTTP_ORIGIN": "http://localhost:5173"}
+        preflight = self.client.options("/v1/messages/", HTTP_ACCESS_CONTROL_REQUEST_METHOD="POST",
+                                        HTTP_ACCESS_CONTROL_REQUEST_HEADERS="idempotency-key", **origin)
+        self.assertIn("idempotency-key", preflight["Access-Control-Allow-Headers"])
+
+        prompt = {"user_prompt": "linkedin topic: We shipped v2 today"}
+        self.post("/v1/messages/", prompt, "k-cors")
+        retry = self.client.post("/v1/messages/", prompt, format="json", HTTP_IDEMPOTENCY_KEY="k-cors", **origin)
+        exposed = [h.strip() for h in retry["Access-Control-Expose-Headers"].split(",")]
+        self.assertIn("Idempotent-Replayed", exposed)
+        self.assertIn("Retry-After", exposed)
+
+    def test_retry_replays_first_response(self):
+        prompt = {"user_prompt": "linkedin topic: We shipped v2 today"}
+        first = self.post("/v1/messages/", prompt, "k-1")
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(self.take_calls(), {"intent": 1, "linkedin_draft": 1})
+
+        retry = self.post("/v1/messages/", prompt, "k-1")
+        self.assertEqual(retry.status_code, 202)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(json.loads(retry.content), json.loads(first.content))
+        self.assertEqual(self.take_calls(), {})
+
+        response = self.post("/v1/messages/", {"user_prompt": "something else"}, "k-1")
+        self.assertEqual(response.status_code, 422)
+
+        thread_id = first.data["thread_id"]
+        for _ in range(2):
+            response = self.post(f"/v1/resume/?thread_id={thread_id}", {"feedback": "cancel"}, "k-2")
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(IdempotencyRecord.objects.count(), 2)
+
+    def test_concurrent_duplicate_waits_for_original(self):
+        entered, release, runs = threading.Event(), threading.Event(), []
+        real_run = graph.run_workflow_api
+
+        def slow_run(*args):
+            runs.append(args)
+            entered.set()
+            release.wait(10)
+            return real_run(*args)
+
+        def send():
+            client = APIClient()
+            client.force_authenticate(User.objects.get(username="alice"))
+            return self.post("/v1/messages/?thread_id=t-idem", {"user_prompt": "linkedin topic: v2"}, "k-dup",
+                             client)
+
+        with mock.patch("home.views.run_workflow_api", slow_run), ThreadPoolExecutor(2) as pool:
+            first = pool.submit(send)
+            entered.wait(5)
+            second = pool.submit(send)
+            time.sleep(0.3)
+            self.assertFalse(second.done())
+            release.set()
+            first, second = first.result(10), second.result(10)
+
+        self.assertEqual(len(runs), 1)
+        self.assertEqual((first.status_code, second.status_code), (202, 202))
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(json.loads(second.content), json.loads(first.content))
+
+    def test_failed_request_can_be_retried(self):
+        with mock.patch("home.views.run_workflow_api", side_effect=RuntimeError("provider down")):
+            response = self.post("/v1/messages/?thread_id=t-retry", {"user_prompt": "linkedin topic: v2"}, "k-3")
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+        response = self.post("/v1/messages/?thread_id=t-retry", {"user_prompt": "linkedin topic: v2"}, "k-3")
+        self.assertEqual(response.status_code, 202)
+        self.assertNotIn("Idempotent-Replayed", response)
+
+
+class RateLimitTests(WorkflowTestCase, TestCase):
+    """
+    LLM calls queue on per-model request/token buckets; runs that would wait
+    past the budget are refused with 429 before any work starts.
+    """
+
+    limits = ratelimit.Limits(rpm=60, tpm=6000)
+
+    def test_buckets_queue_and_refuse(self):
+        buckets = ratelimit.MemoryBuckets()
+        for _ in range(60):
+            self.assertEqual(buckets.reserve("m", self.limits, 10, max_wait=1), 0)
+        # The 61st request waits for one request's refill (1 s), the next for two
+        self.assertAlmostEqual(buckets.reserve("m", self.limits, 10, max_wait=5), 1, delta=0.05)
+        self.assertAlmostEqual(buckets.estimate("m", self.limits, 10), 2, delta=0.05)
+        with self.assertRaises(ratelimit.RateLimited) as raised:
+            buckets.reserve("m", self.limits, 10, max_wait=1)
+        self.assertEqual(raised.exception.retry_after, 2)
+
+        # Tokens: a 6000-token call drains the bucket; unused tokens come back
+        self.assertEqual(buckets.reserve("t", self.limits, 6000, max_wait=0), 0)
+        self.assertAlmostEqual(buckets.estimate("t", self.limits, 600), 6, delta=0.05)
+        buckets.refund("t", self.limits, 3000)
+        self.assertEqual(buckets.estimate("t", self.limits, 600), 0)
+
+    def test_sqlite_buckets_are_shared(self):
+        path = os.path.join(tempfile.mkdtemp(), "limits.db")
+        first, second = ratelimit.SqliteBuckets(path), ratelimit.SqliteBuckets(path)
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        first.reserve("m", self.limits, 6000, max_wait=0)
+        self.assertAlmostEqual(second.estimate("m", self.limits, 600), 6, delta=0.05)
+
+    def test_every_client_goes_through_the_limiter(self):
+        built = []
+        with mock.patch.dict(llm.PROVIDERS, {"groq": lambda **kwargs: built.append(kwargs) or object()}):
+            for role in llm.DEFAULT_MODELS:
+                llm.get_llm(role)
+        self.assertTrue(built)
+        for kwargs in built:
+            [handler] = kwargs["callbacks"]
+            self.assertIsInstance(handler, ratelimit.RateLimitHandler)
+            self.assertEqual(handler.model, kwargs["model"])
+            self.assertIs(kwargs["rate_limiter"].handler, handler)
+
+    def reserved_seconds(self, model="openai/gpt-oss-120b"):
+        limits = ratelimit.limits_for(model)
+        return ratelimit.get_buckets().estimate(model, limits, limits.tpm)
+
+    def test_handler_reserves_and_settles(self):
+        model = ScriptedLLM(script={"unknown": ["hi"]}, calls=Counter(),
+                            **ratelimit.client_options("openai/gpt-oss-120b"))
+        model.invoke("x" * 400)
+        limits = ratelimit.limits_for("openai/gpt-oss-120b")
+        # 100 prompt tokens + expected reply reserved; the fake reports no usage
+        self.assertAlmostEqual(self.reserved_seconds(),
+                               (100 + ratelimit.EXPECTED_OUTPUT_TOKENS) * 60 / limits.tpm, delta=0.1)
+
+    def test_cache_hits_reserve_nothing(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = llm_cache.SQLiteLLMCache(os.path.join(tmp.name, "cache.db"))
+        self.addCleanup(cache.close)
+        calls = Counter()
+        model, async_model = (
+            ScriptedLLM(script={"unknown": ["hi"]}, calls=calls, cache=cache,
+                        **ratelimit.client_options("openai/gpt-oss-120b", use_async=use_async))
+            for use_async in (False, True))
+        model.invoke("x" * 400)  # the miss that fills the cache reaches the provider
+        self.assertGreater(self.reserved_seconds(), 0)
+
+        # Backlogged: a call sent now would wait far past a one second budget
+        limits = ratelimit.limits_for("openai/gpt-oss-120b")
+        ratelimit.get_buckets().reserve("openai/gpt-oss-120b", limits, limits.tpm * 2, max_wait=120)
+        before = self.reserved_seconds()
+        with mock.patch.dict(os.environ, {"LLM_RATE_LIMIT_BUDGET": "1"}):
+            self.assertEqual(model.invoke("x" * 400).content, "hi")
+            self.assertEqual(asyncio.run(async_model.ainvoke("x" * 400)).content, "hi")
+        # (buckets refill meanwhile; a reservation would add several seconds)
+        self.assertLessEqual(self.reserved_seconds(), before)
+        self.assertEqual(ratelimit._pending.get(), ())
+        self.assertEqual(calls, {"unknown": 1})
+
+    def test_backlogged_provider_answers_429_before_running(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("alice", password="pw"))
+        limits = ratelimit.limits_for("openai/gpt-oss-120b")
+        ratelimit.get_buckets().reserve("openai/gpt-oss-120b", limits, limits.tpm * 2, max_wait=0)
+        ratelimit.get_buckets().reserve("openai/gpt-oss-120b", limits, limits.tpm, max_wait=120)
+
+        response = client.post("/v1/messages/?thread_id=t-limited", {"user_prompt": "hello there"}, format="json")
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), ratelimit.budget())
+        self.assertEqual(self.take_calls(), {})
+        self.assertIsNone(self.app.get_state({"configurable": {"thread_id": "t-limited"}}).values.get("messages"))
+
+
+class StartupImportTests(SimpleTestCase):
+    """
+    Importing the API views leaves channel nodes and provider SDKs unloaded.
+    """
+
+    LAZY_MODULES = [
+        "langchain_groq", "langchain_openai", "langchain_community.tools.tavily_search", "langgraph.prebuilt",
+        "googleapiclient.discovery", "google_auth_oauthlib.flow", "sklearn", "src.agent.nodes.intent",
+        "src.agent.nodes.chat",
+    ]
+
+    def test_views_import_is_lazy(self):
+        script = ("import sys, django; django.setup(); import home.views; "
+                  f"print('LOADED:' + ','.join(m for m in {self.LAZY_MODULES!r} if m in sys.modules))")
+        env = {**os.environ, "AGENT_WARM_ON_STARTUP": "0", "DJANGO_SETTINGS_MODULE": "backend.settings"}
+        result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        loaded = [line for line in result.stdout.splitlines() if line.startswith("LOADED:")]
+        self.assertEqual(loaded, ["LOADED:"])
+
+    def test_registry_builds_every_node(self):
+        app = graph.create_workflow(MemorySaver())
+        self.assertEqual(set(app.nodes) - {"__start__"}, set(graph.NODES))
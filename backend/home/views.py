@@ -5,14 +5,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import redirect
-from django.http import JsonResponse, HttpResponse
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from django.shortcuts import redirect
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.errors import HttpError
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 from django.contrib.auth.models import User
@@ -22,14 +15,28 @@ from django.dispatch import receiver
 from allauth.account.signals import user_logged_in
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.permissions import AllowAny
-from .serializer import LoginSerializer, RegisterSerializer, UserDetailsSerializer
-from .models import ServiceCredential
-from email.mime.text import MIMEText
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.pagination import CursorPagination
+from .serializer import LoginSerializer, RegisterSerializer, UserDetailsSerializer, ThreadCatalogSerializer
+from .models import ServiceCredential, ThreadCatalog, WorkflowJob
+from . import jobs
+from .idempotency import idempotent
+from .renderers import ORJSONRenderer
 from src.agent.graph import run_workflow_api, resume_workflow_api
-import base64
+from src.agent.graph import arun_workflow_api, aresume_workflow_api, serialize_state
+from src.agent.graph import run_workflow_streaming, resume_workflow_streaming
+from src.agent.thread_locks import ThreadBusy
+from src.agent import ratelimit
+from src.agent.ratelimit import RateLimited
+from src.agent.history import DEFAULT_PAGE_SIZE, latest_checkpoint_id, read_page, read_state
+from asgiref.sync import sync_to_async
+from django.views import View
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authentication import get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
 import uuid
-import sqlite3
 import os, json
 class LoginView(APIView):
     permission_classes = [AllowAny]
@@ -62,14 +69,6 @@ class LoginView(APIView):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework import status
-from rest_framework.authtoken.models import Token
-from allauth.socialaccount.providers.oauth2.client import OAuth2Client
-from dj_rest_auth.registration.views import SocialLoginView
-from allauth.socialaccount.models import SocialAccount
 
 from django.utils.timezone import now
 class GoogleLoginCallbackView(APIView):
@@ -83,6 +82,8 @@ class GoogleLoginCallbackView(APIView):
         user.save(update_fields=['last_login'])
 
         # Optional: tag the session
+        from allauth.socialaccount.models import SocialAccount
+
         social_account = SocialAccount.objects.filter(user=user, provider='google').first()
         extra_data = social_account.extra_data if social_account else {}
 
@@ -135,13 +136,95 @@ class RegisterUser(APIView):
 
 
 
+# Payload keys returned whatever `?fields=` asks for
+ENVELOPE_FIELDS = ("status", "message", "thread_id")
+
+
+def _fields_param(params):
+    """
+    `?fields=interrupt,preview,result` as a set, or None when not given.
+    """
+    value = params.get("fields")
+    if not value:
+        return None
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def workflow_payload(result, thread_id, interrupt_message, fields=None):
+    """
+    Build the (body, status code) pair for a run/resume result.
+
+    With `fields`, the body keeps the envelope keys and the listed ones;
+    listed state keys (e.g. `preview`) are returned under `state`, and only
+    those are serialized. Listing `state` returns the whole state.
+    """
+    state_fields = None if fields is None or "state" in fields else fields
+
+    # Check if workflow was interrupted
+    if result.get("status") == "interrupt":
+        payload, code = {
+            "status": "interrupt",
+            "message": interrupt_message,
+            "interrupt": result.get("interrupt"),
+            "thread_id": thread_id,
+            "state": serialize_state(result.get("state"), state_fields)
+        }, status.HTTP_202_ACCEPTED
+    # Workflow completed successfully
+    elif res := result.get("result", {}):
+        payload, code = {
+            "status": res.get("status", "success"),
+            "message": res.get("message", "Workflow completed"),
+            "thread_id": thread_id,
+            "result": res
+        }, status.HTTP_200_OK
+    else:
+        payload, code = {
+            "status": "completed",
+            "message": "Workflow completed",
+            "thread_id": thread_id,
+            "state": serialize_state(result, state_fields)
+        }, status.HTTP_200_OK
+
+    return project_payload(payload, fields), code
+
+
+def retry_later_response(e, response_class=Response):
+    """
+    409 for a thread another request is running, or 429 when the LLM
+    providers' rate limits are too far behind; both with Retry-After.
+    """
+    if isinstance(e, ThreadBusy):
+        response = response_class({"error": str(e), "thread_id": e.thread_id}, status=status.HTTP_409_CONFLICT)
+    else:
+        response = response_class({"error": str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response["Retry-After"] = str(e.retry_after)
+    return response
+
+
+def project_payload(payload, fields):
+    """
+    `payload` limited to the envelope keys and `fields` (see workflow_payload).
+    """
+    if fields is None:
+        return payload
+    projected = {key: value for key, value in payload.items() if key in ENVELOPE_FIELDS or key in fields}
+    state = payload.get("state")
+    if state and "state" not in fields:
+        state = {key: value for key, value in state.items() if key in fields}
+        if state:
+            projected["state"] = state
+    return projected
+
+
 class PromptInputView(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
 
+    @idempotent
     def post(self, request):
         """
-        Start a new workflow or continue an existing one.
+        Start a new workflow or continue an existing one. Retries carrying the same
+        `Idempotency-Key` header get the first response replayed.
         """
         data = request.data
         user_prompt = data.get("user_prompt")
@@ -158,34 +241,14 @@ class PromptInputView(APIView):
 
         try:
             result = run_workflow_api(user_prompt, user_id, thread_id)
-            
-            # Check if workflow was interrupted
-            if result.get("status") == "interrupt":
-                return Response({
-                    "status": "interrupt",
-                    "message": "Workflow interrupted - human input required",
-                    "interrupt": result.get("interrupt"),
-                    "thread_id": thread_id,
-                    "state": result.get("state")
-                }, status=status.HTTP_202_ACCEPTED)
-            
-            # Workflow completed successfully
-            res = result.get("result", {})
-            if res:
-                return Response({
-                    "status": res.get("status", "success"),
-                    "message": res.get("message", "Workflow completed"),
-                    "thread_id": thread_id,
-                    "result": res
-                })
-            else:
-                return Response({
-                    "status": "completed",
-                    "message": "Workflow completed",
-                    "thread_id": thread_id,
-                    "state": result
-                })
-                
+            payload, code = workflow_payload(
+                result, thread_id, "Workflow interrupted - human input required",
+                _fields_param(request.query_params)
+            )
+            return Response(payload, status=code)
+
+        except (ThreadBusy, RateLimited) as e:
+            return retry_later_response(e)
         except Exception as e:
             return Response(
                 {"error": f"Workflow failed: {str(e)}"}, 
@@ -197,9 +260,11 @@ class ResumeWorkflowView(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
 
+    @idempotent
     def post(self, request):
         """
-        Resume a workflow after providing human feedback.
+        Resume a workflow after providing human feedback. Retries carrying the same
+        `Idempotency-Key` header get the first response replayed.
         """
         data = request.data
         user_feedback = data.get("feedback")
@@ -219,100 +284,322 @@ class ResumeWorkflowView(APIView):
 
         try:
             result = resume_workflow_api(user_feedback, thread_id)
-            
-            # Check if workflow was interrupted again
-            if result.get("status") == "interrupt":
-                return Response({
-                    "status": "interrupt",
-                    "message": "Workflow interrupted again - additional input required",
-                    "interrupt": result.get("interrupt"),
-                    "thread_id": thread_id,
-                    "state": result.get("state")
-                }, status=status.HTTP_202_ACCEPTED)
-            
-            # Workflow completed successfully
-            res = result.get("result", {})
-            if res:
-                return Response({
-                    "status": res.get("status", "success"),
-                    "message": res.get("message", "Workflow completed"),
-                    "thread_id": thread_id,
-                    "result": res
-                })
-            else:
-                return Response({
-                    "status": "completed",
-                    "message": "Workflow completed",
-                    "thread_id": thread_id,
-                    "state": result
-                })
-                
+            payload, code = workflow_payload(
+                result, thread_id, "Workflow interrupted again - additional input required",
+                _fields_param(request.query_params)
+            )
+            return Response(payload, status=code)
+
+        except (ThreadBusy, RateLimited) as e:
+            return retry_later_response(e)
         except Exception as e:
             return Response(
                 {"error": f"Workflow resume failed: {str(e)}"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class ThreadHistoryView(APIView):
+def _job_work(run):
+    """
+    `run` for the worker pool. A busy thread or the rate limits met once the
+    job starts end it with the 409 / 429 retry_later_response would give.
+    """
+
+    def work():
+        try:
+            return run()
+        except (ThreadBusy, RateLimited) as e:
+            response = retry_later_response(e)
+            raise jobs.JobRejected(response.data["error"], response.status_code, e.retry_after)
+
+    return work
+
 
+class JobSubmitView(APIView):
+    """
+    Queue a workflow run (`kind = "run"`) or resume on the background worker
+    pool and answer 202 with the job id; poll `/v1/jobs/<job_id>/` for it.
+    """
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    kind = None
 
-    def get(self, request, thread_id):
+    @idempotent
+    def post(self, request):
         """
-        Get conversation history for a specific thread_id.
+        Retries carrying the same `Idempotency-Key` header get the first
+        job back instead of queueing the work again.
         """
-        if not thread_id:
-            return Response(
-                {"error": "thread_id is required"}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        data = request.data
+        user_id = request.user.id
+        if self.kind == "run":
+            user_prompt = data.get("user_prompt")
+            thread_id = request.query_params.get('thread_id', str(uuid.uuid4()))
+            if not user_prompt:
+                return Response({"error": "user_prompt is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+            @_job_work
+            def work():
+                return workflow_payload(run_workflow_api(user_prompt, user_id, thread_id), thread_id,
+                                        "Workflow interrupted - human input required")
+        else:
+            user_feedback = data.get("feedback")
+            thread_id = request.query_params.get('thread_id')
+            if not user_feedback:
+                return Response({"error": "feedback is required"}, status=status.HTTP_400_BAD_REQUEST)
+            if not thread_id:
+                return Response({"error": "thread_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+            @_job_work
+            def work():
+                return workflow_payload(resume_workflow_api(user_feedback, thread_id), thread_id,
+                                        "Workflow interrupted again - additional input required")
 
         try:
-            from src.agent.graph import create_workflow, serialize_state
-            
-            # Create workflow instance
-            app = create_workflow()
-            config = {"configurable": {"thread_id": thread_id}}
-            
-            # Get the current state from checkpoints
-            current_state = app.get_state(config)
-            
-            if not current_state or not current_state.values:
-                return Response({
-                    "thread_id": thread_id,
-                    "message": "No conversation history found for this thread",
-                    "history": [],
-                    "state": {}
-                })
-            
-            # Serialize the state for JSON response
-            serialized_state = serialize_state(current_state.values)
-            
-            # Extract messages from state
-            messages = current_state.values.get("messages", [])
-            
-            # Format messages for frontend
-            formatted_messages = []
-            for msg in messages:
-                formatted_messages.append({
-                    "type": msg.__class__.__name__,
-                    "content": msg.content if hasattr(msg, 'content') else str(msg),
-                })
-            
-            return Response({
-                "thread_id": thread_id,
-                "message": "Conversation history retrieved successfully",
-                "history": formatted_messages,
-                "state": serialized_state,
-                "total_messages": len(formatted_messages)
-            })
-            
+            # Don't queue work the providers' rate limits can't take soon
+            ratelimit.check(ratelimit.configured_models())
+            job = jobs.submit(work, user_id, thread_id, self.kind)
+        except RateLimited as e:
+            return retry_later_response(e)
+        except jobs.JobRejected as e:
+            response = Response({"error": str(e)}, status=e.status)
+            response["Retry-After"] = str(e.retry_after)
+            return response
+
+        response = Response({"status": WorkflowJob.QUEUED, "job_id": str(job.id), "thread_id": thread_id},
+                            status=status.HTTP_202_ACCEPTED)
+        response["Location"] = f"/v1/jobs/{job.id}/"
+        return response
+
+
+class PromptJobView(JobSubmitView):
+    kind = "run"
+
+
+class ResumeJobView(JobSubmitView):
+    kind = "resume"
+
+
+class JobStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+
+    def get(self, request, job_id):
+        """
+        Status of one of the caller's jobs. `?wait=N` long-polls: the answer
+        comes as soon as the job finishes, or after N seconds (at most 30).
+        A finished job carries the run's `response` (the body /v1/messages/
+        or /v1/resume/ would have returned, projected by `?fields=`).
+        """
+        job = WorkflowJob.objects.filter(pk=job_id, user=request.user).first()
+        if job is None:
+            return Response({"error": "job not found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            timeout = float(request.query_params.get("wait") or 0)
+        except ValueError:
+            return Response({"error": "wait must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = jobs.wait(job, max(0.0, timeout))
+        body = {
+            "job_id": str(job.id),
+            "kind": job.kind,
+            "status": job.status,
+            "thread_id": job.thread_id,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+        }
+        if job.status == WorkflowJob.QUEUED:
+            body["queue_position"] = jobs.queue_position(job)
+        if job.response is not None:
+            body["response"] = project_payload(job.response, _fields_param(request.query_params))
+            body["response_code"] = job.response_code
+        if job.error:
+            body["error"] = job.error
+        if job.retry_after is not None:
+            # The run met a busy thread or the rate limits; submit it again later
+            body["response_code"] = job.response_code
+            response = Response(body, status=job.response_code)
+            response["Retry-After"] = str(job.retry_after)
+            return response
+        active = job.status in WorkflowJob.ACTIVE
+        return Response(body, status=status.HTTP_202_ACCEPTED if active else status.HTTP_200_OK)
+
+
+class JobMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+
+    def get(self, request):
+        """
+        Worker pool size, queue depth and job totals of this process.
+        """
+        return Response(jobs.metrics())
+
+
+async def _token_user(request):
+    """
+    Resolve `Authorization: Token <key>` for the plain Django async views,
+    mirroring DRF's TokenAuthentication.
+    """
+    auth = get_authorization_header(request).split()
+    if len(auth) != 2 or auth[0].lower() != b"token":
+        return None
+    try:
+        user, _ = await sync_to_async(TokenAuthentication().authenticate_credentials)(auth[1].decode())
+    except (AuthenticationFailed, UnicodeError):
+        return None
+    return user
+
+
+def _orjson_response(payload, code):
+    # Same encoding as the DRF views' ORJSONRenderer
+    return HttpResponse(ORJSONRenderer().render(payload), content_type="application/json", status=code)
+
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or b"{}")
+    except ValueError:
+        return {}
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncPromptInputView(View):
+    """
+    Async twin of PromptInputView. Serve through backend/asgi.py so the
+    LLM and tool calls don't hold a worker while they wait on the network.
+    """
+
+    async def post(self, request):
+        user = await _token_user(request)
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."},
+                                status=status.HTTP_401_UNAUTHORIZED)
+
+        user_prompt = _json_body(request).get("user_prompt")
+        thread_id = request.GET.get('thread_id', str(uuid.uuid4()))
+
+        if not user_prompt:
+            return JsonResponse({"error": "user_prompt is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = await arun_workflow_api(user_prompt, user.id, thread_id)
+            payload, code = workflow_payload(
+                result, thread_id, "Workflow interrupted - human input required", _fields_param(request.GET)
+            )
+            return _orjson_response(payload, code)
+        except (ThreadBusy, RateLimited) as e:
+            return retry_later_response(e, JsonResponse)
         except Exception as e:
-            return Response(
-                {"error": f"Failed to retrieve history: {str(e)}"}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            return JsonResponse({"error": f"Workflow failed: {str(e)}"},
+                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncResumeWorkflowView(View):
+    """
+    Async twin of ResumeWorkflowView.
+    """
+
+    async def post(self, request):
+        user = await _token_user(request)
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."},
+                                status=status.HTTP_401_UNAUTHORIZED)
+
+        user_feedback = _json_body(request).get("feedback")
+        thread_id = request.GET.get('thread_id')
+
+        if not user_feedback:
+            return JsonResponse({"error": "feedback is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not thread_id:
+            return JsonResponse({"error": "thread_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = await aresume_workflow_api(user_feedback, thread_id)
+            payload, code = workflow_payload(
+                result, thread_id, "Workflow interrupted again - additional input required",
+                _fields_param(request.GET)
             )
+            return _orjson_response(payload, code)
+        except (ThreadBusy, RateLimited) as e:
+            return retry_later_response(e, JsonResponse)
+        except Exception as e:
+            return JsonResponse({"error": f"Workflow resume failed: {str(e)}"},
+                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _sse(frame):
+    return f"event: {frame['type']}\ndata: {json.dumps(frame, default=str)}\n\n"
+
+
+def _sse_response(frames):
+    async def body():
+        async for frame in frames:
+            yield _sse(frame)
+
+    response = StreamingHttpResponse(body(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # keep proxies from buffering frames
+    return response
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class PromptStreamView(View):
+    """
+    Server-Sent Events version of PromptInputView: emits node progress and
+    chat/draft tokens as they happen, then an interrupt or complete frame.
+    """
+
+    async def post(self, request):
+        user = await _token_user(request)
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."},
+                                status=status.HTTP_401_UNAUTHORIZED)
+
+        user_prompt = _json_body(request).get("user_prompt")
+        thread_id = request.GET.get('thread_id', str(uuid.uuid4()))
+
+        if not user_prompt:
+            return JsonResponse({"error": "user_prompt is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return _sse_response(run_workflow_streaming(user_prompt, user.id, thread_id))
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class ResumeStreamView(View):
+    """
+    Server-Sent Events version of ResumeWorkflowView.
+    """
+
+    async def post(self, request):
+        user = await _token_user(request)
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."},
+                                status=status.HTTP_401_UNAUTHORIZED)
+
+        user_feedback = _json_body(request).get("feedback")
+        thread_id = request.GET.get('thread_id')
+
+        if not user_feedback:
+            return JsonResponse({"error": "feedback is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if not thread_id:
+            return JsonResponse({"error": "thread_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return _sse_response(resume_workflow_streaming(user_feedback, thread_id))
+
+
+def _cursor_param(params, name):
+    value = params.get(name)
+    return None if value in (None, "") else int(value)
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
 
 class ThreadHistoryView(APIView):
 
@@ -322,6 +609,14 @@ class ThreadHistoryView(APIView):
     def get(self, request, thread_id):
         """
         Get conversation history for a specific thread_id.
+
+        `?channels=messages,intent` limits the returned state to those keys;
+        `history` is included whenever `messages` is.
+
+        `?limit=`, `?before=` and `?after=` (message indexes) return one page
+        of messages: the newest `limit` by default, the ones before/after the
+        given index otherwise. The ETag is the thread's newest checkpoint id;
+        send it back as If-None-Match to get 304 while nothing changed.
         """
         if not thread_id:
             return Response(
@@ -329,53 +624,93 @@ class ThreadHistoryView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        params = request.query_params
+        channels = params.get("channels")
+        channels = [c.strip() for c in channels.split(",") if c.strip()] if channels else None
+        paginated = any(params.get(name) for name in ("limit", "before", "after"))
         try:
-            from src.agent.graph import create_workflow, serialize_state
-            
-            # Create workflow instance
-            app = create_workflow()
-            config = {"configurable": {"thread_id": thread_id}}
-            
-            # Get the current state from checkpoints
-            current_state = app.get_state(config)
-            
-            if not current_state or not current_state.values:
-                return Response({
-                    "thread_id": thread_id,
-                    "message": "No conversation history found for this thread",
-                    "history": [],
-                    "state": {}
-                })
-            
-            # Serialize the state for JSON response
-            serialized_state = serialize_state(current_state.values)
-            
-            # Extract messages from state
-            messages = current_state.values.get("messages", [])
-            
-            # Format messages for frontend
-            formatted_messages = []
-            for msg in messages:
-                formatted_messages.append({
-                    "type": msg.__class__.__name__,
-                    "content": msg.content if hasattr(msg, 'content') else str(msg),
-                    "timestamp": getattr(msg, 'timestamp', None)
-                })
-            
-            return Response({
-                "thread_id": thread_id,
-                "message": "Conversation history retrieved successfully",
-                "history": formatted_messages,
-                "state": serialized_state,
-                "total_messages": len(formatted_messages)
-            })
-            
+            before, after = _cursor_param(params, "before"), _cursor_param(params, "after")
+            limit = _cursor_param(params, "limit") or DEFAULT_PAGE_SIZE
+        except ValueError:
+            return Response({"error": "before, after and limit must be integers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Newest checkpoint straight from the checkpointer, no graph involved
+            checkpoint_id = latest_checkpoint_id(thread_id)
+            etag = f'"{checkpoint_id}"'
+            if checkpoint_id and _etag_matches(request.headers.get("If-None-Match"), etag):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            elif paginated:
+                response = self.page(thread_id, checkpoint_id, before, after, limit, channels)
+            else:
+                response = self.full(thread_id, checkpoint_id, channels)
+            if checkpoint_id:
+                response["ETag"] = etag
+                response["Cache-Control"] = "private, no-cache"
+            return response
+
         except Exception as e:
             return Response(
                 {"error": f"Failed to retrieve history: {str(e)}"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @staticmethod
+    def empty(thread_id):
+        return Response({
+            "thread_id": thread_id,
+            "message": "No conversation history found for this thread",
+            "history": [],
+            "state": {}
+        })
+
+    def full(self, thread_id, checkpoint_id, channels):
+        values = read_state(thread_id, channels, checkpoint_id=checkpoint_id) if checkpoint_id else None
+        if not values:
+            return self.empty(thread_id)
+
+        serialized_state = serialize_state(values)
+        formatted_messages = serialized_state.get("messages", [])
+
+        return Response({
+            "thread_id": thread_id,
+            "message": "Conversation history retrieved successfully",
+            "history": formatted_messages,
+            "state": serialized_state,
+            "total_messages": len(formatted_messages)
+        })
+
+    def page(self, thread_id, checkpoint_id, before, after, limit, channels):
+        page = read_page(thread_id, before, after, limit, channels,
+                         checkpoint_id=checkpoint_id) if checkpoint_id else None
+        if page is None:
+            return self.empty(thread_id)
+
+        formatted_messages = [
+            {"index": page["start"] + i, **message}
+            for i, message in enumerate(serialize_state({"messages": page["messages"]}).get("messages", []))
+        ]
+        stop = page["start"] + len(formatted_messages)
+
+        return Response({
+            "thread_id": thread_id,
+            "message": "Conversation history retrieved successfully",
+            "history": formatted_messages,
+            "state": serialize_state(page["state"]),
+            "total_messages": page["total"],
+            "has_more_before": page["start"] > 0,
+            "has_more_after": stop < page["total"],
+        })
+
+
+class ThreadCursorPagination(CursorPagination):
+    # Served straight from the (user, -last_activity) index
+    ordering = "-last_activity"
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = "page_size"
+
 
 class ThreadsListView(APIView):
     permission_classes = [IsAuthenticated]
@@ -383,61 +718,17 @@ class ThreadsListView(APIView):
 
     def get(self, request):
         """
-        Return a list of distinct thread_ids from the LangGraph SQLite checkpointer.
+        Return the user's threads from the thread catalog, most recently
+        active first, one cursor page at a time.
         """
-        try:
-            conn = sqlite3.connect("checkpoints.db")
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-
-            thread_ids = set()
-
-            # Try common LangGraph tables first
-            for table in ["checkpoints", "checkpoint_writes"]:
-                try:
-                    cur.execute(f"SELECT DISTINCT thread_id FROM {table}")
-                    rows = cur.fetchall()
-                    for r in rows:
-                        if r["thread_id"]:
-                            thread_ids.add(str(r["thread_id"]))
-                except Exception:
-                    # Table may not exist; continue to next strategy
-                    pass
-
-            # If still empty, discover any table that has a thread_id column
-            if not thread_ids:
-                cur.execute(
-                    """
-                    SELECT name FROM sqlite_master 
-                    WHERE type='table' AND name NOT LIKE 'sqlite_%'
-                    """
-                )
-                tables = [row[0] for row in cur.fetchall()]
-                for tbl in tables:
-                    try:
-                        cur.execute(f"PRAGMA table_info({tbl})")
-                        cols = [c[1] for c in cur.fetchall()]  # col names
-                        if "thread_id" in cols:
-                            cur.execute(f"SELECT DISTINCT thread_id FROM {tbl}")
-                            for r in cur.fetchall():
-                                if r[0]:
-                                    thread_ids.add(str(r[0]))
-                    except Exception:
-                        continue
-
-            conn.close()
-
-            
-
-            return Response({
-                "threads": thread_ids,
-                "count": len(thread_ids)
-            })
-        except Exception as e:
-            return Response(
-                {"error": f"Failed to list threads: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        paginator = ThreadCursorPagination()
+        threads = ThreadCatalog.objects.filter(user=request.user)
+        page = paginator.paginate_queryset(threads, request, view=self)
+        return Response({
+            "threads": ThreadCatalogSerializer(page, many=True).data,
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+        })
 
 
 SCOPES = [
@@ -455,6 +746,9 @@ class ConnectGmailView(APIView):
     def post(self, request):
         user_id = request.data.get("user_id")
         print(user_id)
+        # Imported here so worker boot doesn't pay for the OAuth client stack
+        from google_auth_oauthlib.flow import Flow
+
         flow = Flow.from_client_secrets_file(
             'src/agent/nodes/client_secret.json',
             scopes=SCOPES,
@@ -479,6 +773,8 @@ class OAuth2CallbackView(APIView):
         print(state)
         user_id = state.get("user_id")
 
+        from google_auth_oauthlib.flow import Flow
+
         flow = Flow.from_client_secrets_file(
             'src/agent/nodes/client_secret.json',
             scopes=SCOPES,
@@ -513,6 +809,8 @@ class ConnectCalendarView(APIView):
 
     def post(self, request):
         user_id = request.data.get("user_id")
+        from google_auth_oauthlib.flow import Flow
+
         flow = Flow.from_client_secrets_file(
             'src/agent/nodes/calender/credentials.json',
             scopes=SCOPES,
@@ -536,6 +834,8 @@ class CalendarOAuth2CallbackView(APIView):
         state = json.loads(request.GET.get("state", "{}"))
         user_id = state.get("user_id")
 
+        from google_auth_oauthlib.flow import Flow
+
         flow = Flow.from_client_secrets_file(
             'src/agent/nodes/calender/credentials.json',
             scopes=SCOPES,
@@ -586,11 +886,10 @@ def ensure_valid(creds):
         creds.refresh(Request())
     return creds
 
-from googleapiclient.discovery import build
-from rest_framework.views import APIView
-
 class CreateEventView(APIView):
     def post(self, request):
+        from googleapiclient.discovery import build
+
         user_id = 1
         creds = load_calendar_credentials(user_id)
         if not creds:
@@ -0,0 +1,107 @@
+"""
+Per-user thread catalog maintained by the graph entry points.
+
+After every API or streaming run the thread's row in `home.ThreadCatalog` is
+upserted with its owner, last intent and whether it waits on an interrupt, so
+`ThreadsListView` reads one indexed table instead of scanning checkpoints.
+A thread keeps the owner it was first recorded with; runs by anyone else on
+it leave its row alone.
+
+`backfill()` builds the rows of threads that only exist as checkpoints
+(threads from before the catalog, or a restored database) from their newest
+checkpoint: `manage.py checkpoints catalog`.
+"""
+
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+
+from home.models import ThreadCatalog
+
+TITLE_LENGTH = 80
+
+
+def thread_title(values: Dict[str, Any]) -> str:
+    """
+    Short title from the thread's first human message (or its current prompt).
+    """
+    messages = values.get("messages") or []
+    text = messages[0].content if messages and hasattr(messages[0], "content") else values.get("user_prompt")
+    text = re.sub(r"\s+", " ", str(text or "")).strip()
+    return text if len(text) <= TITLE_LENGTH else text[:TITLE_LENGTH - 1].rstrip() + "…"
+
+
+def record_run(thread_id: str, values: Optional[Dict[str, Any]], interrupted: bool,
+               user_id: Optional[int] = None) -> None:
+    """
+    Upsert the catalog row for `thread_id` after a run. Never raises: a
+    catalog failure must not fail the conversation turn.
+    """
+    values = values or {}
+    user_id = user_id or values.get("user_id")
+    fields: Dict[str, Any] = {"pending_interrupt": interrupted}
+    if values.get("intent"):
+        fields["last_intent"] = values["intent"]
+    try:
+        entry = ThreadCatalog.objects.filter(thread_id=thread_id).only("user_id").first()
+        if entry is not None and user_id and entry.user_id not in (None, user_id):
+            print(f"[CATALOG] Thread {thread_id} belongs to user {entry.user_id}, not recording run of {user_id}")
+            return
+        if entry is not None and entry.user_id is None and user_id:
+            fields["user_id"] = user_id
+        ThreadCatalog.objects.update_or_create(
+            thread_id=thread_id,
+            defaults=fields,
+            create_defaults={**fields, "user_id": user_id, "title": thread_title(values)},
+        )
+    except Exception as e:
+        print(f"[CATALOG] Could not record thread {thread_id}: {e}")
+
+
+arecord_run = sync_to_async(record_run)
+
+
+def backfill(path: str) -> int:
+    """
+    Add catalog rows for the threads stored in the checkpoint database at
+    `path` that have none, from each thread's newest checkpoint. Existing
+    rows are left as they are. Returns the number of rows added.
+    """
+    from src.agent import retention
+    from src.agent.checkpointer import PooledSqliteSaver
+    from src.agent.history import read_state
+
+    conn = retention.connect(path)
+    try:
+        threads = retention.latest_checkpoints(conn)
+    finally:
+        conn.close()
+    known = set(ThreadCatalog.objects.filter(thread_id__in=[t for t, _, _ in threads])
+                .values_list("thread_id", flat=True))
+    users = set(User.objects.values_list("id", flat=True))
+
+    saver = PooledSqliteSaver(path, readers=1)
+    added = 0
+    try:
+        for thread_id, checkpoint_id, interrupted in threads:
+            if thread_id in known:
+                continue
+            values = read_state(thread_id, ["user_id", "intent", "messages", "user_prompt"], saver=saver) or {}
+            user_id = values.get("user_id")
+            ThreadCatalog.objects.create(
+                thread_id=thread_id,
+                user_id=user_id if user_id in users else None,
+                title=thread_title(values),
+                last_intent=values.get("intent") or "",
+                pending_interrupt=interrupted,
+            )
+            # last_activity is auto_now; date the row by its checkpoint instead
+            ThreadCatalog.objects.filter(thread_id=thread_id).update(
+                last_activity=datetime.fromtimestamp(retention.checkpoint_time(checkpoint_id), tz=timezone.utc))
+            added += 1
+    finally:
+        saver.close()
+    return added
@@ -0,0 +1,537 @@
+"""
+SQLite checkpointer tuned for a threaded server.
+
+`PooledSqliteSaver` is a SqliteSaver whose writes go through one writer
+connection, serialized by the saver's lock and started with BEGIN IMMEDIATE,
+while reads (get_state, history) are served by a small pool of read-only
+connections. In WAL mode readers never block the writer or each other, so a
+slow history read no longer holds up every other conversation's checkpoint.
+
+Every connection, including the async one opened by the registry, gets the
+same PRAGMAs: WAL, synchronous=NORMAL (durable across application crashes;
+the last transactions can be lost on power failure), a memory-mapped read
+path, a larger page cache and a busy timeout, so writers from other
+processes (workers, `manage.py checkpoints compact`) wait instead of failing
+with "database is locked".
+
+Both savers here (and `DedupAsyncSqliteSaver`, the registry's async one)
+store conversation messages once per thread instead of once per checkpoint;
+see src/agent/message_store.py.
+
+`ShardedSaver` spreads threads over several checkpoint savers (one SQLite
+file each) by a stable hash of thread_id, so conversations on different
+shards never wait on each other's write lock.
+
+Settings (environment):
+    CHECKPOINT_READERS          read connections in the pool (default 4)
+    CHECKPOINT_BUSY_TIMEOUT_MS  how long to wait for a lock (default 30000)
+    CHECKPOINT_SHARDS           number of shard files (default 1, no sharding)
+"""
+
+import heapq
+import os
+import queue
+import sqlite3
+import threading
+import zlib
+from contextlib import closing, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver, ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple,
+)
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.checkpoint.sqlite.utils import search_where
+
+from src.agent import message_store
+from src.agent.serde import ZstdSerializer, get_serde
+
+DEFAULT_READERS = 4
+DEFAULT_BUSY_TIMEOUT_MS = 30000
+MMAP_SIZE = 256 * 1024 * 1024
+CACHE_SIZE_KIB = 16 * 1024
+# Pending writes of one checkpoint, as SqliteSaver reads them
+SELECT_WRITES = ("SELECT task_id, channel, type, value FROM writes "
+                 "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx")
+
+
+def shard_count() -> int:
+    return max(1, int(os.getenv("CHECKPOINT_SHARDS", 1)))
+
+
+def shard_paths(path: str, shards: int) -> List[str]:
+    """
+    Files holding `shards` shards of the database at `path`:
+    checkpoints.db -> checkpoints.0-of-4.db, ... A single shard is `path` itself.
+    """
+    if shards <= 1:
+        return [path]
+    root, ext = os.path.splitext(path)
+    return [f"{root}.{i}-of-{shards}{ext or '.db'}" for i in range(shards)]
+
+
+def shard_index(thread_id: Any, shards: int) -> int:
+    """
+    Stable shard of a thread (crc32, identical across processes and restarts).
+    """
+    return zlib.crc32(str(thread_id).encode()) % shards
+
+
+def busy_timeout_ms() -> int:
+    return int(os.getenv("CHECKPOINT_BUSY_TIMEOUT_MS", DEFAULT_BUSY_TIMEOUT_MS))
+
+
+def pragmas() -> List[str]:
+    """
+    PRAGMA statements applied to every checkpoint connection.
+    """
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={busy_timeout_ms()}",
+        f"PRAGMA mmap_size={MMAP_SIZE}",
+        f"PRAGMA cache_size=-{CACHE_SIZE_KIB}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def connect(path: str, readonly: bool = False) -> sqlite3.Connection:
+    """
+    Open a tuned connection to the checkpoint database. Writer connections
+    start every transaction with BEGIN IMMEDIATE, so they queue for the write
+    lock up front instead of failing when upgrading a read transaction.
+    """
+    conn = sqlite3.connect(
+        path,
+        timeout=busy_timeout_ms() / 1000,
+        check_same_thread=False,
+        isolation_level=None if readonly else "IMMEDIATE",
+    )
+    if not readonly:
+        # Only takes effect on a new database; see src/agent/retention.py
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    for pragma in pragmas():
+        conn.execute(pragma)
+    if readonly:
+        conn.execute("PRAGMA query_only=ON")
+    return conn
+
+
+class PooledSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver with one serialized writer connection and a pool of reader
+    connections.
+    """
+
+    def __init__(self, path: str, readers: Optional[int] = None, *, serde: Optional[SerializerProtocol] = None):
+        self._local = threading.local()
+        super().__init__(connect(path), serde=serde or get_serde())
+        self.path = path
+        self.setup()
+        size = readers if readers is not None else int(os.getenv("CHECKPOINT_READERS", DEFAULT_READERS))
+        # Slots start empty (None) and are connected on first use
+        self._readers: "queue.LifoQueue[Optional[sqlite3.Connection]]" = queue.LifoQueue()
+        for _ in range(max(1, size)):
+            self._readers.put(None)
+        self._opened: List[sqlite3.Connection] = []
+
+    # `conn` is always the writer: a put or put_writes made while a list()
+    # generator is suspended on this thread must not land on its reader.
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self._writer
+
+    @conn.setter
+    def conn(self, value: sqlite3.Connection) -> None:
+        self._writer = value
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        if transaction:
+            with super().cursor(transaction=True) as cur:
+                yield cur
+            return
+
+        if getattr(self._local, "reader", None) is not None:
+            # nested read on this thread: reuse its connection
+            cur = self._local.reader.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+            return
+
+        reader = self._readers.get()
+        if reader is None:
+            reader = connect(self.path, readonly=True)
+            self._opened.append(reader)
+        self._local.reader = reader
+        # One read transaction, so the checkpoint and its pending writes
+        # come from the same snapshot
+        reader.execute("BEGIN")
+        cur = reader.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+            reader.execute("COMMIT")
+            self._local.reader = None
+            self._readers.put(reader)
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        super().setup()
+        self._writer.execute(message_store.SCHEMA)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        # the outer read is reused by SqliteSaver, so messages come from the same snapshot
+        with self.cursor(transaction=False) as cur:
+            return message_store.resolve(cur, super().get_tuple(config), self.serde)
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        # SqliteSaver.list() with its second cursor (pending writes, messages)
+        # taken from the reader connection instead of `self.conn`
+        where, params = search_where(config, filter, before)
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata "
+                 f"FROM checkpoints {where} ORDER BY checkpoint_id DESC")
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        with self.cursor(transaction=False) as cur, closing(cur.connection.cursor()) as wcur:
+            cur.execute(query, params)
+            for thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata in cur:
+                wcur.execute(SELECT_WRITES, (thread_id, checkpoint_ns, checkpoint_id))
+                writes = [(task_id, channel, self.serde.loads_typed((t, value))) for task_id, channel, t, value in wcur]
+                item = CheckpointTuple(
+                    {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                      "checkpoint_id": checkpoint_id}},
+                    self.serde.loads_typed((type_, checkpoint)),
+                    self.jsonplus_serde.loads(metadata) if metadata is not None else {},
+                    {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                      "checkpoint_id": parent_id}} if parent_id else None,
+                    writes,
+                )
+                yield message_store.resolve(wcur, item, self.serde)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        checkpoint, blobs = message_store.split(checkpoint, self.serde)
+        if blobs:
+            with self.cursor() as cur:
+                message_store.store(cur, str(config["configurable"]["thread_id"]), blobs, self.serde)
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute(message_store.DELETE_THREAD, (str(thread_id),))
+
+    def close(self) -> None:
+        """
+        Close the writer and every reader connection.
+        """
+        with self.lock:
+            for reader in self._opened:
+                reader.close()
+            self._opened.clear()
+            self._writer.close()
+
+
+class DedupAsyncSqliteSaver(AsyncSqliteSaver):
+    """
+    AsyncSqliteSaver storing messages by reference, like PooledSqliteSaver.
+    """
+
+    async def setup(self) -> None:
+        if self.is_setup:
+            return
+        await super().setup()
+        async with self.lock:
+            await self.conn.execute(message_store.SCHEMA)
+            await self.conn.commit()
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await message_store.aresolve(self.conn, await super().aget_tuple(config), self.serde)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        # AsyncSqliteSaver holds its lock while yielding; lookups share the connection
+        async for item in super().alist(config, filter=filter, before=before, limit=limit):
+            yield await message_store.aresolve(self.conn, item, self.serde)
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        checkpoint, blobs = message_store.split(checkpoint, self.serde)
+        if blobs:
+            await self.setup()
+            async with self.lock:
+                await message_store.astore(self.conn, str(config["configurable"]["thread_id"]), blobs, self.serde)
+                await self.conn.commit()
+        return await super().aput(config, checkpoint, metadata, new_versions)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await super().adelete_thread(thread_id)
+        async with self.lock:
+            await self.conn.execute(message_store.DELETE_THREAD, (str(thread_id),))
+            await self.conn.commit()
+
+
+class ShardedSaver(BaseCheckpointSaver):
+    """
+    Routes every call to the saver owning the config's thread_id. Listing
+    without a thread merges the shards newest first. Works with sync
+    (PooledSqliteSaver) and async (AsyncSqliteSaver) shards alike.
+    """
+
+    def __init__(self, shards: Sequence[BaseCheckpointSaver]):
+        super().__init__(serde=shards[0].serde)
+        self.shards = list(shards)
+
+    def shard_for(self, thread_id: Any) -> BaseCheckpointSaver:
+        return self.shards[shard_index(thread_id, len(self.shards))]
+
+    def _route(self, config: RunnableConfig) -> BaseCheckpointSaver:
+        return self.shard_for(config["configurable"]["thread_id"])
+
+    def _targets(self, config: Optional[RunnableConfig]) -> List[BaseCheckpointSaver]:
+        if config and config.get("configurable", {}).get("thread_id") is not None:
+            return [self._route(config)]
+        return self.shards
+
+    @staticmethod
+    def _checkpoint_id(item: CheckpointTuple) -> str:
+        # time-ordered, so newest first is descending id, as each shard lists them
+        return item.checkpoint["id"]
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self._route(config).get_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        targets = self._targets(config)
+        streams = [t.list(config, filter=filter, before=before, limit=limit) for t in targets]
+        merged = streams[0] if len(streams) == 1 else heapq.merge(
+            *streams, key=self._checkpoint_id, reverse=True)
+        for n, item in enumerate(merged):
+            if limit is not None and n >= limit:
+                break
+            yield item
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        return self._route(config).put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        self._route(config).put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.shard_for(thread_id).delete_thread(thread_id)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._route(config).aget_tuple(config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        targets = self._targets(config)
+        if len(targets) == 1:
+            async for item in targets[0].alist(config, filter=filter, before=before, limit=limit):
+                yield item
+            return
+        # Lazy merge, like `list`: one buffered item per shard, newest first
+        streams = [t.alist(config, filter=filter, before=before, limit=limit) for t in targets]
+        heads = {}
+        try:
+            for stream in streams:
+                if (item := await anext(stream, None)) is not None:
+                    heads[stream] = item
+            yielded = 0
+            while heads and (limit is None or yielded < limit):
+                stream = max(heads, key=lambda s: self._checkpoint_id(heads[s]))
+                yield heads[stream]
+                yielded += 1
+                if (item := await anext(stream, None)) is None:
+                    del heads[stream]
+                else:
+                    heads[stream] = item
+        finally:
+            for stream in streams:
+                await stream.aclose()
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await self._route(config).aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        await self._route(config).aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.shard_for(thread_id).adelete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        return self.shards[0].get_next_version(current, channel)
+
+    def close(self) -> None:
+        for shard in self.shards:
+            shard.close()
+
+
+def open_checkpointer(path: str, shards: Optional[int] = None) -> BaseCheckpointSaver:
+    """
+    The sync checkpointer for the database at `path`: a PooledSqliteSaver,
+    or a ShardedSaver over one per shard file when sharding is configured.
+    """
+    paths = shard_paths(path, shard_count() if shards is None else shards)
+    if len(paths) == 1:
+        return PooledSqliteSaver(paths[0])
+    return ShardedSaver([PooledSqliteSaver(p) for p in paths])
+
+
+def reshard(sources: Sequence[str], path: str, shards: int, batch: int = 500) -> Dict[str, int]:
+    """
+    Copy every checkpoint, write and message blob from the `sources` files into the layout
+    for `shards` shards of `path`, rows going to the shard owning their
+    thread. Rows are copied as stored (no deserialization) and existing rows
+    in the targets are replaced, so the copy can be re-run. Returns rows copied.
+    """
+    targets = shard_paths(path, shards)
+    overlap = set(map(os.path.abspath, sources)) & set(map(os.path.abspath, targets))
+    if overlap:
+        raise ValueError(f"Source and target shards overlap: {sorted(overlap)}")
+
+    conns = []
+    for target in targets:
+        conn = connect(target)
+        SqliteSaver(conn).setup()
+        conn.execute(message_store.SCHEMA)
+        conns.append(conn)
+
+    copied = {"checkpoints": 0, "writes": 0, "message_blobs": 0}
+    try:
+        for source in sources:
+            src = connect(source, readonly=True)
+            try:
+                for table in copied:
+                    if not src.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                       (table,)).fetchone():
+                        continue
+                    cur = src.execute(f"SELECT * FROM {table}")
+                    placeholders = ", ".join("?" * len(cur.description))
+                    while rows := cur.fetchmany(batch):
+                        by_shard: Dict[int, List[tuple]] = {}
+                        for row in rows:
+                            by_shard.setdefault(shard_index(row[0], shards), []).append(row)
+                        for i, shard_rows in by_shard.items():
+                            with conns[i]:
+                                conns[i].executemany(
+                                    f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", shard_rows)
+                        copied[table] += len(rows)
+            finally:
+                src.close()
+    finally:
+        for conn in conns:
+            conn.close()
+    print(f"[CHECKPOINTER] Resharded {len(sources)} file(s) into {shards}: {copied}")
+    return copied
+
+
+# table -> (type column, payload column)
+PAYLOAD_COLUMNS = {
+    "checkpoints": ("type", "checkpoint"),
+    "writes": ("type", "value"),
+    "message_blobs": ("type", "blob"),
+}
+
+
+def iter_payloads(path: str, limit: Optional[int] = None) -> Iterator[Tuple[str, bytes]]:
+    """
+    Stored (type, bytes) payloads of the checkpoints and writes in `path`.
+    """
+    conn = connect(path, readonly=True)
+    try:
+        for table, (type_col, data_col) in PAYLOAD_COLUMNS.items():
+            query = f"SELECT {type_col}, {data_col} FROM {table} WHERE {data_col} IS NOT NULL"
+            if limit:
+                query += f" LIMIT {int(limit)}"
+            yield from conn.execute(query)
+    finally:
+        conn.close()
+
+
+def recompress(path: str, serde: ZstdSerializer, batch: int = 500) -> Dict[str, int]:
+    """
+    Rewrite stored payloads in `path` with `serde`'s current settings:
+    compress old msgpack rows, re-encode rows made with another dictionary,
+    or decompress everything when compression is off. Payloads are only
+    unpacked to bytes, never deserialized. Returns rows rewritten per table.
+    """
+    rewritten = {}
+    conn = connect(path)
+    try:
+        for table, (type_col, data_col) in PAYLOAD_COLUMNS.items():
+            rewritten[table] = 0
+            last = 0
+            while True:
+                rows = conn.execute(
+                    f"SELECT rowid, {type_col}, {data_col} FROM {table} WHERE rowid > ? AND {data_col} IS NOT NULL"
+                    f" ORDER BY rowid LIMIT ?", (last, batch)).fetchall()
+                if not rows:
+                    break
+                last = rows[-1][0]
+                updates = []
+                for rowid, type_, data in rows:
+                    new_type, new_data = serde.pack(*serde.unpack(type_, data))
+                    if new_type != type_ or new_data != data:
+                        updates.append((new_type, new_data, rowid))
+                if updates:
+                    # one short write transaction per batch
+                    with conn:
+                        conn.executemany(
+                            f"UPDATE {table} SET {type_col} = ?, {data_col} = ? WHERE rowid = ?", updates)
+                    rewritten[table] += len(updates)
+    finally:
+        conn.close()
+    print(f"[CHECKPOINTER] Recompressed {path}: {rewritten}")
+    return rewritten
+
+
+def dedup_messages(path: str, serde: Optional[SerializerProtocol] = None, batch: int = 200) -> int:
+    """
+    Move the inline message lists of checkpoints saved before message_store
+    existed into `message_blobs`. Returns checkpoints rewritten.
+    """
+    serde = serde or get_serde()
+    rewritten = 0
+    conn = connect(path)
+    try:
+        SqliteSaver(conn).setup()
+        conn.execute(message_store.SCHEMA)
+        last = 0
+        while True:
+            rows = conn.execute(
+                "SELECT rowid, thread_id, type, checkpoint FROM checkpoints WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last, batch)).fetchall()
+            if not rows:
+                break
+            last = rows[-1][0]
+            with conn:
+                cur = conn.cursor()
+                for rowid, thread_id, type_, data in rows:
+                    stored, blobs = message_store.split(serde.loads_typed((type_, data)), serde)
+                    if not blobs:
+                        continue
+                    message_store.store(cur, thread_id, blobs, serde)
+                    cur.execute("UPDATE checkpoints SET type = ?, checkpoint = ? WHERE rowid = ?",
+                                (*serde.dumps_typed(stored), rowid))
+                    rewritten += 1
+    finally:
+        conn.close()
+    print(f"[CHECKPOINTER] Moved messages of {rewritten} checkpoints in {path} to message_blobs")
+    return rewritten
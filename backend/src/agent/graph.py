@@ -3,52 +3,69 @@
 LangGraph workflow definition for the multichannel agent.
 """
 
-from typing import Dict, Any
-from langgraph.graph import StateGraph, END
+import asyncio
+import importlib
+from typing import TYPE_CHECKING, Dict, Any
 from dotenv import load_dotenv
 from langgraph.types import Command
-import json
-# ✅ Persistent checkpointing
-import sqlite3
-from langgraph.checkpoint.sqlite import SqliteSaver
-from langgraph.checkpoint.memory import MemorySaver
 # Messages
 from langchain_core.messages import HumanMessage
 
+if TYPE_CHECKING:
+    from langgraph.graph import StateGraph
+
 load_dotenv()
-memory = MemorySaver()
 
 # Flexible imports for package vs script
     # Absolute imports when run directly
-from src.agent.state import AgentState
-from src.agent.nodes.intent import intent_node
-from src.agent.nodes.compose_email import compose_email
-from src.agent.nodes.compose_linkedin import compose_linkedin
-from src.agent.nodes.human_gate import human_gate, _process_edits, process_linkedin_edits
-from langchain_core.messages import HumanMessage, AIMessageChunk, ToolMessage
-from src.agent.nodes.chat import chat_node
-from src.agent.nodes.send_email import send_email_node
-from src.agent.nodes.post_linkedin import post_linkedin_node
-from src.agent.nodes.compose_cal_events import compose_events
-
-
-def create_workflow():
+from src.agent import ratelimit
+from src.agent.ratelimit import RateLimited
+from src.agent.thread_locks import ThreadBusy, athread_lease, resume_lock_wait, thread_lease
+from src.agent.registry import aget_app, get_app, get_checkpointer
+from src.agent.catalog import arecord_run, record_run
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+
+
+# node name -> (module, sync implementation, async implementation). Node
+# modules, and the provider SDKs and tools they use, are imported when the
+# workflow is first built rather than when this module is imported.
+NODES = {
+    "intent": ("src.agent.nodes.intent", "intent_node", "aintent_node"),
+    "compose_email": ("src.agent.nodes.compose_email", "compose_email", "acompose_email"),
+    "compose_linkedin": ("src.agent.nodes.compose_linkedin", "compose_linkedin", "acompose_linkedin"),
+    "calendar": ("src.agent.nodes.compose_cal_events", "compose_events", "acompose_events"),
+    "post_linkedin": ("src.agent.nodes.post_linkedin", "post_linkedin_node", "apost_linkedin_node"),
+    "human_gate": ("src.agent.nodes.human_gate", "human_gate", "human_gate"),  # no I/O, same in both modes
+    "edits": ("src.agent.nodes.human_gate", "_process_edits", "_aprocess_edits"),
+    "process_linkedin_edits": ("src.agent.nodes.human_gate", "process_linkedin_edits", "aprocess_linkedin_edits"),
+    "send_email": ("src.agent.nodes.send_email", "send_email_node", "asend_email_node"),  # tool node
+    "chat": ("src.agent.nodes.chat", "chat_node", "achat_node"),
+}
+
+
+def load_node(name: str, use_async: bool = False):
+    """
+    The implementation of node `name`, importing its module on first use.
+    """
+    module, sync_name, async_name = NODES[name]
+    return getattr(importlib.import_module(module), async_name if use_async else sync_name)
+
+
+def build_workflow(use_async: bool = False) -> "StateGraph":
     """
-    Create the LangGraph workflow for the multichannel agent.
+    Build (but do not compile) the LangGraph workflow for the multichannel agent.
+    With `use_async=True` the nodes await their LLM and tool calls; that graph
+    must be driven with `astream`/`ainvoke`.
     """
+    from langgraph.graph import END, StateGraph
+    from src.agent.state import AgentState
+
     workflow = StateGraph(AgentState)
 
     # Nodes
-    workflow.add_node("intent", intent_node)
-    workflow.add_node("compose_email", compose_email)
-    workflow.add_node("compose_linkedin", compose_linkedin)
-    workflow.add_node("calendar", compose_events)
-    workflow.add_node("post_linkedin", post_linkedin_node)
-    workflow.add_node("human_gate", human_gate)
-    workflow.add_node("edits", _process_edits)
-    workflow.add_node("process_linkedin_edits", process_linkedin_edits)
-    workflow.add_node("send_email", send_email_node)  # tool node
-    workflow.add_node("chat", chat_node)
+    for name in NODES:
+        workflow.add_node(name, load_node(name, use_async))
 
     # Entry
     workflow.set_entry_point("intent")
@@ -59,14 +76,64 @@ def create_workflow():
     workflow.add_edge("edits", "human_gate")
     workflow.add_edge("process_linkedin_edits", "human_gate")
     workflow.add_edge("send_email", END)
+    return workflow
+
+
+def create_workflow(checkpointer=None, use_async: bool = False):
+    """
+    Compile the workflow. Defaults to the process-wide SQLite checkpointer;
+    request handlers should use `get_app()` / `aget_app()` instead of
+    compiling per call.
+    """
+    if checkpointer is None:
+        checkpointer = get_checkpointer()
+    return build_workflow(use_async).compile(checkpointer=checkpointer)
+
+
+def _run_until_interrupt(app, graph_input, config):
+    """
+    Stream `graph_input` once and return (interrupt, values): the first
+    pending interrupt (or None when the run finished) and the state values
+    at that point, taken from the stream instead of re-reading the checkpoint.
+    """
+    values, intr = None, None
+    # Drain the stream rather than returning at the interrupt: it ends right
+    # after it, and leaving early would abandon the run's pending futures.
+    for mode, chunk in app.stream(graph_input, config, stream_mode=["values", "updates"]):
+        if mode == "values":
+            values = chunk
+        elif "__interrupt__" in chunk:
+            intr = chunk["__interrupt__"][0]
+        else:
+            print(chunk)
+    return intr, _values_or_state(app, config, values)
+
+
+def _values_or_state(app, config, values):
+    # A resume that interrupts again inside the same node completes no step,
+    # so nothing was streamed; only then fall back to the checkpoint.
+    if values is None:
+        return app.get_state(config).values
+    return values
+
+
+async def _arun_until_interrupt(app, graph_input, config):
+    """
+    Async variant of `_run_until_interrupt`.
+    """
+    values, intr = None, None
+    async for mode, chunk in app.astream(graph_input, config, stream_mode=["values", "updates"]):
+        if mode == "values":
+            values = chunk
+        elif "__interrupt__" in chunk:
+            intr = chunk["__interrupt__"][0]
+    return intr, await _avalues_or_state(app, config, values)
 
 
-    # ✅ Compile with persistent SQLite checkpointer
-    conn = sqlite3.connect("checkpoints.db", check_same_thread=False)
-    # con = sqlite3.connect("new_checkpoints.db", check_same_thread=False)
-    checkpointer = SqliteSaver(conn)
-    app = workflow.compile(checkpointer=checkpointer)
-    return app
+async def _avalues_or_state(app, config, values):
+    if values is None:
+        return (await app.aget_state(config)).values
+    return values
 
 
 def run_workflow(user_prompt: str, thread_id: str = "default") -> Dict[str, Any]:
@@ -74,295 +141,331 @@ def run_workflow(user_prompt: str, thread_id: str = "default") -> Dict[str, Any]
     Run the workflow with a single user turn; previous turns are restored
     from the persistent checkpoint (same thread_id).
     """
-    app = create_workflow()
+    app = get_app()
     config = {"configurable": {"thread_id": thread_id}}
 
     # ✅ Only add the new user message; history is persisted
     new_input = {"messages": [HumanMessage(content=user_prompt)],
                  "user_prompt": user_prompt}
 
-    for event in app.stream(new_input, config):
-        print(f"Event: {event}")
-    final_state = app.get_state(config)
-    return final_state.values
+    _, values = _run_until_interrupt(app, new_input, config)
+    return values
 
 
 def run_workflow_interactive(user_prompt: str, thread_id: str = "default") -> Dict[str, Any]:
-    app = create_workflow()
+    app = get_app()
     config = {"configurable": {"thread_id": thread_id}}
 
-    pending_state = {"messages": [HumanMessage(content=user_prompt)],
+    pending_input = {"messages": [HumanMessage(content=user_prompt)],
                      "user_prompt": user_prompt}
 
     while True:
-        interrupted = False
-
-        for event in app.stream(pending_state, config):
-            # print(f"Event: {event}")
-
-            if "__interrupt__" in event:
-                interrupted = True
-                intr = event["__interrupt__"][0]          # Interrupt object
-                payload = getattr(intr, "value", {}) or {}
-                msg = payload.get("message", "Provide input:")
-                preview = payload.get("preview")
-                if preview:
-                    print("\n--- Preview ---")
-                    print(preview)
-                    print("----------------\n")
-
-                # ONE resume per interrupt
-                user_feedback = input(msg + "\n> ")
-                app.invoke(Command(resume=user_feedback), config=config)
+        intr, values = _run_until_interrupt(app, pending_input, config)
+        if intr is None:
+            return values
 
-                # Continue from current state for the next step/interrupt
-                pending_state = None
-                break  # restart streaming loop
+        payload = getattr(intr, "value", {}) or {}
+        msg = payload.get("message", "Provide input:")
+        preview = payload.get("preview")
+        if preview:
+            print("\n--- Preview ---")
+            print(preview)
+            print("----------------\n")
 
-        if not interrupted:
-            final_state = app.get_state(config)
-            return final_state.values
+        # ONE resume per interrupt; the next pass streams the resume itself
+        user_feedback = input(msg + "\n> ")
+        pending_input = Command(resume=user_feedback)
 
 
 def run_workflow_api(user_prompt: str, user_id : int, thread_id: str = "default") -> Dict[str, Any]:
     """
     Run workflow for API endpoints - returns interrupt state instead of blocking for input.
     """
-    app = create_workflow()
+    app = get_app()
     config = {"configurable": {"thread_id": thread_id}}
 
     pending_state = {"messages": [HumanMessage(content=user_prompt)],
                      "user_prompt": user_prompt, "user_id" : user_id}
 
-    for event in app.stream(pending_state, config):
-        print(event)
-        if "__interrupt__" in event:
-            # Return interrupt information for API handling
-            intr = event["__interrupt__"][0]
-            payload = getattr(intr, "value", {}) or {}
-            
-            return {
-                "status": "interrupt",
-                "interrupt": {
-                    "message": payload.get("message", "Please provide input"),
-                    "preview": payload.get("preview"),
-                    "thread_id": thread_id
-                },
-                "state": app.get_state(config).values
-            }
+    # Raises RateLimited up front when the providers are too far behind, and
+    # ThreadBusy when another run holds the thread past THREAD_LOCK_WAIT
+    with ratelimit.admission(), thread_lease(thread_id):
+        intr, values = _run_until_interrupt(app, pending_state, config)
+        record_run(thread_id, values, intr is not None, user_id)
+    if intr is not None:
+        # Return interrupt information for API handling
+        return _interrupt_result(intr, thread_id, "Please provide input", values)
 
     # No interrupt occurred, workflow completed
-    final_state = app.get_state(config)
-    return final_state.values
+    return values
 
 
 def resume_workflow_api(user_feedback: str, thread_id: str = "default") -> Dict[str, Any]:
     """
     Resume workflow after receiving human feedback via API.
     """
-    app = create_workflow()
-    print(f"[RESUME] THREAD ID-", thread_id)
+    app = get_app()
+    print("[RESUME] THREAD ID-", thread_id)
     config = {"configurable": {"thread_id": thread_id}}
 
     print("[RESUME] USER FEEDBACK -", user_feedback)
 
-    print("[RESUME] Resuming Feedback")
-    # Resume with the feedback
-    app.invoke(Command(resume=user_feedback), config=config)
-
-    print("[RESUME] Resume Feedback Done")
-    # Continue streaming to check for more interrupts or completion
-    for event in app.stream(None, config):
-        if "__interrupt__" in event:
-            # Another interrupt occurred
-            intr = event["__interrupt__"][0]
-            payload = getattr(intr, "value", {}) or {}
-            
-            return {
-                "status": "interrupt",
-                "interrupt": {
-                    "message": payload.get("message", "Please provide additional input"),
-                    "preview": payload.get("preview"),
-                    "thread_id": thread_id
-                },
-                "state": app.get_state(config).values
-            }
+    # Stream the resume once; it runs until the next interrupt or the end
+    # A duplicate resume must not resume the same checkpoint again: by default
+    # it fails fast (THREAD_RESUME_LOCK_WAIT=0) instead of queueing
+    with ratelimit.admission(), thread_lease(thread_id, resume_lock_wait()):
+        intr, values = _run_until_interrupt(app, Command(resume=user_feedback), config)
+        print("[RESUME] Resume Feedback Done")
+        record_run(thread_id, values, intr is not None)
+    if intr is not None:
+        # Another interrupt occurred
+        return _interrupt_result(intr, thread_id, "Please provide additional input", values)
 
     # Workflow completed
-    final_state = app.get_state(config)
-    return final_state.values
+    return values
+
+
+def _interrupt_result(intr, thread_id: str, default_message: str, values: Dict[str, Any]) -> Dict[str, Any]:
+    payload = getattr(intr, "value", {}) or {}
+    return {
+        "status": "interrupt",
+        "interrupt": {
+            "message": payload.get("message", default_message),
+            "preview": payload.get("preview"),
+            "thread_id": thread_id
+        },
+        "state": values
+    }
+
+
+async def arun_workflow_api(user_prompt: str, user_id : int, thread_id: str = "default") -> Dict[str, Any]:
+    """
+    Async variant of `run_workflow_api`: LLM and tool calls are awaited, so
+    the event loop can serve other conversations meanwhile.
+    """
+    app = await aget_app()
+    config = {"configurable": {"thread_id": thread_id}}
+
+    pending_state = {"messages": [HumanMessage(content=user_prompt)],
+                     "user_prompt": user_prompt, "user_id" : user_id}
+
+    with ratelimit.admission():
+        async with athread_lease(thread_id):
+            intr, values = await _arun_until_interrupt(app, pending_state, config)
+            await arecord_run(thread_id, values, intr is not None, user_id)
+    if intr is not None:
+        return _interrupt_result(intr, thread_id, "Please provide input", values)
+    return values
+
+
+async def aresume_workflow_api(user_feedback: str, thread_id: str = "default") -> Dict[str, Any]:
+    """
+    Async variant of `resume_workflow_api`.
+    """
+    app = await aget_app()
+    config = {"configurable": {"thread_id": thread_id}}
+    print("[RESUME] THREAD ID-", thread_id)
+
+    with ratelimit.admission():
+        async with athread_lease(thread_id, resume_lock_wait()):
+            intr, values = await _arun_until_interrupt(app, Command(resume=user_feedback), config)
+            await arecord_run(thread_id, values, intr is not None)
+    if intr is not None:
+        return _interrupt_result(intr, thread_id, "Please provide additional input", values)
+    return values
+
+
+# Values serialize_state passes through unchanged
+JSON_TYPES = (str, int, float, bool, list, dict)
+
 
+def serialize_message(message) -> Dict[str, Any]:
+    content = message.content if isinstance(message, BaseMessage) else str(message)
+    return {"type": type(message).__name__, "content": content}
 
-def serialize_state(state):
+
+def serialize_state(state, fields=None):
     """
-    Serialize LangGraph state to JSON-safe format.
+    Serialize LangGraph state to JSON-safe format in one pass, keeping only
+    the keys in `fields` when given: messages become {"type", "content"},
+    JSON values are kept as they are, anything else becomes its string.
     """
     if not state:
         return {}
-    
+
     serialized = {}
     for key, value in state.items():
+        if fields is not None and key not in fields:
+            continue
         if key == "messages":
-            # Convert messages to serializable format
-            serialized[key] = [
-                {
-                    "type": msg.__class__.__name__,
-                    "content": msg.content if hasattr(msg, 'content') else str(msg)
-                }
-                for msg in value
-            ]
-        elif isinstance(value, (str, int, float, bool, type(None))):
+            serialized[key] = [serialize_message(msg) for msg in value]
+        elif value is None or isinstance(value, JSON_TYPES):
             serialized[key] = value
-        elif isinstance(value, (list, dict)):
-            try:
-                # Try to serialize complex objects
-                serialized[key] = value
-            except:
-                serialized[key] = str(value)
         else:
             # Convert other objects to string
             serialized[key] = str(value)
-    
     return serialized
 
-# def serialise_ai_message_chunk(chunk): 
-#     if(isinstance(chunk, AIMessageChunk)):
-#         return chunk.content
-#     else:
-#         raise TypeError(
-#             f"Object of type {type(chunk).__name__} is not correctly formatted for serialisation"
-#         )
-
-
-# async def run_workflow_streaming(user_prompt: str, thread_id: str = "default"):
-#     """
-#     Generator that yields streaming updates for the workflow.
-#     Yields dictionaries with status updates, interrupts, and final results.
-#     """
-#     app = create_workflow()
-#     config = {"configurable": {"thread_id": thread_id}}
-
-#     pending_state = {"messages": [HumanMessage(content=user_prompt)],
-#                      "user_prompt": user_prompt}
-
-#     # Yield initial status
-#     yield {
-#         "type": "status",
-#         "message": "Starting workflow...",
-#         "thread_id": thread_id
-#     }
-
-#     try:
-#         async for event in app.astream_events(pending_state, config):
-#             print(event)
-#             event_type = event["event"]
-#             if event_type == "on_chat_model_stream":
-#                 chunk_content = serialise_ai_message_chunk(event["data"]["chunk"])
-#                 safe_content = chunk_content.replace("'", "\\'").replace("\n", "\\n")
-#                 yield f"data: {{\"type\": \"content\", \"content\": \"{safe_content}\"}}\n\n"
-            
-#             elif event_type == "on_chat_model_end":
-#                 # Check if there are tool calls for search
-#                 tool_calls = event["data"]["output"].tool_calls if hasattr(event["data"]["output"], "tool_calls") else []
-#                 search_calls = [call for call in tool_calls if call["name"] == "tavily_search_results_json"]
-                
-#                 if search_calls:
-#                     # Signal that a search is starting
-#                     search_query = search_calls[0]["args"].get("query", "")
-#                     # Escape quotes and special characters
-#                     safe_query = search_query.replace('"', '\\"').replace("'", "\\'").replace("\n", "\\n")
-#                     yield f"data: {{\"type\": \"search_start\", \"query\": \"{safe_query}\"}}\n\n"
-                    
-#             elif event_type == "on_tool_end" and event["name"] == "tavily_search_results_json":
-#                 # Search completed - send results or error
-#                 output = event["data"]["output"]
-                
-#                 # Check if output is a list 
-#                 if isinstance(output, list):
-#                     # Extract URLs from list of search results
-#                     urls = []
-#                     for item in output:
-#                         if isinstance(item, dict) and "url" in item:
-#                             urls.append(item["url"])
-                    
-#                     # Convert URLs to JSON and yield them
-#                     urls_json = json.dumps(urls)
-#                     yield f"data: {{\"type\": \"search_results\", \"urls\": {urls_json}}}\n\n"
-        
-#         # Send an end event
-#         yield f"data: {{\"type\": \"end\"}}\n\n"
-#     except Exception as e:
-#         yield {
-#             "type": "error",
-#             "message": f"Workflow failed: {str(e)}",
-#             "error": str(e)
-#         }
-
-
-# def resume_workflow_streaming(user_feedback: str, thread_id: str = "default"):
-#     """
-#     Generator that yields streaming updates when resuming workflow.
-#     """
-#     app = create_workflow()
-#     config = {"configurable": {"thread_id": thread_id}}
-
-#     # Yield resume status
-#     yield {
-#         "type": "status",
-#         "message": "Resuming workflow with feedback...",
-#         "thread_id": thread_id
-#     }
-
-#     try:
-#         # Resume with the feedback
-#         app.invoke(Command(resume=user_feedback), config=config)
-
-#         # Continue streaming to check for more interrupts or completion
-#         for event in app.stream(None, config):
-#             if "__interrupt__" in event:
-#                 intr = event["__interrupt__"][0]
-#                 payload = getattr(intr, "value", {}) or {}
-                
-#                 # Get current state and serialize it
-#                 current_state = app.get_state(config).values
-#                 serialized_state = serialize_state(current_state)
-                
-#                 yield {
-#                     "type": "interrupt",
-#                     "message": "Workflow interrupted again - additional input required",
-#                     "interrupt": {
-#                         "message": payload.get("message", "Please provide additional input"),
-#                         "preview": payload.get("preview"),
-#                         "thread_id": thread_id
-#                     },
-#                     "state": serialized_state
-#                 }
-#                 return  # Stop streaming on interrupt
-            
-#             # Yield node completion updates
-#             for node_name, node_data in event.items():
-#                 if node_name != "__interrupt__":
-#                     yield {
-#                         "type": "node_complete",
-#                         "node": node_name,
-#                         "message": f"Completed {node_name}",
-#                         "data": serialize_state(node_data) if isinstance(node_data, dict) else str(node_data)
-#                     }
-
-#         # Workflow completed
-#         final_state = app.get_state(config)
-#         serialized_final_state = serialize_state(final_state.values)
-        
-#         yield {
-#             "type": "complete",
-#             "message": "Workflow completed successfully",
-#             "result": final_state.values.get("result"),
-#             "state": serialized_final_state
-#         }
-
-#     except Exception as e:
-#         yield {
-#             "type": "error",
-#             "message": f"Workflow resume failed: {str(e)}",
-#             "error": str(e)
-#         }
+
+# LLM calls tagged with one of these stream their tokens to the client;
+# extraction calls (JSON) are not worth showing.
+STREAMED_TAGS = {"chat", "draft"}
+
+
+def _top_level_node(metadata: Dict[str, Any]) -> str:
+    ns = metadata.get("checkpoint_ns") or ""
+    return ns.split("|", 1)[0].split(":", 1)[0] or metadata.get("langgraph_node")
+
+
+class _FrameCallbacks(BaseCallbackHandler):
+    """
+    Turns a run's callbacks into progress frames (node start/complete,
+    chat/draft tokens, tool calls) handed to `emit`. Sync tools call it from
+    worker threads.
+    """
+
+    run_inline = True
+
+    def __init__(self, emit):
+        self.emit = emit
+        self._nodes: Dict[Any, str] = {}
+        self._models: Dict[Any, tuple] = {}
+        self._tools: Dict[Any, tuple] = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id, tags=None, name=None, **kwargs):
+        # Top-level graph nodes carry a "graph:step:N" tag; nested runnables
+        # (the chat node's react agent, compose stages) don't.
+        if name in NODES and any(t.startswith("graph:step:") for t in tags or []):
+            self._nodes[run_id] = name
+            self.emit({"type": "node_start", "node": name})
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        if (name := self._nodes.pop(run_id, None)) is not None:
+            self.emit({"type": "node_complete", "node": name})
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._nodes.pop(run_id, None)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, metadata=None, **kwargs):
+        if STREAMED_TAGS.intersection(tags or []):
+            self._models[run_id] = ("chat" if "chat" in tags else "draft", _top_level_node(metadata or {}))
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if run_id in self._models and isinstance(token, str) and token:
+            channel, node = self._models[run_id]
+            self.emit({"type": "token", "node": node, "channel": channel, "content": token})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._models.pop(run_id, None)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._models.pop(run_id, None)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, metadata=None, name=None, **kwargs):
+        tool = (name or (serialized or {}).get("name"), _top_level_node(metadata or {}))
+        self._tools[run_id] = tool
+        self.emit({"type": "tool_start", "node": tool[1], "tool": tool[0]})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        if (tool := self._tools.pop(run_id, None)) is not None:
+            self.emit({"type": "tool_end", "node": tool[1], "tool": tool[0]})
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._tools.pop(run_id, None)
+
+
+async def _stream_events(app, graph_input, config, thread_id: str, interrupt_message: str):
+    """
+    Run the graph and yield the frames sent by the SSE endpoints: progress
+    frames from `_FrameCallbacks`, then an interrupt or complete frame.
+
+    Uses `astream` rather than `astream_events`: under astream_events
+    LangGraph runs nodes with streaming on, and awaited @task calls (the
+    compose nodes' checkpointed stages) then resolve to None. The
+    "messages" mode makes the chat models stream their tokens.
+    """
+    loop = asyncio.get_running_loop()
+    frames: asyncio.Queue = asyncio.Queue()
+
+    def emit(frame):
+        loop.call_soon_threadsafe(frames.put_nowait, frame)
+
+    async def run():
+        values, pending_interrupt = None, None
+        try:
+            async for mode, chunk in app.astream(graph_input, {**config, "callbacks": [_FrameCallbacks(emit)]},
+                                                 stream_mode=["updates", "values", "messages"]):
+                if mode == "values":
+                    values = chunk
+                elif mode == "updates" and "__interrupt__" in chunk:
+                    pending_interrupt = chunk["__interrupt__"][0]
+            if values is None:
+                values = (await app.aget_state(config)).values
+            await arecord_run(thread_id, values, pending_interrupt is not None)
+            if pending_interrupt is not None:
+                result = _interrupt_result(pending_interrupt, thread_id, interrupt_message, values)
+                emit({"type": "interrupt", "interrupt": result["interrupt"], "state": serialize_state(values)})
+            else:
+                emit({"type": "complete", "result": values.get("result"), "state": serialize_state(values)})
+        except Exception as e:
+            emit(e)
+        finally:
+            emit(None)
+
+    producer = asyncio.create_task(run())
+    try:
+        while (frame := await frames.get()) is not None:
+            if isinstance(frame, Exception):
+                raise frame
+            yield frame
+    finally:
+        # The client went away mid-run: stop the graph too
+        producer.cancel()
+
+
+async def run_workflow_streaming(user_prompt: str, user_id: int, thread_id: str = "default"):
+    """
+    Async generator of progress frames for a new user turn: node start/complete,
+    chat/draft tokens, then a final interrupt or complete frame.
+    """
+    app = await aget_app()
+    config = {"configurable": {"thread_id": thread_id}}
+
+    pending_state = {"messages": [HumanMessage(content=user_prompt)],
+                     "user_prompt": user_prompt, "user_id": user_id}
+
+    yield {"type": "status", "message": "Starting workflow...", "thread_id": thread_id}
+    try:
+        # The run's LLM calls share one queueing budget, as in arun_workflow_api
+        with ratelimit.admission():
+            async with athread_lease(thread_id):
+                async for frame in _stream_events(app, pending_state, config, thread_id, "Please provide input"):
+                    yield frame
+    except ThreadBusy as e:
+        yield {"type": "error", "message": str(e), "error": "thread_busy", "retry_after": e.retry_after}
+    except RateLimited as e:
+        yield {"type": "error", "message": str(e), "error": "rate_limited", "retry_after": e.retry_after}
+    except Exception as e:
+        yield {"type": "error", "message": f"Workflow failed: {str(e)}", "error": str(e)}
+
+
+async def resume_workflow_streaming(user_feedback: str, thread_id: str = "default"):
+    """
+    Async generator of progress frames when resuming after an interrupt.
+    """
+    app = await aget_app()
+    config = {"configurable": {"thread_id": thread_id}}
+
+    yield {"type": "status", "message": "Resuming workflow with feedback...", "thread_id": thread_id}
+    try:
+        with ratelimit.admission():
+            async with athread_lease(thread_id, resume_lock_wait()):
+                async for frame in _stream_events(app, Command(resume=user_feedback), config, thread_id,
+                                                  "Please provide additional input"):
+                    yield frame
+    except ThreadBusy as e:
+        yield {"type": "error", "message": str(e), "error": "thread_busy", "retry_after": e.retry_after}
+    except RateLimited as e:
+        yield {"type": "error", "message": str(e), "error": "rate_limited", "retry_after": e.retry_after}
+    except Exception as e:
+        yield {"type": "error", "message": f"Workflow resume failed: {str(e)}", "error": str(e)}
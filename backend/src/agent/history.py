@@ -0,0 +1,166 @@
+"""
+Read-only access to a thread's latest state, for the history endpoint.
+
+`app.get_state()` goes through the compiled graph: it restores every channel,
+applies pending writes and works out the next tasks and interrupts. Showing
+a conversation needs none of that. `read_state()` reads the newest checkpoint
+straight from the checkpointer's read pool and returns only the state keys
+asked for; stored messages (src/agent/message_store.py) are only loaded when
+`messages` is one of them. `read_page()` returns one window of the messages,
+loading only the messages in it.
+
+The newest checkpoint id (`latest_checkpoint_id()`, one index lookup) changes
+whenever the thread does, so the endpoint uses it as the ETag.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langgraph.checkpoint.base import BaseCheckpointSaver, Checkpoint
+
+from src.agent import message_store
+from src.agent.checkpointer import PooledSqliteSaver, ShardedSaver
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+LATEST_CHECKPOINT_ID = (
+    "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ''"
+    " ORDER BY checkpoint_id DESC LIMIT 1"
+)
+LATEST_CHECKPOINT = (
+    "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ''"
+    " ORDER BY checkpoint_id DESC LIMIT 1"
+)
+CHECKPOINT_BY_ID = (
+    "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '' AND checkpoint_id = ?"
+)
+
+
+def _saver_for(thread_id: str, saver: Optional[BaseCheckpointSaver]) -> BaseCheckpointSaver:
+    if saver is None:
+        from src.agent.registry import get_checkpointer
+
+        saver = get_checkpointer()
+    if isinstance(saver, ShardedSaver):
+        saver = saver.shard_for(thread_id)
+    return saver
+
+
+def _config(thread_id: str, checkpoint_id: Optional[str]) -> Dict[str, Any]:
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+def _select(values: Dict[str, Any], channels: Optional[Iterable[str]]) -> Dict[str, Any]:
+    # The state schema imports langgraph.graph; keep it off the views' import path
+    from src.agent.state import STATE_KEYS
+
+    wanted = STATE_KEYS if channels is None else STATE_KEYS.intersection(channels)
+    return {key: value for key, value in values.items() if key in wanted}
+
+
+def _load_checkpoint(cur, saver: PooledSqliteSaver, thread_id: str,
+                     checkpoint_id: Optional[str]) -> Optional[Checkpoint]:
+    if checkpoint_id:
+        row = cur.execute(CHECKPOINT_BY_ID, (thread_id, checkpoint_id)).fetchone()
+    else:
+        row = cur.execute(LATEST_CHECKPOINT, (thread_id,)).fetchone()
+    return None if row is None else saver.serde.loads_typed(row)
+
+
+def latest_checkpoint_id(thread_id: str, saver: Optional[BaseCheckpointSaver] = None) -> Optional[str]:
+    """
+    Id of the thread's newest checkpoint, without loading it. None if the
+    thread has no checkpoint.
+    """
+    thread_id = str(thread_id)
+    saver = _saver_for(thread_id, saver)
+    if not isinstance(saver, PooledSqliteSaver):
+        item = saver.get_tuple(_config(thread_id, None))
+        return None if item is None else item.checkpoint["id"]
+    with saver.cursor(transaction=False) as cur:
+        row = cur.execute(LATEST_CHECKPOINT_ID, (thread_id,)).fetchone()
+    return None if row is None else row[0]
+
+
+def read_state(thread_id: str, channels: Optional[Iterable[str]] = None,
+               saver: Optional[BaseCheckpointSaver] = None,
+               checkpoint_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    State values of the thread's newest checkpoint (or of `checkpoint_id`),
+    limited to `channels` (all state keys by default). None if the thread
+    has no such checkpoint.
+    """
+    thread_id = str(thread_id)
+    saver = _saver_for(thread_id, saver)
+    if not isinstance(saver, PooledSqliteSaver):
+        item = saver.get_tuple(_config(thread_id, checkpoint_id))
+        return None if item is None else _select(item.checkpoint["channel_values"], channels)
+
+    with saver.cursor(transaction=False) as cur:
+        checkpoint = _load_checkpoint(cur, saver, thread_id, checkpoint_id)
+        if checkpoint is None:
+            return None
+        values = _select(checkpoint.get("channel_values") or {}, channels)
+        selected = {"id": checkpoint.get("id"), "channel_values": values}
+        if keys := message_store.refs(selected):
+            message_store.join(selected, message_store.load(cur, thread_id, keys), saver.serde)
+    return values
+
+
+def window(total: int, before: Optional[int] = None, after: Optional[int] = None,
+           limit: int = DEFAULT_PAGE_SIZE) -> Tuple[int, int]:
+    """
+    [start, stop) of the messages between the `after` and `before` positions
+    (exclusive), at most `limit` of them: the oldest ones after `after`,
+    otherwise the newest ones before `before` (or at the end).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    lo = 0 if after is None else max(0, after + 1)
+    hi = total if before is None else max(0, min(before, total))
+    if after is not None:
+        return min(lo, hi), min(hi, lo + limit)
+    return max(lo, hi - limit), hi
+
+
+def read_page(thread_id: str, before: Optional[int] = None, after: Optional[int] = None,
+              limit: int = DEFAULT_PAGE_SIZE, channels: Optional[Iterable[str]] = None,
+              saver: Optional[BaseCheckpointSaver] = None,
+              checkpoint_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    One page of the thread's messages (see `window`) and the rest of its
+    state, limited to `channels`. Returns {"state", "messages", "start",
+    "total"}, or None if the thread has no such checkpoint. Messages kept
+    in the message store are only loaded for the page.
+    """
+    thread_id = str(thread_id)
+    saver = _saver_for(thread_id, saver)
+    state_channels = None if channels is None else [c for c in channels if c != "messages"]
+    if not isinstance(saver, PooledSqliteSaver):
+        item = saver.get_tuple(_config(thread_id, checkpoint_id))
+        if item is None:
+            return None
+        values = item.checkpoint["channel_values"]
+        messages: List[Any] = values.get("messages") or []
+        start, stop = window(len(messages), before, after, limit)
+        return {"state": _select({k: v for k, v in values.items() if k != "messages"}, state_channels),
+                "messages": messages[start:stop], "start": start, "total": len(messages)}
+
+    with saver.cursor(transaction=False) as cur:
+        checkpoint = _load_checkpoint(cur, saver, thread_id, checkpoint_id)
+        if checkpoint is None:
+            return None
+        values = dict(checkpoint.get("channel_values") or {})
+        stored = values.pop("messages", None) or []
+        keys = message_store.refs({"channel_values": {"messages": stored}})
+        total = len(keys) if keys else len(stored)
+        start, stop = window(total, before, after, limit)
+        if keys:
+            page = {"id": checkpoint.get("id"), "channel_values": {"messages": {message_store.REFS: keys[start:stop]}}}
+            message_store.join(page, message_store.load(cur, thread_id, keys[start:stop]), saver.serde)
+            messages = page["channel_values"]["messages"]
+        else:
+            messages = stored[start:stop]
+    return {"state": _select(values, state_channels), "messages": messages, "start": start, "total": total}
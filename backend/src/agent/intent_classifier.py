@@ -0,0 +1,170 @@
+"""
+Local intent classifier used by `detect_intent` before falling back to the LLM.
+
+A TF-IDF (word + character n-grams) / logistic regression pipeline trained on
+the labeled prompts in `data/intent/train.jsonl`. The fitted model is persisted
+with joblib; if the model file is missing it is trained from the bundled
+dataset on first use. scikit-learn and joblib are imported only then, so
+importing the intent node doesn't pay for them.
+
+Train / evaluate with:  python manage.py intent_classifier train|eval
+"""
+
+import json
+import os
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
+INTENTS = ("email", "linkedin", "chat", "calendar")
+
+DATA_DIR = Path(__file__).resolve().parent / "data" / "intent"
+DEFAULT_TRAIN_SET = DATA_DIR / "train.jsonl"
+DEFAULT_EVAL_SET = DATA_DIR / "eval.jsonl"
+DEFAULT_MODEL_PATH = DATA_DIR / "model.joblib"
+DEFAULT_THRESHOLD = 0.6
+
+_lock = threading.Lock()
+_model: Optional["Pipeline"] = None
+
+
+def model_path() -> Path:
+    """
+    Where the fitted model is stored (override with INTENT_MODEL_PATH).
+    """
+    return Path(os.getenv("INTENT_MODEL_PATH", DEFAULT_MODEL_PATH))
+
+
+def confidence_threshold() -> float:
+    """
+    Minimum classifier probability to trust its answer without calling the
+    LLM (override with INTENT_CONFIDENCE_THRESHOLD; above 1 always calls the LLM).
+    """
+    return float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", DEFAULT_THRESHOLD))
+
+
+def load_dataset(path=DEFAULT_TRAIN_SET) -> Tuple[List[str], List[str]]:
+    """
+    Read a JSONL file of {"text": ..., "intent": ...} rows.
+    """
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row["intent"] not in INTENTS:
+                raise ValueError(f"Unknown intent {row['intent']!r} in {path}")
+            texts.append(row["text"])
+            labels.append(row["intent"])
+    return texts, labels
+
+
+def build_pipeline() -> "Pipeline":
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import FeatureUnion, Pipeline
+
+    # Character n-grams cope with typos and tokens like "@" / "#tag";
+    # word n-grams pick up phrases like "post on linkedin".
+    features = FeatureUnion([
+        ("word", TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True)),
+        ("char", TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 5), sublinear_tf=True)),
+    ])
+    return Pipeline([
+        ("features", features),
+        ("clf", LogisticRegression(C=10, max_iter=1000)),
+    ])
+
+
+def _fit_and_save(dataset, path: Path) -> "Pipeline":
+    import joblib
+
+    texts, labels = load_dataset(dataset)
+    model = build_pipeline().fit(texts, labels)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, path)
+    return model
+
+
+def train(dataset=DEFAULT_TRAIN_SET, path=None) -> "Pipeline":
+    """
+    Fit the classifier on `dataset`, save it to `path` and make it the
+    loaded model.
+    """
+    global _model
+    model = _fit_and_save(dataset, Path(path or model_path()))
+    with _lock:
+        _model = model
+    return model
+
+
+def get_model() -> "Pipeline":
+    """
+    Return the loaded model, reading (or first training) it once per process.
+    """
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                path = model_path()
+                if path.exists():
+                    import joblib
+
+                    _model = joblib.load(path)
+                else:
+                    print("[INTENT] No classifier at", path, "- training from", DEFAULT_TRAIN_SET)
+                    _model = _fit_and_save(DEFAULT_TRAIN_SET, path)
+    return _model
+
+
+def classify(user_prompt: str) -> Tuple[str, float]:
+    """
+    Return (intent, probability) for the most likely intent.
+    """
+    model = get_model()
+    probs = model.predict_proba([user_prompt])[0]
+    best = probs.argmax()
+    return str(model.classes_[best]), float(probs[best])
+
+
+def evaluate(dataset=DEFAULT_EVAL_SET, threshold: Optional[float] = None) -> Dict[str, float]:
+    """
+    Score the loaded model on a labeled set.
+
+    `accuracy` is the classifier alone; `fallback_rate` is the share of prompts
+    below `threshold` (those would go to the LLM) and `confident_accuracy` the
+    accuracy on the rest. Latencies are per single-prompt classification.
+    """
+    if threshold is None:
+        threshold = confidence_threshold()
+    texts, labels = load_dataset(dataset)
+    get_model()
+
+    correct = confident = confident_correct = 0
+    latencies = []
+    for text, label in zip(texts, labels):
+        start = time.perf_counter()
+        intent, prob = classify(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        correct += intent == label
+        if prob >= threshold:
+            confident += 1
+            confident_correct += intent == label
+
+    latencies.sort()
+    return {
+        "samples": len(texts),
+        "threshold": threshold,
+        "accuracy": correct / len(texts),
+        "fallback_rate": 1 - confident / len(texts),
+        "confident_accuracy": confident_correct / confident if confident else 0.0,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))],
+    }
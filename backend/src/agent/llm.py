@@ -0,0 +1,171 @@
+"""
+Process-wide registry of chat model clients.
+
+Nodes ask for a model by role (`get_llm("email_extract")`) instead of building
+a ChatGroq per call. Clients are created once per (provider, model,
+temperature, tags) and share one keep-alive HTTP connection pool (HTTP/2
+when the `h2` package is installed), so the TCP/TLS setup is paid once per
+process instead of on every LLM call.
+
+Which model serves each role lives in DEFAULT_MODELS and can be overridden
+without code changes through the AGENT_MODELS environment variable, a JSON
+object of role -> {"provider", "model", "temperature", "cache"}, e.g.
+
+    AGENT_MODELS='{"chat": {"model": "llama-3.3-70b-versatile", "temperature": 0.5}}'
+
+Roles marked "cache" get the persistent response cache from
+`src/agent/llm_cache.py` when they pass its policy (low temperature, no
+streamed or tool-calling output). Every client queues the calls that miss
+the cache on the model's rate-limit buckets (`src/agent/ratelimit.py`).
+
+httpx async clients are bound to the event loop that first uses them, so
+async callers get clients (and a pool) per running loop - one for the whole
+process under an ASGI server.
+"""
+
+import asyncio
+import importlib.util
+import json
+import os
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from src.agent import llm_cache, ratelimit
+
+# role -> model choice; "tags" mark calls whose tokens are streamed to clients,
+# "cache" opts a deterministic extraction role into the response cache
+DEFAULT_MODELS: Dict[str, Dict[str, Any]] = {
+    "intent":            {"provider": "groq", "model": "openai/gpt-oss-120b"},
+    "route_extract":     {"provider": "groq", "model": "openai/gpt-oss-120b", "temperature": 0.1, "cache": True},
+    "email_extract":     {"provider": "groq", "model": "openai/gpt-oss-120b", "temperature": 0.1, "cache": True},
+    "email_feedback":    {"provider": "groq", "model": "openai/gpt-oss-120b", "temperature": 0.1, "cache": True},
+    "email_draft":       {"provider": "groq", "model": "llama-3.1-8b-instant", "temperature": 0.7},
+    "email_edit":        {"provider": "groq", "model": "openai/gpt-oss-120b", "temperature": 0.7},
+    "linkedin_extract":  {"provider": "groq", "model": "llama-3.1-8b-instant", "temperature": 0.1, "cache": True},
+    "linkedin_feedback": {"provider": "groq", "model": "llama-3.1-8b-instant", "temperature": 0.1, "cache": True},
+    "linkedin_draft":    {"provider": "groq", "model": "llama-3.1-8b-instant", "temperature": 0.7, "tags": ["draft"]},
+    "linkedin_edit":     {"provider": "groq", "model": "openai/gpt-oss-120b", "temperature": 0.7, "tags": ["draft"]},
+    "calendar_extract":  {"provider": "groq", "model": "openai/gpt-oss-120b"},
+    "chat":              {"provider": "groq", "model": "openai/gpt-oss-120b", "temperature": 0.7, "tags": ["chat"]},
+}
+
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=120)
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+
+def _groq(**kwargs):
+    from langchain_groq import ChatGroq
+    return ChatGroq(**kwargs)
+
+
+def _openai(**kwargs):
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(**kwargs)
+
+
+# provider name -> factory taking the chat model's keyword arguments
+PROVIDERS: Dict[str, Callable[..., Any]] = {
+    "groq": _groq,
+    "openai": _openai,
+}
+
+_lock = threading.RLock()
+_http_client: Optional[httpx.Client] = None
+_clients: Dict[Tuple, Any] = {}
+# event loop -> (httpx.AsyncClient, {key: client})
+_loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+
+def model_spec(role: str) -> Dict[str, Any]:
+    """
+    The configured model for `role`: DEFAULT_MODELS overlaid with AGENT_MODELS.
+    """
+    if role not in DEFAULT_MODELS:
+        raise KeyError(f"Unknown LLM role: {role!r}")
+    spec = dict(DEFAULT_MODELS[role])
+    overrides = os.getenv("AGENT_MODELS")
+    if overrides:
+        spec.update(json.loads(overrides).get(role, {}))
+    return spec
+
+
+def _sync_http_client() -> httpx.Client:
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(http2=HTTP2, timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+    return _http_client
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_llm(role: str):
+    """
+    Return the shared chat model client configured for `role`.
+    """
+    spec = model_spec(role)
+    spec["cache"] = llm_cache.cache_enabled() and llm_cache.cache_allowed(spec)
+    key = (spec["provider"], spec["model"], spec.get("temperature"), tuple(spec.get("tags") or ()),
+           spec["cache"])
+
+    loop = _running_loop()
+    if loop is None:
+        clients, async_http = _clients, None
+    else:
+        entry = _loop_clients.get(loop)
+        if entry is None:
+            entry = _loop_clients.setdefault(
+                loop, (httpx.AsyncClient(http2=HTTP2, timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS), {}))
+        async_http, clients = entry
+
+    client = clients.get(key)
+    if client is None:
+        with _lock:
+            client = clients.get(key)
+            if client is None:
+                client = _build(spec, async_http)
+                clients[key] = client
+    return client
+
+
+def _build(spec: Dict[str, Any], async_http: Optional[httpx.AsyncClient]):
+    kwargs: Dict[str, Any] = {"model": spec["model"], "http_client": _sync_http_client()}
+    if spec.get("temperature") is not None:
+        kwargs["temperature"] = spec["temperature"]
+    if spec.get("tags"):
+        kwargs["tags"] = list(spec["tags"])
+    if spec.get("cache"):
+        kwargs["cache"] = llm_cache.get_cache()
+    if async_http is not None:
+        kwargs["http_async_client"] = async_http
+    # Every call that misses the cache waits for the model's rate-limit buckets
+    # (src/agent/ratelimit.py)
+    kwargs.update(ratelimit.client_options(spec["model"], use_async=async_http is not None))
+    return PROVIDERS[spec["provider"]](**kwargs)
+
+
+def reset() -> None:
+    """
+    Drop cached clients, close the shared sync HTTP pool, the response
+    cache and the rate-limit buckets (used by tests and after changing
+    AGENT_MODELS).
+    """
+    global _http_client
+    with _lock:
+        llm_cache.reset()
+        ratelimit.reset()
+        _clients.clear()
+        _loop_clients.clear()
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
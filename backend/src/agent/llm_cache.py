@@ -0,0 +1,253 @@
+"""
+Persistent response cache for deterministic (low-temperature) LLM calls.
+
+`SQLiteLLMCache` is a LangChain `BaseCache` backed by a local SQLite file. The
+LLM registry (`src/agent/llm.py`) attaches it only to roles that opt in with
+`"cache": True` and pass the policy in `cache_allowed()`: low temperature,
+no tools and no streamed generation.
+
+Entries are keyed on the model parameters (LangChain's llm_string: model,
+temperature, stop, ...) plus the messages with whitespace normalised, expire
+after a TTL and are evicted least-recently-used beyond a maximum size.
+
+Settings (environment):
+    LLM_CACHE              "0" disables the cache (default on)
+    LLM_CACHE_DB           SQLite file (default llm_cache.db)
+    LLM_CACHE_TTL          seconds an entry stays valid (default 7 days)
+    LLM_CACHE_MAX_ENTRIES  LRU bound (default 10000)
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+DEFAULT_CACHE_DB = "llm_cache.db"
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 10000
+# Calls sampled above this temperature are meant to vary; never cache them
+MAX_CACHE_TEMPERATURE = 0.2
+
+_WHITESPACE = re.compile(r"\s+")
+
+_lock = threading.Lock()
+_cache: Optional["SQLiteLLMCache"] = None
+
+
+def cache_enabled() -> bool:
+    return os.getenv("LLM_CACHE", "1").strip().lower() not in ("0", "false", "no", "")
+
+
+def cache_allowed(spec: Dict[str, Any]) -> bool:
+    """
+    Policy for a model spec from the LLM registry: the role must opt in and
+    be a low-temperature call without tools or streamed output.
+    """
+    if not spec.get("cache"):
+        return False
+    temperature = spec.get("temperature")
+    if temperature is None or temperature > MAX_CACHE_TEMPERATURE:
+        print(f"[LLM CACHE] Not caching {spec['model']} at temperature {temperature}")
+        return False
+    if spec.get("tags") or spec.get("tools"):
+        print(f"[LLM CACHE] Not caching {spec['model']}: streamed or tool-calling role")
+        return False
+    return True
+
+
+def get_cache() -> Optional["SQLiteLLMCache"]:
+    """
+    The process-wide cache, or None when disabled.
+    """
+    global _cache
+    if not cache_enabled():
+        return None
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = SQLiteLLMCache(
+                    os.getenv("LLM_CACHE_DB", DEFAULT_CACHE_DB),
+                    ttl=float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL)),
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                )
+    return _cache
+
+
+def reset() -> None:
+    """
+    Close the process-wide cache (it is reopened on next use).
+    """
+    global _cache
+    with _lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Reduce LangChain's serialized message list to (type, content) pairs with
+    whitespace collapsed, so formatting-only differences share an entry.
+    """
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return _WHITESPACE.sub(" ", prompt).strip()
+    if not isinstance(messages, list):
+        return _WHITESPACE.sub(" ", prompt).strip()
+
+    normalized = []
+    for message in messages:
+        if not isinstance(message, dict):
+            normalized.append(str(message))
+            continue
+        kind = (message.get("id") or ["?"])[-1]
+        content = (message.get("kwargs") or {}).get("content", "")
+        if isinstance(content, str):
+            content = _WHITESPACE.sub(" ", content).strip()
+        normalized.append([kind, content])
+    return json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+
+
+def _encode(generations: RETURN_VAL_TYPE) -> str:
+    rows = []
+    for g in generations:
+        if isinstance(g, ChatGeneration):
+            rows.append({"message": message_to_dict(g.message), "info": g.generation_info})
+        else:
+            rows.append({"text": g.text, "info": g.generation_info})
+    return json.dumps(rows)
+
+
+def _decode(value: str) -> RETURN_VAL_TYPE:
+    generations = []
+    for row in json.loads(value):
+        if "message" in row:
+            message = messages_from_dict([row["message"]])[0]
+            generations.append(ChatGeneration(message=message, generation_info=row.get("info")))
+        else:
+            generations.append(Generation(text=row["text"], generation_info=row.get("info")))
+    return generations
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    LangChain cache in a SQLite file with TTL expiry and LRU eviction.
+    Hit/miss counters for this process are in `stats()`.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.counters: Counter = Counter()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " llm_string TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{normalize_prompt(prompt)}".encode()).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self.make_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.counters["expired"] += 1
+                row = None
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.counters["hits"] += 1
+        return _decode(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self.make_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, llm_string, value, created_at, last_used, hits)"
+                " VALUES (?, ?, ?, ?, ?, 0)",
+                (key, llm_string, _encode(return_val), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+            self.counters["stores"] += 1
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN"
+                " (SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)", (excess,))
+            self.counters["evictions"] += excess
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """
+        Delete every entry older than the TTL; returns how many were removed.
+        """
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+            self.counters["expired"] += cur.rowcount
+            return cur.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Process counters plus what is stored: entries, bytes and the hits
+        recorded on stored entries by every process.
+        """
+        with self._lock:
+            entries, stored_hits, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(LENGTH(value)), 0) FROM llm_cache"
+            ).fetchone()
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            "hits": self.counters["hits"],
+            "misses": self.counters["misses"],
+            "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+            "stores": self.counters["stores"],
+            "evictions": self.counters["evictions"],
+            "expired": self.counters["expired"],
+            "entries": entries,
+            "stored_hits": stored_hits,
+            "value_bytes": size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,193 @@
+"""
+Content-addressed storage of conversation messages for the checkpointer.
+
+The `messages` channel uses the add_messages reducer, so every checkpoint
+holds the whole conversation and a thread of n turns stores about n² message
+copies. Before a checkpoint is saved, `split()` swaps each message list for
+a list of content hashes, and the messages themselves go to the
+`message_blobs` table once per thread. `join()` puts them back when the
+checkpoint is read, so get_state and history see the usual state.
+
+Blobs are scoped to their thread: they live on the thread's shard and are
+deleted with it. Checkpoints saved before this existed (inline lists) still
+load unchanged; `checkpoints dedup` rewrites them.
+"""
+
+import hashlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langgraph.checkpoint.base import Checkpoint, CheckpointTuple
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+from src.agent.serde import ZstdSerializer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS message_blobs (
+    thread_id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    type TEXT,
+    blob BLOB,
+    PRIMARY KEY (thread_id, hash)
+)
+"""
+
+# Channels whose list values are stored by reference
+CHANNELS = ("messages",)
+# Marker replacing a message list inside a stored checkpoint
+REFS = "__message_refs__"
+# Keys per IN (...) lookup, well below SQLite's variable limit
+LOOKUP_BATCH = 500
+
+SELECT_KEYS = "SELECT hash FROM message_blobs WHERE thread_id = ? AND hash IN ({})"
+SELECT_BLOBS = "SELECT hash, type, blob FROM message_blobs WHERE thread_id = ? AND hash IN ({})"
+INSERT_BLOB = "INSERT OR IGNORE INTO message_blobs (thread_id, hash, type, blob) VALUES (?, ?, ?, ?)"
+DELETE_THREAD = "DELETE FROM message_blobs WHERE thread_id = ?"
+
+Raw = Tuple[str, bytes]
+
+
+def _dumps(serde: SerializerProtocol, message: Any) -> Raw:
+    # Hash the uncompressed encoding, so the key survives `checkpoints recompress`
+    inner = serde.inner if isinstance(serde, ZstdSerializer) else serde
+    return inner.dumps_typed(message)
+
+
+def _pack(serde: SerializerProtocol, raw: Raw) -> Raw:
+    return serde.pack(*raw) if isinstance(serde, ZstdSerializer) else raw
+
+
+def message_key(raw: Raw) -> str:
+    type_, data = raw
+    return hashlib.sha256(type_.encode() + b"\0" + data).hexdigest()[:16]
+
+
+def split(checkpoint: Checkpoint, serde: SerializerProtocol) -> Tuple[Checkpoint, Dict[str, Raw]]:
+    """
+    The checkpoint with its message lists replaced by references, and the
+    serialized messages by key. The given checkpoint is not modified.
+    """
+    values = checkpoint.get("channel_values") or {}
+    blobs: Dict[str, Raw] = {}
+    replaced = {}
+    for channel in CHANNELS:
+        messages = values.get(channel)
+        if not isinstance(messages, list) or not messages:
+            continue
+        keys = []
+        for message in messages:
+            raw = _dumps(serde, message)
+            key = message_key(raw)
+            blobs[key] = raw
+            keys.append(key)
+        replaced[channel] = {REFS: keys}
+    if not replaced:
+        return checkpoint, {}
+    return {**checkpoint, "channel_values": {**values, **replaced}}, blobs
+
+
+def refs(checkpoint: Checkpoint) -> List[str]:
+    """
+    Message keys a stored checkpoint refers to.
+    """
+    values = checkpoint.get("channel_values") or {}
+    keys = []
+    for channel in CHANNELS:
+        value = values.get(channel)
+        if isinstance(value, dict) and REFS in value:
+            keys.extend(value[REFS])
+    return keys
+
+
+def join(checkpoint: Checkpoint, blobs: Dict[str, Raw], serde: SerializerProtocol) -> None:
+    """
+    Replace references in a loaded checkpoint with the messages, in place.
+    """
+    values = checkpoint.get("channel_values") or {}
+    loaded: Dict[str, Any] = {}
+    for channel in CHANNELS:
+        value = values.get(channel)
+        if not (isinstance(value, dict) and REFS in value):
+            continue
+        messages = []
+        for key in value[REFS]:
+            if key not in loaded:
+                if key not in blobs:
+                    raise ValueError(f"Checkpoint {checkpoint.get('id')} refers to missing message {key}")
+                loaded[key] = serde.loads_typed(blobs[key])
+            messages.append(loaded[key])
+        values[channel] = messages
+
+
+def _chunks(keys: List[str]) -> Iterator[List[str]]:
+    for i in range(0, len(keys), LOOKUP_BATCH):
+        yield keys[i:i + LOOKUP_BATCH]
+
+
+def _marks(chunk: List[str]) -> str:
+    return ", ".join("?" * len(chunk))
+
+
+def store(cur, thread_id: str, blobs: Dict[str, Raw], serde: SerializerProtocol) -> int:
+    """
+    Insert the messages of a thread that are not stored yet, on a sqlite3
+    cursor inside the caller's write transaction. Returns messages inserted.
+    """
+    keys = list(blobs)
+    existing = set()
+    for chunk in _chunks(keys):
+        cur.execute(SELECT_KEYS.format(_marks(chunk)), (thread_id, *chunk))
+        existing.update(row[0] for row in cur.fetchall())
+    rows = [(thread_id, key, *_pack(serde, blobs[key])) for key in keys if key not in existing]
+    if rows:
+        cur.executemany(INSERT_BLOB, rows)
+    return len(rows)
+
+
+def load(cur, thread_id: str, keys: Iterable[str]) -> Dict[str, Raw]:
+    """
+    Stored (type, bytes) of the given message keys of a thread.
+    """
+    blobs = {}
+    for chunk in _chunks(list(dict.fromkeys(keys))):
+        cur.execute(SELECT_BLOBS.format(_marks(chunk)), (thread_id, *chunk))
+        blobs.update({key: (type_, blob) for key, type_, blob in cur.fetchall()})
+    return blobs
+
+
+def resolve(cur, item: Optional[CheckpointTuple], serde: SerializerProtocol) -> Optional[CheckpointTuple]:
+    """
+    `join` for a checkpoint tuple read by a sync saver.
+    """
+    if item is not None and (keys := refs(item.checkpoint)):
+        join(item.checkpoint, load(cur, str(item.config["configurable"]["thread_id"]), keys), serde)
+    return item
+
+
+async def astore(conn, thread_id: str, blobs: Dict[str, Raw], serde: SerializerProtocol) -> int:
+    """
+    `store` on an aiosqlite connection; the caller commits.
+    """
+    keys = list(blobs)
+    existing = set()
+    for chunk in _chunks(keys):
+        async with conn.execute(SELECT_KEYS.format(_marks(chunk)), (thread_id, *chunk)) as cur:
+            existing.update({row[0] async for row in cur})
+    rows = [(thread_id, key, *_pack(serde, blobs[key])) for key in keys if key not in existing]
+    if rows:
+        await conn.executemany(INSERT_BLOB, rows)
+    return len(rows)
+
+
+async def aresolve(conn, item: Optional[CheckpointTuple], serde: SerializerProtocol) -> Optional[CheckpointTuple]:
+    """
+    `resolve` on an aiosqlite connection.
+    """
+    if item is None or not (keys := refs(item.checkpoint)):
+        return item
+    thread_id = str(item.config["configurable"]["thread_id"])
+    blobs = {}
+    for chunk in _chunks(list(dict.fromkeys(keys))):
+        async with conn.execute(SELECT_BLOBS.format(_marks(chunk)), (thread_id, *chunk)) as cur:
+            blobs.update({key: (type_, blob) async for key, type_, blob in cur})
+    join(item.checkpoint, blobs, serde)
+    return item
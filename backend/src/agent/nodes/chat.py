@@ -1,27 +1,24 @@
 # src/agent/nodes/chat.py
-from typing import Dict, Any
 from langgraph.types import Command
-from langgraph.graph import END
-from langchain_openai import ChatOpenAI
-from langchain_groq import ChatGroq
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
-from langchain_community.tools.tavily_search import TavilySearchResults
+from langgraph.constants import END
+from src.agent.llm import get_llm
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 from dotenv import load_dotenv
-from langgraph.prebuilt import create_react_agent
 
 load_dotenv()
 
-def chat_node(state):
-    user_prompt = (state.get("user_prompt") or "").strip()
-    messages = state.get("messages", [])
+def _react_agent():
+    # Imported on the first chat turn: Tavily pulls in aiohttp and the
+    # prebuilt agent most of langgraph, which other channels never need
+    from langchain_community.tools.tavily_search import TavilySearchResults
+    from langgraph.prebuilt import create_react_agent
 
     search_tool = TavilySearchResults(max_results=3)
     tools = [search_tool]
 
-    # llm = ChatOpenAI(model="gpt-4", temperature=0.7)
-    llm = ChatGroq(model="openai/gpt-oss-120b",temperature=0.7)
+    llm = get_llm("chat")
 
-    react_agent = create_react_agent(
+    return create_react_agent(
         llm,
         tools=tools,
         prompt=SystemMessage(content=(
@@ -32,21 +29,36 @@ def chat_node(state):
         )),
     )
 
+
+def _input_messages(state):
+    user_prompt = (state.get("user_prompt") or "").strip()
+    messages = state.get("messages", [])
+
     # Avoid duplicating the latest HumanMessage; it's already injected via workflow input
     if messages and isinstance(messages[-1], HumanMessage) and messages[-1].content == user_prompt:
-        input_messages = messages
-    else:
-        input_messages = messages + [HumanMessage(content=user_prompt)]
+        return messages
+    return messages + [HumanMessage(content=user_prompt)]
 
-    response = react_agent.invoke({"messages" : input_messages})
 
+def _reply(state, response):
     all_msgs = response.get("messages", [])
     ai_msgs = [m for m in all_msgs if isinstance(m, AIMessage)]
     answer = ai_msgs[-1].content if ai_msgs else "I'm here to help!"
 
-    state["preview"] = f"💬 CHAT REPLY\n{'='*40}\n{answer}\n{'='*40}"
-    state["result"] = {"status": "success", "type": "chat", "message": answer}
-    state["messages"] = all_msgs
+    # The agent echoes the conversation it was given; only the messages after
+    # it are new (the add_messages reducer appends them)
+    return Command(goto=END, update={
+        "preview": f"💬 CHAT REPLY\n{'='*40}\n{answer}\n{'='*40}",
+        "result": {"status": "success", "type": "chat", "message": answer},
+        "messages": all_msgs[len(state.get("messages", [])):],
+    })
+
+
+def chat_node(state):
+    response = _react_agent().invoke({"messages" : _input_messages(state)})
+    return _reply(state, response)
 
-    return Command(goto=END, update=state)
 
+async def achat_node(state):
+    response = await _react_agent().ainvoke({"messages" : _input_messages(state)})
+    return _reply(state, response)
@@ -1,22 +1,16 @@
 from typing import Dict, Any
-from langchain_groq import ChatGroq
+from src.agent.llm import get_llm
 from dotenv import load_dotenv
 from langchain_core.messages import SystemMessage, HumanMessage
 from ..tools.tools import set_event_tool
-from langgraph.graph import END
+from langgraph.constants import END
 from langgraph.types import Command
 from langchain_core.messages import AIMessage
 import json
 
 load_dotenv()
 
-def extract_details(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Compose a calendar event from user input using LLM for extraction
-    and then call the set_event tool.
-    """
-    user_input = state.get("user_prompt", "")
-    system_prompt = """
+CALENDAR_SYSTEM_PROMPT = """
     You are a smart assistant that extracts structured information for creating a Google Calendar event.
 
     Instructions:
@@ -64,49 +58,85 @@ def extract_details(state: Dict[str, Any]) -> Dict[str, Any]:
     "end": "2025-10-11T10:00:00+05:30"
     }}
     """
-    llm = ChatGroq(model="openai/gpt-oss-120b")
 
-    messages = [
-        SystemMessage(content=system_prompt),
+
+def _extraction_messages(state: Dict[str, Any]):
+    user_input = state.get("user_prompt", "")
+    return [
+        SystemMessage(content=CALENDAR_SYSTEM_PROMPT),
         HumanMessage(content=f"User input: {user_input}")
     ]
+
+
+def _apply_extraction(state: Dict[str, Any], raw: str) -> Dict[str, Any]:
+    print("[RAW LLM]", raw)
+
+    try:
+        data = json.loads(raw)
+    except Exception as parse_err:
+        print("[PARSE ERROR]", parse_err)
+        data = {
+            "summary": "",
+            "description": "",
+            "start" : "",
+            "end": ""
+        }
     
+    state['calendar_summary'] = data.get('summary')
+    state['calendar_description'] = data.get('description')
+    state['calendar_start'] = data.get('start')
+    state['calendar_end'] = data.get('end')
+    return state
+
+
+def _extraction_failed(state: Dict[str, Any], e: Exception) -> Dict[str, Any]:
+    state["error"] = f"Extraction failed: {str(e)}" 
+    state["human_message"] = "Could not extract email details. Please provide: to, subject, body" 
+    return state
+
+
+def extract_details(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compose a calendar event from user input using LLM for extraction
+    and then call the set_event tool.
+    """
+    llm = get_llm("calendar_extract")
+
     try:
-        response = llm.invoke(messages)
-        raw = response.content
-        print("[RAW LLM]", raw)
-
-        try:
-            data = json.loads(raw)
-        except Exception as parse_err:
-            print("[PARSE ERROR]", parse_err)
-            data = {
-                "summary": "",
-                "description": "",
-                "start" : "",
-                "end": ""
-            }
-        
-        state['calendar_summary'] = data.get('summary')
-        state['calendar_description'] = data.get('description')
-        state['calendar_start'] = data.get('start')
-        state['calendar_end'] = data.get('end')
+        response = llm.invoke(_extraction_messages(state))
+        state = _apply_extraction(state, response.content)
+    except Exception as e: 
+        state = _extraction_failed(state, e)
+    print("FINAL STATE - ",state) 
+    return state
+
 
+async def aextract_details(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async variant of `extract_details`.
+    """
+    llm = get_llm("calendar_extract")
+
+    try:
+        response = await llm.ainvoke(_extraction_messages(state))
+        state = _apply_extraction(state, response.content)
     except Exception as e: 
-        state["error"] = f"Extraction failed: {str(e)}" 
-        state["human_message"] = "Could not extract email details. Please provide: to, subject, body" 
+        state = _extraction_failed(state, e)
     print("FINAL STATE - ",state) 
     return state
 
-def compose_events(state: Dict[str, Any]) -> Dict[str, Any]:
-    state = extract_details(state)
-    summary = state.get("calendar_summary")
-    description = state.get("calendar_description")
-    start = state.get("calendar_start")
-    end = state.get("calendar_end")
-    user_id = state.get("user_id")
-
-    result = set_event_tool.invoke({"summary":summary,"description":description ,"start":start,"end":end ,"user_id" : user_id})
+
+def _event_args(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "summary": state.get("calendar_summary"),
+        "description": state.get("calendar_description"),
+        "start": state.get("calendar_start"),
+        "end": state.get("calendar_end"),
+        "user_id": state.get("user_id"),
+    }
+
+
+def _event_result(state: Dict[str, Any], result: Dict[str, Any]) -> Command:
     print("RESULT -", result)
     status = result.get("status")
     message = result.get("message", "")
@@ -122,4 +152,16 @@ def compose_events(state: Dict[str, Any]) -> Dict[str, Any]:
     })
 
 
-        
\ No newline at end of file
+def compose_events(state: Dict[str, Any]) -> Dict[str, Any]:
+    # The intent node may already have extracted the fields (route-and-extract mode)
+    if not state.get("slots_prefilled"):
+        state = extract_details(state)
+    result = set_event_tool.invoke(_event_args(state))
+    return _event_result(state, result)
+
+
+async def acompose_events(state: Dict[str, Any]) -> Dict[str, Any]:
+    if not state.get("slots_prefilled"):
+        state = await aextract_details(state)
+    result = await set_event_tool.ainvoke(_event_args(state))
+    return _event_result(state, result)
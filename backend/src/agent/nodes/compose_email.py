@@ -4,26 +4,17 @@ Email composition with extraction and human-in-the-loop.
 
 from typing import Dict, Any
 # from langchain_openai import ChatOpenAI
-from langchain_groq import ChatGroq
+from src.agent.llm import get_llm
 from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.func import task
 from langgraph.types import Command, interrupt
 
-import json
-import re
+from src.agent.nodes import slots
+from src.agent.state import changes, delta_step
 
-def extract_email_details(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Extract email details (to, subject, sender_name body) from user prompt.
-    """
-    user_prompt = state.get("user_prompt", "")
-    
-    # llm = ChatOpenAI(model="gpt-4", temperature=0.1)
-    llm = ChatGroq(model="openai/gpt-oss-120b", temperature=0.1)
-
-
-    print("[LLM CALL] MAking GPT Call")
+import json
 
-    system_prompt = """
+EXTRACT_EMAIL_SYSTEM_PROMPT = """
     You extract email details from a single user input.
 Return ONLY a valid JSON object. No prose, no code fences, no explanations.
 
@@ -102,72 +93,163 @@ Output:
 }
 
     """
- 
-   
-    messages = [
+
+# Used when some fields were already found by `slots.prefill_email`.
+EXTRACT_REMAINING_EMAIL_SYSTEM_PROMPT = """
+You extract the remaining email details from a single user input.
+These fields were already found exactly and must not be changed:
+{known}
+
+Extract ONLY these keys: {wanted}
+Return ONLY a valid JSON object with those keys plus "missing" (the subset of them that is not clearly present).
+No prose, no code fences, no explanations.
+
+{rules}
+"""
+
+REMAINING_FIELD_RULES = {
+    "to": '- "to": email recipient (email address, or name if no address).',
+    "subject": '- "subject": concise subject ONLY if clearly inferable; otherwise "".',
+    "body": ('- "body": the actual message content to send; meta-instructions like '
+             '"send mail", "email X", "write an email" are NOT body. "" if there is none.'),
+    "sender_name": '- "sender_name": recipient name in lowercase, "" if unknown.',
+}
+
+
+def _extraction_messages(state: Dict[str, Any], found: Dict[str, Any] = None):
+    """
+    The full extraction prompt, or a smaller one asking only for the fields
+    that `found` (the deterministic pre-extraction) does not cover.
+    """
+    user_prompt = state.get("user_prompt", "")
+    if not found:
+        system_prompt = EXTRACT_EMAIL_SYSTEM_PROMPT
+    else:
+        wanted = [k for k in REMAINING_FIELD_RULES if k not in found]
+        system_prompt = EXTRACT_REMAINING_EMAIL_SYSTEM_PROMPT.format(
+            known=json.dumps(found, ensure_ascii=False),
+            wanted=", ".join(wanted),
+            rules="\n".join(REMAINING_FIELD_RULES[k] for k in wanted),
+        )
+    return [
         SystemMessage(content=system_prompt),
         HumanMessage(content=f"User input: {user_prompt}")
     ]
-    
+
+
+def _prefilled_extraction(found: Dict[str, Any]) -> str:
+    """
+    Extractor-shaped JSON for fields found without the LLM.
+    """
+    data = {"to": "", "subject": "", "body": "", "sender_name": "", **found}
+    data["missing"] = [k for k in ("to", "subject", "body") if not data[k]]
+    return json.dumps(data)
+
+
+def _apply_extraction(state: Dict[str, Any], raw: str, found: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Parse the extractor's JSON answer into state and flag missing critical fields.
+    Fields in `found` (pre-extracted exactly) take precedence over the answer.
+    """
+    print("[RAW LLM]", raw)
+
     try:
-        response = llm.invoke(messages)
-        raw = response.content
-        print("[RAW LLM]", raw)
-
-        try:
-            data = json.loads(raw)
-        except Exception as parse_err:
-            print("[PARSE ERROR]", parse_err)
-            data = {
-                "to": "",
-                "subject": "",
-                "body": "",
-                "sender_name" : "",
-                "missing": ["to", "subject", "body"]
-            }
-        
-        state["to"] = data.get("to")
-        state["subject"] = data.get("subject") 
-        state["body"] = data.get("body") 
-        state["sender_name"] = data.get("sender_name")
-        print("[UPDATED STATE]", state) 
-        # Check for missing critical info 
-
-        missing = data.get("missing", []) 
-        critical_missing = [] 
-        
-        print("MISSING VALUES - ", missing) 
+        data = json.loads(raw)
+    except Exception as parse_err:
+        print("[PARSE ERROR]", parse_err)
+        data = {
+            "to": "",
+            "subject": "",
+            "body": "",
+            "sender_name" : "",
+            "missing": ["to", "subject", "body"]
+        }
+    if found:
+        data.update(found)
+    
+    state["to"] = data.get("to")
+    state["subject"] = data.get("subject") 
+    state["body"] = data.get("body") 
+    state["sender_name"] = data.get("sender_name")
+    print("[UPDATED STATE]", state) 
+    # Check for missing critical info 
+
+    missing = data.get("missing", []) 
+    critical_missing = [] 
+    
+    print("MISSING VALUES - ", missing) 
 
-        if not state.get("to") or state.get("to").lower() in ["none", "unknown", "", "missing"]: 
-            critical_missing.append("to") 
-        if not state.get("body") or state.get("body").lower() in ["none", "unknown", "", "missing"]: 
-            critical_missing.append("body") 
-        
-        print("CRITICAL MISSING -", critical_missing)
-        if critical_missing: 
-            print("CHANGING STATE TO NEED INPUT TRUE") 
-            state["needs_input"] = True 
-            state["human_message"] = f"Missing email information: {', '.join(critical_missing)}. Please provide:" 
-            for field in critical_missing: 
-                state["human_message"] += f"\n- {field}: " 
+    if not state.get("to") or state.get("to").lower() in ["none", "unknown", "", "missing"]: 
+        critical_missing.append("to") 
+    if not state.get("body") or state.get("body").lower() in ["none", "unknown", "", "missing"]: 
+        critical_missing.append("body") 
+    
+    print("CRITICAL MISSING -", critical_missing)
+    if critical_missing: 
+        print("CHANGING STATE TO NEED INPUT TRUE") 
+        state["needs_input"] = True 
+        state["human_message"] = f"Missing email information: {', '.join(critical_missing)}. Please provide:" 
+        for field in critical_missing: 
+            state["human_message"] += f"\n- {field}: " 
+    return state
+
+
+def _extraction_failed(state: Dict[str, Any], e: Exception) -> Dict[str, Any]:
+    state["error"] = f"Extraction failed: {str(e)}" 
+    state["needs_input"] = True 
+    state["human_message"] = "Could not extract email details. Please provide: to, subject, body" 
+    return state
+
+
+def _critical_found(found: Dict[str, Any]) -> bool:
+    return bool(found.get("to") and found.get("body"))
+
+
+def extract_email_details(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract email details (to, subject, sender_name body) from user prompt.
+    Exact matches (addresses, `subject:` / `body:` markers) are taken first;
+    the LLM is skipped when they already cover `to` and `body`.
+    """
+    found = slots.prefill_email(state.get("user_prompt", ""))
+    if _critical_found(found):
+        print("[SLOTS] Email fields found locally, skipping LLM -", found)
+        return _apply_extraction(state, _prefilled_extraction(found))
+
+    llm = get_llm("email_extract")
 
+    print("[LLM CALL] MAking GPT Call")
+    try:
+        response = llm.invoke(_extraction_messages(state, found))
+        state = _apply_extraction(state, response.content, found)
     except Exception as e: 
-        state["error"] = f"Extraction failed: {str(e)}" 
-        state["needs_input"] = True 
-        state["human_message"] = "Could not extract email details. Please provide: to, subject, body" 
+        state = _extraction_failed(state, e)
     print("FINAL STATE - ",state) 
     return state
 
-def process_human_feedback(state: Dict[str, Any], feedback: str) -> Dict[str, Any]:
+
+async def aextract_email_details(state: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Process human feedback to fill/adjust email details using the same strict
-    extraction rules as `extract_email_details`.
+    Async variant of `extract_email_details`.
     """
-    print("[LLM CALL] Making call to extract items from HUMAN FEEDBACK")
+    found = slots.prefill_email(state.get("user_prompt", ""))
+    if _critical_found(found):
+        print("[SLOTS] Email fields found locally, skipping LLM -", found)
+        return _apply_extraction(state, _prefilled_extraction(found))
 
-    # Keep your provider choice consistent with the rest of the file
-    llm = ChatGroq(model="openai/gpt-oss-120b", temperature=0.1)
+    llm = get_llm("email_extract")
 
+    print("[LLM CALL] MAking GPT Call")
+    try:
+        response = await llm.ainvoke(_extraction_messages(state, found))
+        state = _apply_extraction(state, response.content, found)
+    except Exception as e: 
+        state = _extraction_failed(state, e)
+    print("FINAL STATE - ",state) 
+    return state
+
+
+def _feedback_messages(state: Dict[str, Any], feedback: str):
     # Build a normalized snapshot of current values for the prompt
     curr_to = state.get("to", "") or ""
     curr_subject = state.get("subject", "") or ""
@@ -239,181 +321,240 @@ Output:
   "missing": ["to"]
 }}
 """
-
-    messages = [
+    return [
         SystemMessage(content=system_prompt),
         HumanMessage(content=f"HUMAN FEEDBACK: {feedback}")
     ]
 
+
+def _apply_feedback(state: Dict[str, Any], raw: str) -> Dict[str, Any]:
+    """
+    Merge the feedback extractor's JSON answer into state and recompute what
+    is still missing.
+    """
+    raw = (raw or "").strip()
+    print("[RAW HUMAN FEEDBACK LLM]", raw)
+
     try:
-        resp = llm.invoke(messages)
-        raw = (resp.content or "").strip()
-        print("[RAW HUMAN FEEDBACK LLM]", raw)
-
-        try:
-            data = json.loads(raw)
-        except Exception as parse_err:
-            print("[PARSE ERROR - HUMAN FEEDBACK]", parse_err)
-            # Fallback defaults: nothing confidently extracted
-            data = {
-                "to": "",
-                "subject": "",
-                "body": "",
-                "sender_name": "",
-                "missing": ["to", "subject", "body"]
-            }
-
-        # Normalize placeholders if model returned any (belt-and-suspenders)
-        def _norm(x: Any) -> str:
-            if not isinstance(x, str):
-                return ""
-            val = x.strip()
-            return "" if val.lower() in {"missing", "none", "unknown"} else val
-
-        new_to = _norm(data.get("to", ""))
-        new_subject = _norm(data.get("subject", ""))
-        new_body = _norm(data.get("body", ""))
-        new_sender = _norm(data.get("sender_name", ""))
-
-        # If sender_name still empty but to looks like an email, derive a name
-        if not new_sender and "@" in new_to:
-            local = new_to.split("@", 1)[0]
-            local = re.sub(r"[\d._-]+", " ", local).strip()
-            if local:
-                # keep lowercase per your rule
-                new_sender = local.lower().split()[0]
-
-        # Merge with existing state: adopt any non-empty values from feedback
-        if new_to:
-            state["to"] = new_to
-        if new_subject != "":
-            state["subject"] = new_subject
-        if new_body != "":
-            state["body"] = new_body
-        if new_sender:
-            state["sender_name"] = new_sender
-
-        # Compute missing (critical for loop control)
-        # Prefer model's "missing" if provided and valid; otherwise recompute
-        model_missing = data.get("missing", [])
-        if not isinstance(model_missing, list):
-            model_missing = []
-
-        # Recalculate critical missing from current state to be safe
-        critical_missing = []
-        if not state.get("to") or state.get("to", "").strip() == "":
-            critical_missing.append("to")
-        if not state.get("body") or state.get("body", "").strip() == "":
-            critical_missing.append("body")
-
-        # If subject is empty, include in missing (non-critical but informative)
-        if not state.get("subject") or state.get("subject", "").strip() == "":
-            if "subject" not in model_missing:
-                model_missing.append("subject")
-
-        # Merge unique keys: model_missing + critical_missing
-        merged_missing = list({*model_missing, *critical_missing})
-
-        if critical_missing:
-            state["needs_input"] = True
-            # Build a clean prompt for the next loop
-            ask_lines = ["Missing email information: " + ", ".join(critical_missing) + ". Please provide:"]
-            for key in critical_missing:
-                ask_lines.append(f"- {key}: ")
-            state["human_message"] = "\n".join(ask_lines)
-        else:
-            state["needs_input"] = False
-            state["human_message"] = None
-
-        # Optionally store merged "missing" for visibility/debugging
-        state["missing"] = merged_missing
+        data = json.loads(raw)
+    except Exception as parse_err:
+        print("[PARSE ERROR - HUMAN FEEDBACK]", parse_err)
+        # Fallback defaults: nothing confidently extracted
+        data = {
+            "to": "",
+            "subject": "",
+            "body": "",
+            "sender_name": "",
+            "missing": ["to", "subject", "body"]
+        }
+
+    # Normalize placeholders if model returned any (belt-and-suspenders)
+    def _norm(x: Any) -> str:
+        if not isinstance(x, str):
+            return ""
+        val = x.strip()
+        return "" if val.lower() in {"missing", "none", "unknown"} else val
+
+    new_to = _norm(data.get("to", ""))
+    new_subject = _norm(data.get("subject", ""))
+    new_body = _norm(data.get("body", ""))
+    new_sender = _norm(data.get("sender_name", ""))
+
+    # If sender_name still empty but to looks like an email, derive a name
+    if not new_sender:
+        new_sender = slots.name_from_address(new_to)
+
+    # Merge with existing state: adopt any non-empty values from feedback
+    if new_to:
+        state["to"] = new_to
+    if new_subject != "":
+        state["subject"] = new_subject
+    if new_body != "":
+        state["body"] = new_body
+    if new_sender:
+        state["sender_name"] = new_sender
+
+    # Compute missing (critical for loop control)
+    # Prefer model's "missing" if provided and valid; otherwise recompute
+    model_missing = data.get("missing", [])
+    if not isinstance(model_missing, list):
+        model_missing = []
+
+    # Recalculate critical missing from current state to be safe
+    critical_missing = []
+    if not state.get("to") or state.get("to", "").strip() == "":
+        critical_missing.append("to")
+    if not state.get("body") or state.get("body", "").strip() == "":
+        critical_missing.append("body")
+
+    # If subject is empty, include in missing (non-critical but informative)
+    if not state.get("subject") or state.get("subject", "").strip() == "":
+        if "subject" not in model_missing:
+            model_missing.append("subject")
+
+    # Merge unique keys: model_missing + critical_missing
+    merged_missing = list({*model_missing, *critical_missing})
+
+    if critical_missing:
+        state["needs_input"] = True
+        # Build a clean prompt for the next loop
+        ask_lines = ["Missing email information: " + ", ".join(critical_missing) + ". Please provide:"]
+        for key in critical_missing:
+            ask_lines.append(f"- {key}: ")
+        state["human_message"] = "\n".join(ask_lines)
+    else:
+        state["needs_input"] = False
+        state["human_message"] = None
+
+    # Optionally store merged "missing" for visibility/debugging
+    state["missing"] = merged_missing
+    return state
+
+
+def _feedback_failed(state: Dict[str, Any], e: Exception) -> Dict[str, Any]:
+    state["error"] = f"Failed to process feedback: {str(e)}"
+    state["needs_input"] = True
+    state["human_message"] = "Error processing your input. Please provide: to, body (and subject if available)."
+    return state
 
+
+def _bare_address_feedback(state: Dict[str, Any], feedback: str):
+    """
+    Feedback that is only an email address fills `to` without the LLM;
+    returns None for anything else.
+    """
+    address = slots.bare_address(feedback)
+    if address is None:
+        return None
+    print("[SLOTS] Feedback is a bare address, skipping LLM -", address)
+    return _apply_feedback(state, json.dumps({
+        "to": address, "subject": "", "body": "",
+        "sender_name": slots.name_from_address(address), "missing": [],
+    }))
+
+
+def process_human_feedback(state: Dict[str, Any], feedback: str) -> Dict[str, Any]:
+    """
+    Process human feedback to fill/adjust email details using the same strict
+    extraction rules as `extract_email_details`.
+    """
+    prefilled = _bare_address_feedback(state, feedback)
+    if prefilled is not None:
+        return prefilled
+
+    print("[LLM CALL] Making call to extract items from HUMAN FEEDBACK")
+
+    # Keep your provider choice consistent with the rest of the file
+    llm = get_llm("email_feedback")
+
+    try:
+        resp = llm.invoke(_feedback_messages(state, feedback))
+        state = _apply_feedback(state, resp.content)
     except Exception as e:
-        state["error"] = f"Failed to process feedback: {str(e)}"
-        state["needs_input"] = True
-        state["human_message"] = "Error processing your input. Please provide: to, body (and subject if available)."
+        state = _feedback_failed(state, e)
+
+    print("[STATE IN HUMAN FEEDBACK]", state)
+    return state
+
+
+async def aprocess_human_feedback(state: Dict[str, Any], feedback: str) -> Dict[str, Any]:
+    """
+    Async variant of `process_human_feedback`.
+    """
+    prefilled = _bare_address_feedback(state, feedback)
+    if prefilled is not None:
+        return prefilled
+
+    print("[LLM CALL] Making call to extract items from HUMAN FEEDBACK")
+
+    llm = get_llm("email_feedback")
+
+    try:
+        resp = await llm.ainvoke(_feedback_messages(state, feedback))
+        state = _apply_feedback(state, resp.content)
+    except Exception as e:
+        state = _feedback_failed(state, e)
 
     print("[STATE IN HUMAN FEEDBACK]", state)
     return state
 
 
+def _finish_email(state: Dict[str, Any], current: Dict[str, Any]) -> Command:
+    print("[STATE] After generate draft State - ", current)
+
+    # Compose final email
+    print("[FINAL PREVIEW]")
+    current = create_final_email(current)
+    print("[FINAL PREVIEW] ", current["preview"])
+    
+    # Route to human gate for approval, writing only the fields that changed
+    return Command(goto="human_gate", update=changes(state, current))
+
+
 def compose_email(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Compose email with extraction and human-in-the-loop.
+
+    Each LLM stage runs as a task, so when the node restarts after an
+    interrupt the stages that already ran are replayed from the checkpoint
+    and only the newest feedback reaches the model. Stages return the keys
+    they changed, which are applied to a working copy of the state.
     """
     
     print("[COMPOSE EMAIL] Entered into stage of EMAIL")
-    state = extract_email_details(state)
+    current = dict(state)
+    # The intent node may already have extracted the fields (route-and-extract mode)
+    if not current.get("slots_prefilled"):
+        current.update(extract_email_step(current).result())
 
     # Handle multiple rounds of human input with a loop
-    while state.get("needs_input"):
+    while current.get("needs_input"):
         # Interrupt for human input
         print("[COMPOSE MAIL] EMAIL MISSING INTERRUPT")
         user_feedback = interrupt({
-            "message": state.get("human_message", "Please provide missing email information")
+            "message": current.get("human_message", "Please provide missing email information")
         })
         
         print(f"[compose_email] Human feedback: {user_feedback}")
         
         # Process human feedback
         print(f"PROCESSING HUMAN FEEDBACK")
-        state = process_human_feedback(state, user_feedback)
+        current.update(feedback_email_step(current, user_feedback).result())
 
-        print("[COMPOSE MAIL] After Human Feedback STATE -", state)
+        print("[COMPOSE MAIL] After Human Feedback STATE -", current)
         
         # The while loop will continue if needs_input is still True
         # This prevents the recursive call that was causing the restart
     
     print("[COMPOSE MAIL] After compose email need to generate draft")
-    state = generate_email_draft(state)
-    print("[STATE] After generate draft State - ", state)
+    current.update(draft_email_step(current).result())
+    return _finish_email(state, current)
 
-    # Compose final email
-    print("[FINAL PREVIEW]")
-    state = create_final_email(state)
-    print("[FINAL PREVIEW] ", state["preview"])
-    
-    # Route to human gate for approval
-    return Command(goto="human_gate", update=state)
 
-def generate_email_draft(state: Dict[str, Any]) -> Dict[str, Any]:
+async def acompose_email(state: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Generate a Gmail-ready draft from current AgentState.
-    - Produces subject/body only when missing or too short; preserves user-provided fields.
-    - Returns JSON and updates state in-place.
+    Async variant of `compose_email`.
     """
-    # Decide if drafting is needed
-    to_val = (state.get("to") or "").strip()
-    subj = (state.get("subject") or "").strip()
-    body = (state.get("body") or "").strip()
-
-    need_subject = len(subj) < 4
-    need_body = len(body) < 8
-
-    # If nothing to draft, return immediately
-    if not need_subject and not need_body:
-        return state
+    print("[COMPOSE EMAIL] Entered into stage of EMAIL")
+    current = dict(state)
+    if not current.get("slots_prefilled"):
+        current.update(await aextract_email_step(current))
 
-    # Defaults
-    tone = (state.get("tone") or "polite").lower()
-    length = (state.get("length") or "short").lower()
-    sender_name = (state.get("sender_name") or "").strip()
-    user_prompt = (state.get("user_prompt") or "").strip()
+    while current.get("needs_input"):
+        print("[COMPOSE MAIL] EMAIL MISSING INTERRUPT")
+        user_feedback = interrupt({
+            "message": current.get("human_message", "Please provide missing email information")
+        })
+        print(f"[compose_email] Human feedback: {user_feedback}")
+        current.update(await afeedback_email_step(current, user_feedback))
+        print("[COMPOSE MAIL] After Human Feedback STATE -", current)
 
-    # If sender_name missing but "to" looks like an email, derive a name
-    if not sender_name and "@" in to_val:
-        local = to_val.split("@", 1)[0]
-        # strip digits and separators
-        import re as _re
-        local = _re.sub(r"[\d._-]+", " ", local).strip()
-        if local:
-            sender_name = local.split()[0].title()
-            state["sender_name"] = sender_name
+    print("[COMPOSE MAIL] After compose email need to generate draft")
+    current.update(await adraft_email_step(current))
+    return _finish_email(state, current)
 
-    # LLM
-    llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0.7)
 
-    system_prompt = """You generate a Gmail-ready draft email from a single JSON state object.
+DRAFT_EMAIL_SYSTEM_PROMPT = """You generate a Gmail-ready draft email from a single JSON state object.
 Return ONLY one valid JSON object. No prose, no code fences, no explanations.
 
 INPUT: A JSON object named AgentState with (possibly partial) fields:
@@ -445,6 +586,34 @@ DRAFTING RULES
 - Output ONLY the JSON object.
 """
 
+def _draft_messages(state: Dict[str, Any]):
+    """
+    Build the drafting prompt, or return None when subject and body are
+    already long enough to send as-is.
+    """
+    # Decide if drafting is needed
+    to_val = (state.get("to") or "").strip()
+    subj = (state.get("subject") or "").strip()
+    body = (state.get("body") or "").strip()
+
+    need_subject = len(subj) < 4
+    need_body = len(body) < 8
+
+    # If nothing to draft, return immediately
+    if not need_subject and not need_body:
+        return None
+
+    # Defaults
+    tone = (state.get("tone") or "polite").lower()
+    length = (state.get("length") or "short").lower()
+    sender_name = (state.get("sender_name") or "").strip()
+    user_prompt = (state.get("user_prompt") or "").strip()
+
+    # If sender_name missing but "to" looks like an email, derive a name
+    if not sender_name and slots.name_from_address(to_val):
+        sender_name = slots.name_from_address(to_val).title()
+        state["sender_name"] = sender_name
+
     # Build payload for the model
     payload = {
         "user_prompt": user_prompt,
@@ -456,39 +625,89 @@ DRAFTING RULES
         "length": length,
     }
 
-    messages = [
-        SystemMessage(content=system_prompt),
+    return [
+        SystemMessage(content=DRAFT_EMAIL_SYSTEM_PROMPT),
         HumanMessage(content=json.dumps({"AgentState": payload}, ensure_ascii=False))
     ]
 
+
+def _apply_draft(state: Dict[str, Any], raw: str) -> Dict[str, Any]:
+    print("[RAW]",raw)
+    # Parse robustly
+    try:
+        data = json.loads(raw)
+        print(data)
+    except Exception:
+        data = {
+            "to": (state.get("to") or "").strip(),
+            "subject": (state.get("subject") or "").strip(),
+            "body": (state.get("body") or "").strip(),
+        }
+
+    # Preserve provided fields if generator tried to overwrite with empty/irrelevant
+    state["to"] = data.get("to")
+    state["subject"] = data.get("subject")
+    state["body"] = data.get("body")
+    return state
+
+
+def _draft_failed(state: Dict[str, Any], e: Exception) -> Dict[str, Any]:
+    state["error"] = f"Drafting failed: {str(e)}"
+    state["needs_input"] = True
+    state["human_message"] = "I couldn't draft the email. Please provide subject/body."
+    return state
+
+
+def generate_email_draft(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Generate a Gmail-ready draft from current AgentState.
+    - Produces subject/body only when missing or too short; preserves user-provided fields.
+    - Returns JSON and updates state in-place.
+    """
+    messages = _draft_messages(state)
+    if messages is None:
+        return state
+
+    # LLM
+    llm = get_llm("email_draft")
+
     try:
         resp = llm.invoke(messages)
-        raw = resp.content
-        print("[RAW]",raw)
-        # Parse robustly
-        try:
-            data = json.loads(raw)
-            print(data)
-        except Exception:
-            data = {
-                "to": to_val,
-                "subject": subj,
-                "body": body,
-            }
-
-        # Preserve provided fields if generator tried to overwrite with empty/irrelevant
-        state["to"] = data.get("to")
-        state["subject"] = data.get("subject")
-        state["body"] = data.get("body")
+        state = _apply_draft(state, resp.content)
+    except Exception as e:
+        state = _draft_failed(state, e)
 
+    return state
+
+
+async def agenerate_email_draft(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async variant of `generate_email_draft`.
+    """
+    messages = _draft_messages(state)
+    if messages is None:
+        return state
+
+    llm = get_llm("email_draft")
+
+    try:
+        resp = await llm.ainvoke(messages)
+        state = _apply_draft(state, resp.content)
     except Exception as e:
-        state["error"] = f"Drafting failed: {str(e)}"
-        state["needs_input"] = True
-        state["human_message"] = "I couldn't draft the email. Please provide subject/body."
+        state = _draft_failed(state, e)
 
     return state
 
 
+# Checkpointed stages of compose_email / acompose_email; each returns the keys it changed.
+extract_email_step = task(delta_step(extract_email_details))
+feedback_email_step = task(delta_step(process_human_feedback))
+draft_email_step = task(delta_step(generate_email_draft))
+aextract_email_step = task(delta_step(aextract_email_details))
+afeedback_email_step = task(delta_step(aprocess_human_feedback))
+adraft_email_step = task(delta_step(agenerate_email_draft))
+
+
 
 def create_final_email(state: Dict[str, Any]) -> Dict[str, Any]:
     """
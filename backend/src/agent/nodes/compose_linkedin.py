@@ -1,28 +1,20 @@
 from typing import Dict, Any
-from langchain_openai import ChatOpenAI
-from langchain_groq import ChatGroq
+from src.agent.llm import get_llm
 from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.func import task
 from langgraph.types import Command, interrupt
 import json
 
+from src.agent.nodes import slots
+from src.agent.state import changes, delta_step
+
 
 # =========================
 # EXTRACTOR (IMPROVED)
 # =========================
-def extract_linkedin_details(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Extract LinkedIn post details from user prompt:
-      - topic (publishable only), tone, length, audience
-      - hashtags, mentions, urls
-      - missing (only 'topic' is considered critical for our flow)
-    """
-    user_prompt = state.get("user_prompt", "")
-
-    # llm = ChatOpenAI(model="gpt-4", temperature=0.1)
-    llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0.1)
-    
-
-    system_prompt = """
+# Hashtags, mentions and URLs are found exactly by `slots.prefill_linkedin`,
+# so the model is only asked for the fields that need judgement.
+LINKEDIN_EXTRACT_SYSTEM_PROMPT = """
 You are a strict extractor for LinkedIn post inputs.
 
 Return ONLY valid JSON with these fields:
@@ -31,9 +23,6 @@ Return ONLY valid JSON with these fields:
   "tone": "professional|conversational|thought_leadership|''",
   "length": "short|medium|long|''",
   "audience": "string or ''",
-  "hashtags": ["#hashtag1", "#hashtag2"],
-  "mentions": ["@user1", "@user2"],
-  "urls": ["https://example.com"],
   "missing": ["list of missing fields"]
 }
 
@@ -49,18 +38,6 @@ TONE / LENGTH / AUDIENCE
 - LENGTH: map any size hints to one of: short|medium|long; else medium.
 - AUDIENCE: extract if user names an audience (“for deep-tech founders”, “for investors”); else general groups.
 
-HASHTAGS
-- Collect tokens starting with # (letters/numbers/underscore). Keep original casing.
-- If none, return [] (do NOT add to missing unless user explicitly asked to include hashtags).
-
-MENTIONS
-- Collect tokens starting with @ (letters/numbers/underscore). Keep original casing.
-- If none, return [] (do NOT add to missing unless user explicitly asked to include mentions).
-
-URLS
-- Extract any http:// or https:// URLs.
-- If none, return [] (do NOT add to missing unless user explicitly asked to include a link).
-
 MISSING
 - Always include fields the user explicitly requested but didn’t provide.
 - Always include "topic" if no publishable content was found.
@@ -70,70 +47,115 @@ Formatting
 - Output only the JSON object. No prose.
 """
 
-    messages = [
-        SystemMessage(content=system_prompt),
+def _extraction_messages(state: Dict[str, Any]):
+    user_prompt = state.get("user_prompt", "")
+    return [
+        SystemMessage(content=LINKEDIN_EXTRACT_SYSTEM_PROMPT),
         HumanMessage(content=f"User input: {user_prompt}")
     ]
 
+
+def _apply_extraction(state: Dict[str, Any], raw: str, found: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Parse the extractor's JSON answer into state; fields in `found`
+    (pre-extracted exactly) take precedence over the answer.
+    """
     try:
-        response = llm.invoke(messages)
-        try:
-            data = json.loads(response.content.strip())
-        except json.JSONDecodeError:
-            data = {
-                "topic": "",
-                "tone": "",
-                "length": "",
-                "audience": "",
-                "hashtags": [],
-                "mentions": [],
-                "urls": [],
-                "missing": ["topic"]
-            }
-
-        # Update state
-        state["topic"] = data.get("topic", "") or ""
-        state["tone"] = data.get("tone", "") or state.get("tone") or ""
-        state["length"] = data.get("length", "") or state.get("length") or ""
-        state["audience"] = data.get("audience", "") or state.get("audience") or ""
-        state["linkedin_hashtags"] = data.get("hashtags", []) or []
-        state["linkedin_mentions"] = data.get("mentions", []) or []
-        state["linkedin_urls"] = data.get("urls", []) or []
-
-        # Critical missing: text
-        critical_missing = []
-        if not state["topic"]:
-            critical_missing.append("topic")
-
-        if critical_missing:
-            state["needs_input"] = True
-            missing_list = ", ".join(critical_missing)
-            state["human_message"] = f"Missing LinkedIn information: {missing_list}. Please provide:\n- text: "
-        else:
-            state["needs_input"] = False
-            state["human_message"] = None
+        data = json.loads(raw.strip())
+    except json.JSONDecodeError:
+        data = {
+            "topic": "",
+            "tone": "",
+            "length": "",
+            "audience": "",
+            "hashtags": [],
+            "mentions": [],
+            "urls": [],
+            "missing": ["topic"]
+        }
+    if found:
+        data.update(found)
+
+    # Update state
+    state["topic"] = data.get("topic", "") or ""
+    state["tone"] = data.get("tone", "") or state.get("tone") or ""
+    state["length"] = data.get("length", "") or state.get("length") or ""
+    state["audience"] = data.get("audience", "") or state.get("audience") or ""
+    state["hashtags"] = data.get("hashtags", []) or []
+    state["mentions"] = data.get("mentions", []) or []
+    state["urls"] = data.get("urls", []) or []
+
+    # Critical missing: text
+    critical_missing = []
+    if not state["topic"]:
+        critical_missing.append("topic")
+
+    if critical_missing:
+        state["needs_input"] = True
+        missing_list = ", ".join(critical_missing)
+        state["human_message"] = f"Missing LinkedIn information: {missing_list}. Please provide:\n- text: "
+    else:
+        state["needs_input"] = False
+        state["human_message"] = None
+    return state
+
+
+def _extraction_failed(state: Dict[str, Any], e: Exception) -> Dict[str, Any]:
+    state["error"] = f"Extraction failed: {str(e)}"
+    state["needs_input"] = True
+    state["human_message"] = "Could not extract LinkedIn details. Please provide post topic."
+    return state
+
+
+def extract_linkedin_details(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract LinkedIn post details from user prompt:
+      - topic (publishable only), tone, length, audience
+      - hashtags, mentions, urls
+      - missing (only 'topic' is considered critical for our flow)
+    Hashtags, mentions and urls come from exact matching; the LLM is
+    skipped when the topic is given with a `topic:` / `post:` marker.
+    """
+    found = slots.prefill_linkedin(state.get("user_prompt", ""))
+    if found.get("topic"):
+        print("[SLOTS] LinkedIn topic found locally, skipping LLM -", found)
+        return _apply_extraction(state, json.dumps({"missing": []}), found)
 
+    llm = get_llm("linkedin_extract")
+
+    try:
+        response = llm.invoke(_extraction_messages(state))
+        state = _apply_extraction(state, response.content, found)
     except Exception as e:
-        state["error"] = f"Extraction failed: {str(e)}"
-        state["needs_input"] = True
-        state["human_message"] = "Could not extract LinkedIn details. Please provide post topic."
+        state = _extraction_failed(state, e)
 
     return state
 
 
-# =========================
-# FEEDBACK (UPDATED)
-# =========================
-def process_linkedin_feedback(state: Dict[str, Any], feedback: str) -> Dict[str, Any]:
+async def aextract_linkedin_details(state: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Process human feedback to fill missing LinkedIn details.
-    Only set 'text' if feedback contains publishable sentences.
-    Also extract tone/length/audience/hashtags/mentions/urls if provided.
+    Async variant of `extract_linkedin_details`.
     """
-    # llm = ChatOpenAI(model="gpt-4", temperature=0.1)
-    llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0.1)
+    found = slots.prefill_linkedin(state.get("user_prompt", ""))
+    if found.get("topic"):
+        print("[SLOTS] LinkedIn topic found locally, skipping LLM -", found)
+        return _apply_extraction(state, json.dumps({"missing": []}), found)
+
+    llm = get_llm("linkedin_extract")
+
+    try:
+        response = await llm.ainvoke(_extraction_messages(state))
+        state = _apply_extraction(state, response.content, found)
+    except Exception as e:
+        state = _extraction_failed(state, e)
+
+    return state
 
 
+# =========================
+# FEEDBACK (UPDATED)
+# =========================
+def _feedback_messages(state: Dict[str, Any], feedback: str):
     system_prompt = f"""Extract LinkedIn information from human feedback.
 
 Current:
@@ -141,9 +163,9 @@ topic={state.get('topic','')}
 tone={state.get('tone','')}
 length={state.get('length','')}
 audience={state.get('audience','')}
-hashtags={state.get('linkedin_hashtags',[])}
-mentions={state.get('linkedin_mentions',[])}
-urls={state.get('linkedin_urls',[])}
+hashtags={state.get('hashtags',[])}
+mentions={state.get('mentions',[])}
+urls={state.get('urls',[])}
 
 Return ONLY JSON:
 {{
@@ -160,49 +182,81 @@ Rules:
 - Only set "topic" if feedback contains actual publishable sentences. If it's still meta-intent, leave "".
 - Do not fabricate hashtags/mentions/urls; extract only what is present.
 """
-
-    messages = [
+    return [
         SystemMessage(content=system_prompt),
         HumanMessage(content=f"Human feedback: {feedback}")
     ]
 
+
+def _apply_feedback(state: Dict[str, Any], raw: str) -> Dict[str, Any]:
+    try:
+        data = json.loads(raw.strip())
+    except json.JSONDecodeError:
+        data = {}
+
+    # Update fields if provided
+    if isinstance(data.get("topic"), str):
+        state["topic"] = data["topic"]  # may be ""
+
+    if data.get("tone"):
+        state["tone"] = data["tone"]
+    if data.get("length"):
+        state["length"] = data["length"]
+    if data.get("audience"):
+        state["audience"] = data["audience"]
+
+    if isinstance(data.get("hashtags"), list):
+        state["hashtags"] = data["hashtags"]
+    if isinstance(data.get("mentions"), list):
+        state["mentions"] = data["mentions"]
+    if isinstance(data.get("urls"), list):
+        state["urls"] = data["urls"]
+
+    # Re-evaluate missing
+    if not (state.get("topic") or "").strip():
+        state["needs_input"] = True
+        state["human_message"] = "Still missing: topic. Please provide:\n- topic: "
+    else:
+        state["needs_input"] = False
+        state["human_message"] = None
+    return state
+
+
+def _feedback_failed(state: Dict[str, Any], e: Exception) -> Dict[str, Any]:
+    state["error"] = f"Failed to process feedback: {str(e)}"
+    state["needs_input"] = True
+    state["human_message"] = "Error processing your input. Please try again."
+    return state
+
+
+def process_linkedin_feedback(state: Dict[str, Any], feedback: str) -> Dict[str, Any]:
+    """
+    Process human feedback to fill missing LinkedIn details.
+    Only set 'text' if feedback contains publishable sentences.
+    Also extract tone/length/audience/hashtags/mentions/urls if provided.
+    """
+    llm = get_llm("linkedin_feedback")
+
     try:
-        response = llm.invoke(messages)
-        try:
-            data = json.loads(response.content.strip())
-        except json.JSONDecodeError:
-            data = {}
-
-        # Update fields if provided
-        if isinstance(data.get("topic"), str):
-            state["topic"] = data["topic"]  # may be ""
-
-        if data.get("tone"):
-            state["tone"] = data["tone"]
-        if data.get("length"):
-            state["length"] = data["length"]
-        if data.get("audience"):
-            state["audience"] = data["audience"]
-
-        if isinstance(data.get("hashtags"), list):
-            state["linkedin_hashtags"] = data["hashtags"]
-        if isinstance(data.get("mentions"), list):
-            state["linkedin_mentions"] = data["mentions"]
-        if isinstance(data.get("urls"), list):
-            state["linkedin_urls"] = data["urls"]
-
-        # Re-evaluate missing
-        if not (state.get("topic") or "").strip():
-            state["needs_input"] = True
-            state["human_message"] = "Still missing: topic. Please provide:\n- topic: "
-        else:
-            state["needs_input"] = False
-            state["human_message"] = None
+        response = llm.invoke(_feedback_messages(state, feedback))
+        state = _apply_feedback(state, response.content)
+    except Exception as e:
+        state = _feedback_failed(state, e)
 
+    return state
+
+
+async def aprocess_linkedin_feedback(state: Dict[str, Any], feedback: str) -> Dict[str, Any]:
+    """
+    Async variant of `process_linkedin_feedback`.
+    """
+    llm = get_llm("linkedin_feedback")
+
+    try:
+        response = await llm.ainvoke(_feedback_messages(state, feedback))
+        state = _apply_feedback(state, response.content)
     except Exception as e:
-        state["error"] = f"Failed to process feedback: {str(e)}"
-        state["needs_input"] = True
-        state["human_message"] = "Error processing your input. Please try again."
+        state = _feedback_failed(state, e)
 
     return state
 
@@ -211,14 +265,7 @@ Rules:
 # POST-INFO (NEW)
 # =========================
 
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-
-def draft_linkedin_post_from_topic(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Generate a well-structured LinkedIn post body from a topic (short phrase or notes).
-    Uses tone, length, audience. Does NOT include hashtags/mentions/urls in the body.
-    """
+def _draft_messages(state: Dict[str, Any]):
     topic = (state.get("topic") or "").strip()  # treat current 'topic' as topic if it's short
     tone = state.get("tone") or "professional"         # professional|conversational|thought_leadership
     length = state.get("length") or "medium"           # short|medium|long
@@ -227,10 +274,6 @@ def draft_linkedin_post_from_topic(state: Dict[str, Any]) -> Dict[str, Any]:
     # Optional: allow a CTA via state["cta"] if you want
     cta = (state.get("cta") or "").strip()
 
-    # llm = ChatOpenAI(model="gpt-4", temperature=0.4)
-    llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0.7)
-
-
     sys = f"""You write complete, high-signal LinkedIn posts.
 Requirements:
 - INPUT will be a TOPIC (short phrase or notes).
@@ -244,27 +287,59 @@ Requirements:
 - No emojis unless present in the topic.
 Return ONLY the post body text.
 """
-
-    messages = [
+    return [
         SystemMessage(content=sys),
         HumanMessage(content=f"TOPIC:\n{topic}")
     ]
 
+
+def _apply_draft(state: Dict[str, Any], content: str) -> Dict[str, Any]:
+    post_body = (content or "").strip()
+    if post_body:
+        state["generated_text"] = post_body
+        state["needs_input"] = False
+        state["human_message"] = None
+    else:
+        # Fallback: keep needs_input if nothing generated
+        state["needs_input"] = True
+        state["human_message"] = "Could not generate a post from the topic. Please provide 1–2 sentences."
+    return state
+
+
+def _draft_failed(state: Dict[str, Any], e: Exception) -> Dict[str, Any]:
+    state["error"] = f"Generation failed: {str(e)}"
+    state["needs_input"] = True
+    state["human_message"] = "Error generating the post. Please provide 1–2 sentences."
+    return state
+
+
+def draft_linkedin_post_from_topic(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Generate a well-structured LinkedIn post body from a topic (short phrase or notes).
+    Uses tone, length, audience. Does NOT include hashtags/mentions/urls in the body.
+    """
+    llm = get_llm("linkedin_draft")
+
     try:
-        resp = llm.invoke(messages)
-        post_body = (resp.content or "").strip()
-        if post_body:
-            state["generated_text"] = post_body
-            state["needs_input"] = False
-            state["human_message"] = None
-        else:
-            # Fallback: keep needs_input if nothing generated
-            state["needs_input"] = True
-            state["human_message"] = "Could not generate a post from the topic. Please provide 1–2 sentences."
+        resp = llm.invoke(_draft_messages(state))
+        state = _apply_draft(state, resp.content)
     except Exception as e:
-        state["error"] = f"Generation failed: {str(e)}"
-        state["needs_input"] = True
-        state["human_message"] = "Error generating the post. Please provide 1–2 sentences."
+        state = _draft_failed(state, e)
+
+    return state
+
+
+async def adraft_linkedin_post_from_topic(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async variant of `draft_linkedin_post_from_topic`.
+    """
+    llm = get_llm("linkedin_draft")
+
+    try:
+        resp = await llm.ainvoke(_draft_messages(state))
+        state = _apply_draft(state, resp.content)
+    except Exception as e:
+        state = _draft_failed(state, e)
 
     return state
 
@@ -281,9 +356,9 @@ def create_final_linkedin_post(state: Dict[str, Any]) -> Dict[str, Any]:
     refined = (post_info.get("post_body") or "").strip()
     base_text = refined or (state.get("generated_text") or "").strip()
 
-    hashtags = state.get("linkedin_hashtags", []) or []
-    mentions = state.get("linkedin_mentions", []) or []
-    urls = state.get("linkedin_urls", []) or []
+    hashtags = state.get("hashtags", []) or []
+    mentions = state.get("mentions", []) or []
+    urls = state.get("urls", []) or []
 
     post_content = base_text
     if mentions:
@@ -301,41 +376,79 @@ def create_final_linkedin_post(state: Dict[str, Any]) -> Dict[str, Any]:
 {'=' * 40}
 Ready to post? Please review above."""
     state["preview"] = preview
-    state["text"] = post_content  # keep for downstream compatibility
     return state
 
 
 # =========================
 # ORCHESTRATOR (UNCHANGED FLOW, + post_info)
 # =========================
+def _finish_linkedin(state: Dict[str, Any], current: Dict[str, Any]) -> Command:
+    print("[Compose LinkedIn] Post info -", current.get("post_info"))
+
+    # Final assemble + preview
+    current = create_final_linkedin_post(current)
+    print("[Compose LinkedIn] Final state -", current)
+
+    return Command(goto="human_gate", update=changes(state, current))
+
+
+# Checkpointed stages of compose_linkedin / acompose_linkedin; each returns the keys it changed.
+extract_linkedin_step = task(delta_step(extract_linkedin_details))
+feedback_linkedin_step = task(delta_step(process_linkedin_feedback))
+draft_linkedin_step = task(delta_step(draft_linkedin_post_from_topic))
+aextract_linkedin_step = task(delta_step(aextract_linkedin_details))
+afeedback_linkedin_step = task(delta_step(aprocess_linkedin_feedback))
+adraft_linkedin_step = task(delta_step(adraft_linkedin_post_from_topic))
+
+
 def compose_linkedin(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Compose LinkedIn post with extraction and human-in-the-loop.
     After fields are ready, fetch post_info, then compose preview.
+
+    Each LLM stage runs as a task, so a restart after an interrupt replays
+    the finished stages from the checkpoint instead of calling the model.
+    Stages return the keys they changed, applied to a working copy.
     """
+    current = dict(state)
     # Extract
-    state = extract_linkedin_details(state)
-    print("[Compose LinkedIn] After extract -", state)
+    # The intent node may already have extracted the fields (route-and-extract mode)
+    if not current.get("slots_prefilled"):
+        current.update(extract_linkedin_step(current).result())
+    print("[Compose LinkedIn] After extract -", current)
 
-    # Human input loop if text missing
-    if state.get("needs_input"):
+    # Human input loop while text is missing
+    while current.get("needs_input"):
         user_feedback = interrupt({
-            "message": state.get("human_message", "Please provide missing LinkedIn information")
+            "message": current.get("human_message", "Please provide missing LinkedIn information")
         })
         print(f"[compose_linkedin] Human feedback: {user_feedback}")
 
-        state = process_linkedin_feedback(state, user_feedback)
-        print("[Compose LinkedIn] After feedback -", state)
-
-        if state.get("needs_input"):
-            return compose_linkedin(state)
+        current.update(feedback_linkedin_step(current, user_feedback).result())
+        print("[Compose LinkedIn] After feedback -", current)
 
     # Post-info (refinement & diagnostics; no new claims)
-    state = draft_linkedin_post_from_topic(state)
-    print("[Compose LinkedIn] Post info -", state.get("post_info"))
+    current.update(draft_linkedin_step(current).result())
+    return _finish_linkedin(state, current)
 
-    # Final assemble + preview
-    state = create_final_linkedin_post(state)
-    print("[Compose LinkedIn] Final state -", state)
 
-    return Command(goto="human_gate", update=state)
+async def acompose_linkedin(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async variant of `compose_linkedin`.
+    """
+    current = dict(state)
+    if not current.get("slots_prefilled"):
+        current.update(await aextract_linkedin_step(current))
+    print("[Compose LinkedIn] After extract -", current)
+
+    while current.get("needs_input"):
+        user_feedback = interrupt({
+            "message": current.get("human_message", "Please provide missing LinkedIn information")
+        })
+        print(f"[compose_linkedin] Human feedback: {user_feedback}")
+
+        current.update(await afeedback_linkedin_step(current, user_feedback))
+        print("[Compose LinkedIn] After feedback -", current)
+
+    current.update(await adraft_linkedin_step(current))
+    return _finish_linkedin(state, current)
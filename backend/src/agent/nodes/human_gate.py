@@ -1,18 +1,20 @@
 from typing import Dict, Any
 from langgraph.types import Command, interrupt
-from langgraph.graph import END
-from langchain_openai import ChatOpenAI
-# from langchain_groq imoprt ChatGroq
-from langchain_groq import ChatGroq
+from langgraph.constants import END
+from src.agent.llm import get_llm
 from langchain_core.messages import HumanMessage, SystemMessage
 import json
 
+CANCELLED = {"approved": False, "error": "Workflow cancelled by user", "awaiting": "decision"}
+
+
 def human_gate(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Human gate with two phases:
       - awaiting == "decision": ask send/edit/cancel
       - awaiting == "edits": ask for edit text
-    Exactly ONE interrupt per node call.
+    Exactly ONE interrupt per node call. Updates carry only the keys the
+    decision sets.
     """
     preview = state.get("preview", "No preview available")
     print(f"\n{preview}\n")
@@ -29,25 +31,18 @@ def human_gate(state: Dict[str, Any]) -> Dict[str, Any]:
             decision = str(user_decision).strip().lower()
 
             if decision == "send":
-                state["approved"] = True
-                state["awaiting"] = "decision"
                 # Route to send_email node (LangChain tool), not end
-                return Command(goto="send_email", update=state)
+                return Command(goto="send_email", update={"approved": True, "awaiting": "decision"})
 
             if decision == "edit":
                 # Next call to this node will request edit text
-                state["awaiting"] = "edits"
-                return Command(goto="edits", update=state)
+                return Command(goto="edits", update={"awaiting": "edits"})
 
             if decision == "cancel":
-                state["approved"] = False
-                state["error"] = "Workflow cancelled by user"
-                state["awaiting"] = "decision"
-                return Command(goto=END, update=state)
+                return Command(goto=END, update=CANCELLED)
 
             # invalid input → ask again
-            state["awaiting"] = "decision"
-            return Command(goto="human_gate", update=state)
+            return Command(goto="human_gate", update={"awaiting": "decision"})
     elif intent == "linkedin":
         if awaiting == "decision":
             user_decision = interrupt({
@@ -55,28 +50,16 @@ def human_gate(state: Dict[str, Any]) -> Dict[str, Any]:
             })
             decision = str(user_decision).strip().lower()
         if decision == "post":
-            state["approved"] = True
-            state["awaiting"] = "decision"
-            return Command(goto="post_linkedin", update=state)
+            return Command(goto="post_linkedin", update={"approved": True, "awaiting": "decision"})
         if decision == "edit":
-            state["awaiting"] = "edits"
-            return Command(goto="process_linkedin_edits", update=state)
+            return Command(goto="process_linkedin_edits", update={"awaiting": "edits"})
         if decision == "cancel":
-            state["approved"] = False
-            state["error"] = "Workflow cancelled by user"
-            state["awaiting"] = "decision"
-            return Command(goto=END, update=state)
-        state["awaiting"] = "decision"
-        return Command(goto="human_gate", update=state)
+            return Command(goto=END, update=CANCELLED)
+        return Command(goto="human_gate", update={"awaiting": "decision"})
     else:
-        state["awaiting"] = "decision"
-        return Command(goto="human_gate", update=state)
-
-def _process_edits(state: Dict[str, Any]) -> Dict[str, Any]:
-    edit_feedback = interrupt({"message": "What would you like to change? Describe your edits."})
+        return Command(goto="human_gate", update={"awaiting": "decision"})
 
-    # llm = ChatOpenAI(model="gpt-4", temperature=0.7)
-    llm = ChatGroq(model="openai/gpt-oss-120b",temperature=0.7)
+def _email_edit_messages(state: Dict[str, Any], edit_feedback: str):
     current_to = state.get("to", "")
     current_subject = state.get("subject", "")
     current_body = state.get("body", "")
@@ -93,12 +76,18 @@ Apply the requested edits and respond in JSON:
   "subject": "updated subject",
   "body": "updated body "
 }}"""
-    resp = llm.invoke([SystemMessage(content=system_prompt),
-                       HumanMessage(content=f"Edit request: {edit_feedback}")])
+    return [SystemMessage(content=system_prompt),
+            HumanMessage(content=f"Edit request: {edit_feedback}")]
+
+
+def _apply_email_edits(state: Dict[str, Any], raw: str) -> Command:
+    current_to = state.get("to", "")
+    current_subject = state.get("subject", "")
+    current_body = state.get("body", "")
 
     data = {}
     try:
-        data = json.loads(resp.content.strip())
+        data = json.loads(raw.strip())
     except json.JSONDecodeError:
         data = {"to": current_to, "subject": current_subject, "body": current_body}
 
@@ -121,11 +110,23 @@ Apply the requested edits and respond in JSON:
     })
 
 
-def process_linkedin_edits(state: Dict[str, Any]) -> Dict[str, Any]:
+def _process_edits(state: Dict[str, Any]) -> Dict[str, Any]:
     edit_feedback = interrupt({"message": "What would you like to change? Describe your edits."})
 
-    # llm = ChatOpenAI(model="gpt-4", temperature=0.3)
-    llm = ChatGroq(model = "openai/gpt-oss-120b", temperature = 0.7)
+    llm = get_llm("email_edit")
+    resp = llm.invoke(_email_edit_messages(state, edit_feedback))
+    return _apply_email_edits(state, resp.content)
+
+
+async def _aprocess_edits(state: Dict[str, Any]) -> Dict[str, Any]:
+    edit_feedback = interrupt({"message": "What would you like to change? Describe your edits."})
+
+    llm = get_llm("email_edit")
+    resp = await llm.ainvoke(_email_edit_messages(state, edit_feedback))
+    return _apply_email_edits(state, resp.content)
+
+
+def _linkedin_edit_messages(state: Dict[str, Any], edit_feedback: str):
     current_text = state.get("generated_text", "")
 
     system_prompt = f"""
@@ -151,12 +152,12 @@ def process_linkedin_edits(state: Dict[str, Any]) -> Dict[str, Any]:
     User edit request:
     {edit_feedback}
     """
-    resp = llm.invoke([SystemMessage(content=system_prompt),
-                       HumanMessage(content=f"Edit request: {edit_feedback}")])
+    return [SystemMessage(content=system_prompt),
+            HumanMessage(content=f"Edit request: {edit_feedback}")]
+
 
-    # print(resp)
-    data = resp.content.strip()
-    new_text = data
+def _apply_linkedin_edits(state: Dict[str, Any], content: str) -> Command:
+    new_text = content.strip()
 
     preview = (
         "📱 UPDATED LINKEDIN POST PREVIEW\n" + "=" * 40 + "\n\n"
@@ -165,7 +166,23 @@ def process_linkedin_edits(state: Dict[str, Any]) -> Dict[str, Any]:
     )
 
     return Command(goto="human_gate", update={
-        "text": new_text,
+        "generated_text": new_text,
         "preview": preview,
         "awaiting": "decision",
-    })
\ No newline at end of file
+    })
+
+
+def process_linkedin_edits(state: Dict[str, Any]) -> Dict[str, Any]:
+    edit_feedback = interrupt({"message": "What would you like to change? Describe your edits."})
+
+    llm = get_llm("linkedin_edit")
+    resp = llm.invoke(_linkedin_edit_messages(state, edit_feedback))
+    return _apply_linkedin_edits(state, resp.content)
+
+
+async def aprocess_linkedin_edits(state: Dict[str, Any]) -> Dict[str, Any]:
+    edit_feedback = interrupt({"message": "What would you like to change? Describe your edits."})
+
+    llm = get_llm("linkedin_edit")
+    resp = await llm.ainvoke(_linkedin_edit_messages(state, edit_feedback))
+    return _apply_linkedin_edits(state, resp.content)
@@ -2,22 +2,19 @@
 Simplified intent detection - only determines email vs LinkedIn.
 """
 
-from typing import Dict, Any
-from langchain_openai import ChatOpenAI
-from langchain_groq import ChatGroq
+import json
+import os
+from typing import Dict, Any, Optional
+from src.agent.llm import get_llm
 from langchain_core.messages import HumanMessage, SystemMessage
 from langgraph.types import Command
 
+from src.agent.intent_classifier import classify, confidence_threshold
+from src.agent.nodes import compose_cal_events, compose_email, compose_linkedin
+from src.agent.state import changes
 
-def detect_intent(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Detect user intent: email, linkedin, chat, or calendar event.
-    """
-    
-    # llm = ChatOpenAI(model="gpt-4", temperature=0.1)
-    llm = ChatGroq(model="openai/gpt-oss-120b")
-    
-    system_prompt = """Classify the user's request into one of: email, linkedin, chat, calendar.
+
+INTENT_SYSTEM_PROMPT = """Classify the user's request into one of: email, linkedin, chat, calendar.
 
 - email: composing/sending an email, mentions email, mail, reply, forward, @address, etc.
 - linkedin: posting to LinkedIn, share on LinkedIn, LinkedIn post, etc.
@@ -27,16 +24,77 @@ def detect_intent(state: Dict[str, Any]) -> Dict[str, Any]:
 Respond with ONLY one token: email | linkedin | chat | calendar
 """
 
-    user_prompt = state.get("user_prompt", "")
-    
-    messages = [
-        SystemMessage(content=system_prompt),
+
+ROUTE_AND_EXTRACT_SYSTEM_PROMPT = """Route the user's request to a channel and extract that channel's fields in one step.
+Return ONLY one valid JSON object. No prose, no code fences, no explanations.
+
+{
+  "intent": "email" | "linkedin" | "chat" | "calendar",
+  "slots": { ...fields for that intent, see below... }
+}
+
+INTENT
+- email: composing/sending an email, mentions email, mail, reply, forward, @address, etc.
+- linkedin: posting to LinkedIn, share on LinkedIn, LinkedIn post, etc.
+- calendar: creating or scheduling events, meetings, reminders, appointments, adding to calendar, etc.
+- chat: everything else (jokes, Q&A, small talk, general tasks). slots = {}
+
+SLOTS for email:
+{"to": "recipient email or name", "subject": "concise subject or ''", "body": "message content or ''",
+ "sender_name": "recipient name (lowercase), derived from the address if not given", "missing": ["to","subject","body"]}
+- Meta-instructions ("send mail", "email X", "write an email") are NOT body.
+- Leave a field "" and list it in "missing" when it is not clearly present.
+
+SLOTS for linkedin:
+{"topic": "publishable content or ''", "tone": "professional|conversational|thought_leadership|''",
+ "length": "short|medium|long|''", "audience": "string or ''", "hashtags": ["#tag"], "mentions": ["@user"],
+ "urls": ["https://..."], "missing": ["topic"]}
+- Requests like "write a post" / "post on LinkedIn" are NOT topic; set "" and list "topic" in "missing".
+- Collect only hashtags, mentions and URLs actually present.
+
+SLOTS for calendar:
+{"summary": "event title", "description": "event details", "start": "YYYY-MM-DDTHH:MM:SS+05:30",
+ "end": "YYYY-MM-DDTHH:MM:SS+05:30"}
+- Convert natural language dates/times to ISO 8601 (Asia/Kolkata); suggest reasonable values when missing.
+"""
+
+# intent -> function that applies that channel's extracted slots to state
+SLOT_APPLIERS = {
+    "email": compose_email._apply_extraction,
+    "linkedin": compose_linkedin._apply_extraction,
+    "calendar": compose_cal_events._apply_extraction,
+}
+
+# intent -> node that handles it
+ROUTES = {
+    "email": "compose_email",
+    "linkedin": "compose_linkedin",
+    "chat": "chat",
+    "calendar": "calendar",
+}
+
+
+def route_and_extract_enabled() -> bool:
+    """
+    Whether an unsure intent detection also extracts the channel's fields in
+    the same LLM call (set INTENT_ROUTE_AND_EXTRACT=1).
+    """
+    return os.getenv("INTENT_ROUTE_AND_EXTRACT", "").strip().lower() in ("1", "true", "yes")
+
+
+def _intent_messages(user_prompt: str):
+    return [
+        SystemMessage(content=INTENT_SYSTEM_PROMPT),
         HumanMessage(content=f"User input: {user_prompt}")
     ]
-    
-    response = llm.invoke(messages)
-    intent = response.content.strip().lower()
-    
+
+
+def _resolve_intent(raw: str, user_prompt: str) -> str:
+    """
+    Map the model's answer onto a known intent, falling back to keywords.
+    """
+    intent = raw.strip().lower()
+
     # Validate response
     if "email" in intent:
         intent = "email"
@@ -57,29 +115,123 @@ Respond with ONLY one token: email | linkedin | chat | calendar
             intent = "calendar"
         else:
             intent = "chat"  # Default
-    
+    return intent
+
+
+def _route_and_extract_messages(user_prompt: str):
+    return [
+        SystemMessage(content=ROUTE_AND_EXTRACT_SYSTEM_PROMPT),
+        HumanMessage(content=f"User input: {user_prompt}")
+    ]
+
+
+def _apply_route_and_extract(state: Dict[str, Any], raw: str, user_prompt: str) -> Dict[str, Any]:
+    """
+    Set the intent and, when the slots parsed, fill the channel's fields so
+    its compose node can skip its own extraction call.
+    """
+    try:
+        data = json.loads(raw.strip())
+    except json.JSONDecodeError:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+
+    state["intent"] = _resolve_intent(str(data.get("intent", "")), user_prompt)
+    apply_slots = SLOT_APPLIERS.get(state["intent"])
+    slots = data.get("slots")
+    if apply_slots and isinstance(slots, dict):
+        state = apply_slots(state, json.dumps(slots))
+        state["slots_prefilled"] = True
+    return state
+
+
+def _classify_locally(user_prompt: str) -> Optional[str]:
+    """
+    Intent from the local classifier, or None when it is not confident
+    enough (or unavailable) and the LLM should decide.
+    """
+    try:
+        intent, confidence = classify(user_prompt)
+    except Exception as e:
+        print("[INTENT] Local classifier unavailable -", e)
+        return None
+
+    if confidence >= confidence_threshold():
+        print(f"[INTENT] Local classifier - {intent} ({confidence:.2f})")
+        return intent
+    print(f"[INTENT] Low confidence ({confidence:.2f}), asking the LLM")
+    return None
+
+
+def detect_intent(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Detect user intent: email, linkedin, chat, or calendar event.
+    The LLM is only called when the local classifier is unsure.
+    Returns an updated copy of the state.
+    """
+    user_prompt = state.get("user_prompt", "")
+    state = {**state, "slots_prefilled": False}
+    intent = _classify_locally(user_prompt)
+    if intent is None and route_and_extract_enabled():
+        llm = get_llm("route_extract")
+        response = llm.invoke(_route_and_extract_messages(user_prompt))
+        state = _apply_route_and_extract(state, response.content, user_prompt)
+        print("[INTENT] SET Intent (with slots) -", state["intent"])
+        return state
+
+    if intent is None:
+        llm = get_llm("intent")
+        response = llm.invoke(_intent_messages(user_prompt))
+        intent = _resolve_intent(response.content, user_prompt)
+
     state["intent"] = intent
-    print("[INTENT] SET Intent -", intent)
+    print("[INTENT] SET Intent -", state["intent"])
     return state
 
 
+async def adetect_intent(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async variant of `detect_intent`.
+    """
+    user_prompt = state.get("user_prompt", "")
+    state = {**state, "slots_prefilled": False}
+    intent = _classify_locally(user_prompt)
+    if intent is None and route_and_extract_enabled():
+        llm = get_llm("route_extract")
+        response = await llm.ainvoke(_route_and_extract_messages(user_prompt))
+        state = _apply_route_and_extract(state, response.content, user_prompt)
+        print("[INTENT] SET Intent (with slots) -", state["intent"])
+        return state
+
+    if intent is None:
+        llm = get_llm("intent")
+        response = await llm.ainvoke(_intent_messages(user_prompt))
+        intent = _resolve_intent(response.content, user_prompt)
+
+    state["intent"] = intent
+    print("[INTENT] SET Intent -", state["intent"])
+    return state
+
+
+def _route(state: Dict[str, Any], detected: Dict[str, Any]) -> Command:
+    # Route based on intent; the update holds only the keys detection changed
+    if detected.get("intent") not in ROUTES:
+        detected = {**detected, "intent": "chat"}
+    if detected["intent"] == "email":
+        print("SET NEXT STAGE - Compose email")
+    return Command(goto=ROUTES[detected["intent"]], update=changes(state, detected))
+
+
 def intent_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Simple intent detection - only determines email vs linkedin.
     """
-    state = detect_intent(state)
-    
-    # Route based on intent
-    if state.get("intent") == "email":
-        print("SET NEXT STAGE - Compose email")
-        return Command(goto="compose_email", update=state)
-    elif state.get("intent") == "linkedin":
-        return Command(goto="compose_linkedin", update=state)
-    elif state.get("intent") == "chat":
-        return Command(goto="chat", update=state)
-    elif state.get('intent') == "calendar":
-        return Command(goto="calendar")
-    else:
-        # Default to email
-        state["intent"] = "chat"
-        return Command(goto="chat", update=state)
\ No newline at end of file
+    return _route(state, detect_intent(state))
+
+
+async def aintent_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async variant of `intent_node`.
+    """
+    return _route(state, await adetect_intent(state))
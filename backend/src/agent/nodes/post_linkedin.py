@@ -1,18 +1,9 @@
-from typing import Dict, Any
 from langgraph.types import Command
-from langgraph.graph import END
+from langgraph.constants import END
 from langchain_core.messages import AIMessage
 from src.agent.tools.tools import post_linkedin_text
 
-def post_linkedin_node(state):
-    """Invoke the LangChain linkedin tool and go to end."""
-    generated_text = state.get("generated_text")
-
-    if not generated_text:
-        result = {"status": "error", "message": "Missing Post Draft"}
-    else:
-        result = post_linkedin_text.invoke({"text" : generated_text})
-
+def _post_result(state, result):
     status = result.get("status")
     message = result.get("message", "")
     footer = f"\n\n📤 Send result: {status} — {message}"
@@ -24,4 +15,26 @@ def post_linkedin_node(state):
         "result": result,
         "preview": preview,
         "messages": [AIMessage(content=ai_note)],
-    })
\ No newline at end of file
+    })
+
+
+def post_linkedin_node(state):
+    """Invoke the LangChain linkedin tool and go to end."""
+    generated_text = state.get("generated_text")
+
+    if not generated_text:
+        result = {"status": "error", "message": "Missing Post Draft"}
+    else:
+        result = post_linkedin_text.invoke({"text" : generated_text})
+    return _post_result(state, result)
+
+
+async def apost_linkedin_node(state):
+    """Async variant of `post_linkedin_node`."""
+    generated_text = state.get("generated_text")
+
+    if not generated_text:
+        result = {"status": "error", "message": "Missing Post Draft"}
+    else:
+        result = await post_linkedin_text.ainvoke({"text" : generated_text})
+    return _post_result(state, result)
@@ -1,22 +1,25 @@
 from typing import Dict, Any
 from langgraph.types import Command
-from langgraph.graph import END
+from langgraph.constants import END
 from langchain_core.messages import AIMessage
 from src.agent.tools.tools import send_email_tool
 
-def send_email_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Invoke the LangChain email tool and go to end."""
-    to = (state.get("to") or "").strip()
-    subject = (state.get("subject") or "No subject").strip()
-    body = state.get("body") or ""
-    user_id = state.get("user_id") or ''
-  
-    if not to:
-        result = {"status": "error", "message": "Missing recipient email"}
-        print("[SEND EMAIL] ERROR - ", result)
-    else:
-        result = send_email_tool.invoke({"to": to, "subject": subject, "body": body, "user_id" : user_id})
-        print("[SEND EMAIL] RESULT - ", result)
+def _email_args(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "to": (state.get("to") or "").strip(),
+        "subject": (state.get("subject") or "No subject").strip(),
+        "body": state.get("body") or "",
+        "user_id": state.get("user_id") or '',
+    }
+
+
+def _missing_recipient() -> Dict[str, Any]:
+    result = {"status": "error", "message": "Missing recipient email"}
+    print("[SEND EMAIL] ERROR - ", result)
+    return result
+
+
+def _send_result(state: Dict[str, Any], result: Dict[str, Any]) -> Command:
     status = result.get("status")
     message = result.get("message", "")
     footer = f"\n\n📤 Send result: {status} — {message}"
@@ -29,3 +32,27 @@ def send_email_node(state: Dict[str, Any]) -> Dict[str, Any]:
         "preview": preview,
         "messages": [AIMessage(content=ai_note)],
     })
+
+
+def send_email_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Invoke the LangChain email tool and go to end."""
+    args = _email_args(state)
+  
+    if not args["to"]:
+        result = _missing_recipient()
+    else:
+        result = send_email_tool.invoke(args)
+        print("[SEND EMAIL] RESULT - ", result)
+    return _send_result(state, result)
+
+
+async def asend_email_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of `send_email_node`."""
+    args = _email_args(state)
+
+    if not args["to"]:
+        result = _missing_recipient()
+    else:
+        result = await send_email_tool.ainvoke(args)
+        print("[SEND EMAIL] RESULT - ", result)
+    return _send_result(state, result)
@@ -0,0 +1,123 @@
+"""
+Deterministic slot pre-extraction shared by the compose nodes.
+
+Anything a regex can find exactly (email addresses, explicit `subject:` /
+`body:` / `topic:` markers, #hashtags, @mentions and URLs) is filled here
+before the LLM is asked, so the extraction call can be skipped or given a
+smaller prompt covering only what is left.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+URL_RE = re.compile(r"https?://[^\s<>\"']+")
+# Not preceded by a word character, so "bob@example.com" is not a mention
+HASHTAG_RE = re.compile(r"(?<![\w#&])#(\w+)")
+MENTION_RE = re.compile(r"(?<![\w.@])@(\w+)(?![\w.-]*\.\w)")
+MARKER_RE = re.compile(r"(?<!\w)(to|subject|body|topic|post|text)\s*:\s*", re.IGNORECASE)
+
+# Trailing characters that end a sentence rather than a URL
+_URL_TRAILING = ".,;:!?)]}'\""
+
+
+def find_emails(text: str) -> List[str]:
+    return EMAIL_RE.findall(text or "")
+
+
+def find_urls(text: str) -> List[str]:
+    return [u.rstrip(_URL_TRAILING) for u in URL_RE.findall(text or "")]
+
+
+def find_hashtags(text: str) -> List[str]:
+    # URL fragments ("page#section") are not hashtags
+    text = URL_RE.sub(" ", text or "")
+    return _unique("#" + tag for tag in HASHTAG_RE.findall(text))
+
+
+def find_mentions(text: str) -> List[str]:
+    text = URL_RE.sub(" ", text or "")
+    return _unique("@" + name for name in MENTION_RE.findall(text))
+
+
+def find_markers(text: str) -> Dict[str, str]:
+    """
+    Values written as `key: value` for the known marker keys. Each value runs
+    until the next marker; the first occurrence of a key wins.
+    """
+    text = text or ""
+    matches = list(MARKER_RE.finditer(text))
+    markers: Dict[str, str] = {}
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        value = text[m.end():end].strip().strip("\"'“”").strip()
+        key = m.group(1).lower()
+        if value and key not in markers:
+            markers[key] = value
+    return markers
+
+
+def name_from_address(address: str) -> str:
+    """
+    Recipient name derived from an email address: the alphabetic part of the
+    local part, lowercase ("krishna.b7@x.com" -> "krishna"). "" if none.
+    """
+    if "@" not in (address or ""):
+        return ""
+    local = address.split("@", 1)[0]
+    local = re.sub(r"[\d._+-]+", " ", local).strip()
+    return local.lower().split()[0] if local else ""
+
+
+def bare_address(text: str) -> Optional[str]:
+    """
+    The address when `text` is nothing but one email address (optionally
+    prefixed with "to"), e.g. an answer to "Missing email information: to".
+    """
+    m = re.fullmatch(r"\s*(?:to\s*:?\s*)?<?(" + EMAIL_RE.pattern + r")>?\s*\.?\s*", text or "", re.IGNORECASE)
+    return m.group(1) if m else None
+
+
+def prefill_email(text: str) -> Dict[str, Any]:
+    """
+    Email fields found exactly in `text`; keys are only present when found.
+    """
+    markers = find_markers(text)
+    found: Dict[str, Any] = {}
+
+    emails = find_emails(markers.get("to", "")) or find_emails(text)
+    if emails:
+        found["to"] = emails[0]
+    elif markers.get("to"):
+        found["to"] = markers["to"]
+
+    if markers.get("subject"):
+        found["subject"] = markers["subject"]
+    if markers.get("body"):
+        found["body"] = markers["body"]
+
+    name = name_from_address(found.get("to", ""))
+    if name:
+        found["sender_name"] = name
+    return found
+
+
+def prefill_linkedin(text: str) -> Dict[str, Any]:
+    """
+    LinkedIn fields found exactly in `text`: hashtags, mentions and urls are
+    always present (possibly empty); topic only when given with a marker.
+    """
+    markers = find_markers(text)
+    found: Dict[str, Any] = {
+        "hashtags": find_hashtags(text),
+        "mentions": find_mentions(text),
+        "urls": find_urls(text),
+    }
+    topic = markers.get("topic") or markers.get("post") or markers.get("text")
+    if topic:
+        found["topic"] = topic
+    return found
+
+
+def _unique(items) -> List[str]:
+    return list(dict.fromkeys(items))
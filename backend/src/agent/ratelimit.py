@@ -0,0 +1,425 @@
+"""
+Token-bucket rate limiting for the LLM providers.
+
+Each model has two buckets, requests per minute and tokens per minute, sized
+from the provider's limits (MODEL_LIMITS, overridable through
+LLM_RATE_LIMITS). Every client handed out by the LLM registry carries a
+callback that estimates each call's tokens from its prompt, and a
+`ProviderRateLimiter` that LangChain consults only once the response cache
+has missed, right before the request is sent: it reserves one request and
+the estimated tokens and sleeps until the buckets cover the reservation.
+Cached answers reserve nothing. When the response reports the tokens it
+used, the callback gives back the difference.
+Reservations may run the buckets negative, so concurrent callers queue in
+the order they arrived instead of all retrying against the provider's 429.
+
+`admission()` guards a whole workflow run: when the wait for another call
+to any configured model already exceeds LLM_RATE_LIMIT_BUDGET seconds, it
+raises `RateLimited` before any work starts (the views answer 429 with
+Retry-After). Inside the run, a call that would have to wait past the end
+of that budget raises `RateLimited` instead of queueing.
+
+Buckets live in the process by default. With LLM_RATE_LIMIT_DB set they are
+rows in that SQLite file and shared by every process using it.
+
+Settings (environment):
+    LLM_RATE_LIMIT          "0" disables limiting (default on)
+    LLM_RATE_LIMITS         JSON of model -> {"rpm", "tpm"} overriding MODEL_LIMITS
+    LLM_RATE_LIMIT_BUDGET   seconds a request may spend queued for the provider (default 20)
+    LLM_RATE_LIMIT_DB       SQLite file for buckets shared across processes (default: in-process)
+"""
+
+import abc
+import asyncio
+import contextvars
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackHandler, BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+
+# Published per-model limits of the providers' default tier
+MODEL_LIMITS: Dict[str, Dict[str, int]] = {
+    "openai/gpt-oss-120b":  {"rpm": 30, "tpm": 8000},
+    "llama-3.1-8b-instant": {"rpm": 30, "tpm": 6000},
+    "llama-3.3-70b-versatile": {"rpm": 30, "tpm": 12000},
+}
+
+DEFAULT_BUDGET = 20
+# Tokens expected in a reply, on top of the prompt
+EXPECTED_OUTPUT_TOKENS = 400
+# Prompt + reply of a typical call, for admission before the prompt is known
+TYPICAL_CALL_TOKENS = 1500
+CHARS_PER_TOKEN = 4
+
+
+class RateLimited(Exception):
+    """
+    The provider's limits would hold this request up longer than its budget.
+    """
+
+    def __init__(self, model: str, wait: float):
+        super().__init__(f"Rate limit for {model} reached, retry in {math.ceil(wait)}s")
+        self.model = model
+        self.retry_after = max(1, math.ceil(wait))
+
+
+class Limits(NamedTuple):
+    rpm: float
+    tpm: float
+
+
+def enabled() -> bool:
+    return os.getenv("LLM_RATE_LIMIT", "1").strip().lower() not in ("0", "false", "no", "")
+
+
+def budget() -> float:
+    return float(os.getenv("LLM_RATE_LIMIT_BUDGET", DEFAULT_BUDGET))
+
+
+def limits_for(model: str) -> Optional[Limits]:
+    """
+    The model's limits, or None when it is not limited.
+    """
+    limits = dict(MODEL_LIMITS.get(model, {}))
+    overrides = os.getenv("LLM_RATE_LIMITS")
+    if overrides:
+        limits.update(json.loads(overrides).get(model, {}))
+    if not limits.get("rpm") or not limits.get("tpm"):
+        return None
+    return Limits(float(limits["rpm"]), float(limits["tpm"]))
+
+
+# Bucket levels: (requests, tokens, updated at); None for a full bucket
+Level = Optional[Tuple[float, float, float]]
+
+
+def _refill(level: Level, limits: Limits, now: float) -> Tuple[float, float]:
+    if level is None:
+        return limits.rpm, limits.tpm
+    requests, tokens, updated = level
+    elapsed = max(0.0, now - updated)
+    return (min(limits.rpm, requests + elapsed * limits.rpm / 60),
+            min(limits.tpm, tokens + elapsed * limits.tpm / 60))
+
+
+def _wait(requests: float, tokens: float, limits: Limits, cost: float) -> float:
+    # A call larger than the whole token bucket waits for a full one
+    cost = min(cost, limits.tpm)
+    return max(0.0, (1 - requests) * 60 / limits.rpm, (cost - tokens) * 60 / limits.tpm)
+
+
+class Buckets(abc.ABC):
+    """
+    Bucket levels keyed by model; `_update` applies a function to one
+    model's level atomically.
+    """
+
+    @abc.abstractmethod
+    def _update(self, model: str, fn: Callable[[Level], Tuple[Any, Level]]) -> Any:
+        ...
+
+    def reserve(self, model: str, limits: Limits, cost: float, max_wait: float) -> float:
+        """
+        Take one request and `cost` tokens; returns how long to wait before
+        sending. Raises RateLimited (reserving nothing) past `max_wait`.
+        """
+        def take(level):
+            now = time.time()
+            requests, tokens = _refill(level, limits, now)
+            wait = _wait(requests, tokens, limits, cost)
+            if wait > 0 and wait > max_wait:
+                return wait, level
+            return wait, (requests - 1, tokens - min(cost, limits.tpm), now)
+
+        wait = self._update(model, take)
+        if wait > 0 and wait > max_wait:
+            raise RateLimited(model, wait)
+        return wait
+
+    def refund(self, model: str, limits: Limits, tokens: float) -> None:
+        """
+        Return `tokens` reserved but not used (negative to charge more).
+        """
+        def give(level):
+            now = time.time()
+            requests, level_tokens = _refill(level, limits, now)
+            return None, (requests, min(limits.tpm, level_tokens + tokens), now)
+
+        self._update(model, give)
+
+    def estimate(self, model: str, limits: Limits, cost: float) -> float:
+        """
+        How long a call of `cost` tokens would wait now, reserving nothing.
+        """
+        def peek(level):
+            return _wait(*_refill(level, limits, time.time()), limits, cost), level
+
+        return self._update(model, peek)
+
+
+class MemoryBuckets(Buckets):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._levels: Dict[str, Level] = {}
+
+    def _update(self, model, fn):
+        with self._lock:
+            result, self._levels[model] = fn(self._levels.get(model))
+        return result
+
+
+class SqliteBuckets(Buckets):
+    """
+    Levels in a SQLite table, updated under BEGIN IMMEDIATE so concurrent
+    processes see each other's reservations.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_rate_buckets ("
+            "model TEXT PRIMARY KEY, requests REAL NOT NULL, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _update(self, model, fn):
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT requests, tokens, updated FROM llm_rate_buckets WHERE model = ?", (model,)
+                ).fetchone()
+                result, level = fn(tuple(row) if row else None)
+                if level is not None and level != row:
+                    self.conn.execute(
+                        "INSERT INTO llm_rate_buckets (model, requests, tokens, updated) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(model) DO UPDATE SET requests = excluded.requests, "
+                        "tokens = excluded.tokens, updated = excluded.updated",
+                        (model, *level),
+                    )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+_lock = threading.Lock()
+_buckets: Optional[Buckets] = None
+# Wall-clock time by which the current workflow run must be done queueing
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("llm_rate_deadline", default=None)
+# Calls started in this context and not sent yet: (handler, run id, estimated tokens)
+_pending: contextvars.ContextVar[Tuple[Tuple[Any, Any, int], ...]] = contextvars.ContextVar(
+    "llm_rate_pending", default=())
+
+
+def get_buckets() -> Buckets:
+    global _buckets
+    if _buckets is None:
+        with _lock:
+            if _buckets is None:
+                path = os.getenv("LLM_RATE_LIMIT_DB")
+                _buckets = SqliteBuckets(path) if path else MemoryBuckets()
+    return _buckets
+
+
+def reset() -> None:
+    """
+    Forget every bucket (tests, or after changing the settings).
+    """
+    global _buckets
+    with _lock:
+        if isinstance(_buckets, SqliteBuckets):
+            _buckets.close()
+        _buckets = None
+
+
+def _max_wait() -> float:
+    deadline = _deadline.get()
+    return budget() if deadline is None else deadline - time.time()
+
+
+def estimate_tokens(messages) -> int:
+    """
+    Rough token count of a prompt (about four characters a token) plus the
+    expected reply.
+    """
+    chars = sum(len(str(getattr(m, "content", m))) for batch in messages for m in batch)
+    return chars // CHARS_PER_TOKEN + EXPECTED_OUTPUT_TOKENS
+
+
+def used_tokens(response) -> Optional[int]:
+    """
+    Tokens the provider reports for an LLMResult, if it reports them.
+    """
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage.get("total_tokens"):
+        return usage["total_tokens"]
+    total = 0
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                total += metadata.get("total_tokens", 0)
+    return total or None
+
+
+def check(models) -> None:
+    """
+    Raise RateLimited when a typical call to any of `models` would wait
+    longer than the request budget.
+    """
+    if not enabled():
+        return
+    for model in set(models):
+        limits = limits_for(model)
+        if limits is not None:
+            wait = get_buckets().estimate(model, limits, TYPICAL_CALL_TOKENS)
+            if wait > budget():
+                print(f"[RATE LIMIT] Rejecting request, {model} is {wait:.1f}s behind")
+                raise RateLimited(model, wait)
+
+
+def configured_models():
+    from src.agent.llm import DEFAULT_MODELS, model_spec
+
+    return [model_spec(role)["model"] for role in DEFAULT_MODELS]
+
+
+@contextmanager
+def admission():
+    """
+    Admit a workflow run (see `check`) and give its LLM calls the request
+    budget to queue in.
+    """
+    check(configured_models())
+    token = _deadline.set(time.time() + budget())
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class _Reservations:
+    """
+    Shared bookkeeping of the sync and async callbacks: run id -> reserved tokens.
+    """
+
+    raise_error = True
+
+    def __init__(self, model: str):
+        self.model = model
+        self.limits = limits_for(model)
+        self._reserved: Dict[Any, int] = {}
+
+    def _note(self, messages, run_id) -> None:
+        # Reserved by ProviderRateLimiter, only if the call reaches the provider
+        if self.limits is not None and enabled():
+            _pending.set(_pending.get() + ((self, run_id, estimate_tokens(messages)),))
+
+    def _take_pending(self) -> Optional[Tuple[Any, int]]:
+        pending = _pending.get()
+        for n, (handler, run_id, cost) in enumerate(pending):
+            if handler is self:
+                _pending.set(pending[:n] + pending[n + 1:])
+                return run_id, cost
+        return None
+
+    def _forget(self, run_id) -> None:
+        pending = _pending.get()
+        if any(entry[1] == run_id for entry in pending):
+            _pending.set(tuple(entry for entry in pending if entry[1] != run_id))
+
+    def _reserve(self, run_id, cost: int) -> float:
+        wait = get_buckets().reserve(self.model, self.limits, cost, _max_wait())
+        self._reserved[run_id] = cost
+        if wait > 0:
+            print(f"[RATE LIMIT] {self.model} call queued for {wait:.2f}s")
+        return wait
+
+    def _settle(self, run_id, used: Optional[int]) -> None:
+        cost = self._reserved.pop(run_id, None)
+        if cost is not None and used is not None:
+            get_buckets().refund(self.model, self.limits, cost - used)
+
+
+class RateLimitHandler(_Reservations, BaseCallbackHandler):
+    """
+    Estimates each call's tokens and settles its reservation (sync clients).
+    """
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._note(messages, run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._forget(run_id)
+        self._settle(run_id, used_tokens(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._forget(run_id)
+        self._settle(run_id, 0)
+
+
+class AsyncRateLimitHandler(_Reservations, AsyncCallbackHandler):
+    """
+    Async variant of `RateLimitHandler`. Bucket updates run in a worker
+    thread: with LLM_RATE_LIMIT_DB they wait on SQLite's write lock.
+    """
+
+    # Awaited in the caller's task, so `_note` is seen by the rate limiter
+    run_inline = True
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._note(messages, run_id)
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        self._forget(run_id)
+        await asyncio.to_thread(self._settle, run_id, used_tokens(response))
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self._forget(run_id)
+        await asyncio.to_thread(self._settle, run_id, 0)
+
+
+def client_options(model: str, use_async: bool = False) -> Dict[str, Any]:
+    """
+    Chat model keyword arguments that put its provider calls on `model`'s buckets.
+    """
+    handler = (AsyncRateLimitHandler if use_async else RateLimitHandler)(model)
+    return {"callbacks": [handler], "rate_limiter": ProviderRateLimiter(handler)}
+
+
+class ProviderRateLimiter(BaseRateLimiter):
+    """
+    The chat model's `rate_limiter`: LangChain calls it after a cache miss,
+    before sending the request. Reserves the call noted by `handler` and
+    waits for the buckets; raises RateLimited past the run's budget.
+    """
+
+    def __init__(self, handler: _Reservations):
+        self.handler = handler
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        pending = self.handler._take_pending()
+        if pending is not None:
+            time.sleep(self.handler._reserve(*pending))
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        pending = self.handler._take_pending()
+        if pending is not None:
+            await asyncio.sleep(await asyncio.to_thread(self.handler._reserve, *pending))
+        return True
@@ -0,0 +1,147 @@
+"""
+Process-wide registry of compiled workflows and their checkpointer.
+
+Compiling the StateGraph and opening the SQLite checkpoint database are done
+once per process; every request then reuses the same compiled app.
+
+The async workflow uses an aiosqlite connection, which is bound to the event
+loop that opened it, so async apps are kept per running loop (one for the
+whole process under an ASGI server).
+"""
+
+import asyncio
+import atexit
+import os
+import threading
+import weakref
+from typing import Dict, List
+
+import aiosqlite
+
+from src.agent.checkpointer import (
+    DedupAsyncSqliteSaver, ShardedSaver, open_checkpointer, pragmas, shard_count, shard_paths,
+)
+from src.agent.serde import get_serde
+
+DEFAULT_CHECKPOINT_DB = "checkpoints.db"
+
+_lock = threading.RLock()
+_checkpointer = None
+_apps: Dict[str, object] = {}
+_async_apps: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+
+def checkpoint_db_path() -> str:
+    """
+    Path of the SQLite checkpoint database (override with CHECKPOINT_DB).
+    """
+    return os.getenv("CHECKPOINT_DB", DEFAULT_CHECKPOINT_DB)
+
+
+def checkpoint_db_paths() -> List[str]:
+    """
+    Every checkpoint database file: the shard files when CHECKPOINT_SHARDS > 1.
+    """
+    return shard_paths(checkpoint_db_path(), shard_count())
+
+
+def get_checkpointer():
+    """
+    Return the shared checkpointer (one writer and pooled readers per shard
+    file), opening its connections on first use.
+    """
+    global _checkpointer
+    if _checkpointer is None:
+        with _lock:
+            if _checkpointer is None:
+                _checkpointer = open_checkpointer(checkpoint_db_path())
+    return _checkpointer
+
+
+def get_app(name: str = "default"):
+    """
+    Return the compiled workflow registered under `name`, compiling it once.
+    """
+    app = _apps.get(name)
+    if app is None:
+        with _lock:
+            app = _apps.get(name)
+            if app is None:
+                from src.agent.graph import create_workflow
+
+                app = create_workflow(get_checkpointer())
+                _apps[name] = app
+    return app
+
+
+async def aget_app():
+    """
+    Return the async-node workflow compiled against a DedupAsyncSqliteSaver for
+    the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    entry = _async_apps.get(loop)
+    if entry is None:
+        from src.agent.graph import create_workflow
+
+        conns, savers = [], []
+        for path in checkpoint_db_paths():
+            conn = aiosqlite.connect(path, check_same_thread=False)
+            # aiosqlite runs on a worker thread; don't let it keep the process alive.
+            conn.daemon = True
+            await conn
+            await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            for pragma in pragmas():
+                await conn.execute(pragma)
+            saver = DedupAsyncSqliteSaver(conn, serde=get_serde())
+            await saver.setup()
+            conns.append(conn)
+            savers.append(saver)
+        checkpointer = savers[0] if len(savers) == 1 else ShardedSaver(savers)
+        entry = _async_apps.setdefault(
+            loop, (conns, create_workflow(checkpointer, use_async=True))
+        )
+        if entry[0] is not conns:
+            for conn in conns:
+                await conn.close()
+    return entry[1]
+
+
+async def ashutdown() -> None:
+    """
+    Close the async checkpointer connections bound to the running event loop.
+    """
+    entry = _async_apps.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        for conn in entry[0]:
+            await conn.close()
+
+
+def warm() -> None:
+    """
+    Compile the workflow, open the checkpointer and load the intent
+    classifier ahead of the first request.
+    """
+    get_app()
+    print("[REGISTRY] Workflow compiled, checkpointer ready -", ", ".join(checkpoint_db_paths()))
+
+    from src.agent.intent_classifier import get_model
+
+    get_model()
+
+
+def shutdown() -> None:
+    """
+    Drop compiled apps and close the checkpointer connections.
+    """
+    global _checkpointer
+    with _lock:
+        _apps.clear()
+        if _checkpointer is not None:
+            try:
+                _checkpointer.close()
+            finally:
+                _checkpointer = None
+
+
+atexit.register(shutdown)
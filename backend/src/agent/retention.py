@@ -0,0 +1,261 @@
+"""
+Retention and compaction for the SQLite checkpoint database.
+
+SqliteSaver writes a full checkpoint per super-step and never deletes one.
+`compact()` bounds the database:
+
+  * keeps only the newest `keep_last` checkpoints of every thread (and their
+    pending writes); get_state only ever reads the newest one,
+  * drops threads idle for longer than `ttl_days`, and threads left waiting
+    on an interrupt for longer than `interrupt_ttl_days`, with their stored
+    messages,
+  * hands freed pages back to the OS with incremental VACUUM and truncates
+    the WAL.
+
+Checkpoint ids are time-ordered UUIDv6 values, so a thread's last activity is
+read from its newest checkpoint id without deserializing anything.
+
+Defaults come from the environment:
+    CHECKPOINT_KEEP_LAST           checkpoints kept per thread (default 20)
+    CHECKPOINT_TTL_DAYS            idle thread lifetime (default 30)
+    CHECKPOINT_INTERRUPT_TTL_DAYS  lifetime of a thread stuck on an interrupt (default 7)
+"""
+
+import os
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from src.agent import message_store
+
+# 100-ns intervals between the Gregorian epoch (UUID time) and the Unix epoch
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+# Pages released per incremental_vacuum step, so a writer is never blocked long
+VACUUM_STEP_PAGES = 2000
+
+
+def keep_last_default() -> int:
+    return int(os.getenv("CHECKPOINT_KEEP_LAST", 20))
+
+
+def ttl_days_default() -> float:
+    return float(os.getenv("CHECKPOINT_TTL_DAYS", 30))
+
+
+def interrupt_ttl_days_default() -> float:
+    return float(os.getenv("CHECKPOINT_INTERRUPT_TTL_DAYS", 7))
+
+
+def checkpoint_time(checkpoint_id: str) -> float:
+    """
+    Unix time at which a (UUIDv6) checkpoint id was generated.
+    """
+    value = uuid.UUID(checkpoint_id).int
+    ticks = ((value >> 96) << 28) | (((value >> 80) & 0xFFFF) << 12) | ((value >> 64) & 0x0FFF)
+    return (ticks - _UUID_EPOCH_OFFSET) / 1e7
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Autocommit connection to the checkpoint database, creating the
+    checkpointer's tables if the database is new.
+    """
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    SqliteSaver(conn).setup()
+    conn.execute(message_store.SCHEMA)
+    return conn
+
+
+def prune_checkpoints(conn: sqlite3.Connection, keep_last: int) -> int:
+    """
+    Delete all but the newest `keep_last` checkpoints of every thread and
+    namespace, plus the writes that belonged to them. Returns checkpoints deleted.
+    """
+    keep_last = max(1, keep_last)
+    cur = conn.execute(
+        "DELETE FROM checkpoints WHERE rowid IN ("
+        " SELECT rowid FROM ("
+        "  SELECT rowid, ROW_NUMBER() OVER ("
+        "   PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS rn"
+        "  FROM checkpoints)"
+        " WHERE rn > ?)",
+        (keep_last,),
+    )
+    deleted = cur.rowcount
+    if deleted:
+        _delete_orphan_writes(conn)
+    return deleted
+
+
+def _delete_orphan_writes(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "DELETE FROM writes WHERE NOT EXISTS ("
+        " SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id"
+        " AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id)"
+    )
+
+
+def latest_checkpoints(conn: sqlite3.Connection) -> List[Tuple[str, str, bool]]:
+    """
+    (thread_id, newest checkpoint id, interrupt pending) for every thread.
+    """
+    rows = conn.execute(
+        "SELECT c.thread_id, c.checkpoint_id, EXISTS ("
+        "  SELECT 1 FROM writes w WHERE w.thread_id = c.thread_id AND w.checkpoint_ns = ''"
+        "  AND w.checkpoint_id = c.checkpoint_id AND w.channel = '__interrupt__')"
+        " FROM (SELECT thread_id, MAX(checkpoint_id) AS checkpoint_id FROM checkpoints"
+        "       WHERE checkpoint_ns = '' GROUP BY thread_id) AS c"
+    ).fetchall()
+    return [(thread_id, checkpoint_id, bool(interrupted)) for thread_id, checkpoint_id, interrupted in rows]
+
+
+def expired_threads(conn: sqlite3.Connection, ttl_days: float, interrupt_ttl_days: float,
+                    now: Optional[float] = None) -> List[str]:
+    """
+    Threads whose newest checkpoint is older than `ttl_days`, or older than
+    `interrupt_ttl_days` while an interrupt is still pending on it.
+    """
+    now = time.time() if now is None else now
+    expired = []
+    for thread_id, checkpoint_id, interrupted in latest_checkpoints(conn):
+        idle_days = (now - checkpoint_time(checkpoint_id)) / 86400
+        if idle_days > ttl_days or (interrupted and idle_days > interrupt_ttl_days):
+            expired.append(thread_id)
+    return expired
+
+
+def delete_threads(conn: sqlite3.Connection, thread_ids: List[str]) -> None:
+    for thread_id in thread_ids:
+        conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+        conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+        conn.execute(message_store.DELETE_THREAD, (thread_id,))
+
+
+def enable_incremental_vacuum(conn: sqlite3.Connection) -> bool:
+    """
+    Switch the database to auto_vacuum=INCREMENTAL. An existing database
+    needs one full VACUUM for that to take effect; returns True if it ran.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+def incremental_vacuum(conn: sqlite3.Connection) -> int:
+    """
+    Release free pages back to the file system in small steps. Returns the
+    number of pages released.
+    """
+    released = 0
+    while True:
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not free:
+            break
+        conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+        after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if after >= free:
+            break  # not in incremental mode
+        released += free - after
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    return released
+
+
+def compact(path: str, keep_last: Optional[int] = None, ttl_days: Optional[float] = None,
+            interrupt_ttl_days: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Apply the retention policy to the checkpoint database at `path` and
+    reclaim the space. Returns what was done, including the expired thread ids.
+    """
+    keep_last = keep_last_default() if keep_last is None else keep_last
+    ttl_days = ttl_days_default() if ttl_days is None else ttl_days
+    interrupt_ttl_days = interrupt_ttl_days_default() if interrupt_ttl_days is None else interrupt_ttl_days
+
+    conn = connect(path)
+    try:
+        size_before = file_bytes(path)
+        conn.execute("BEGIN IMMEDIATE")
+        expired = expired_threads(conn, ttl_days, interrupt_ttl_days)
+        delete_threads(conn, expired)
+        pruned = prune_checkpoints(conn, keep_last)
+        conn.execute("COMMIT")
+
+        vacuumed = enable_incremental_vacuum(conn)
+        released = incremental_vacuum(conn)
+    finally:
+        conn.close()
+
+    report = {
+        "expired_threads": expired,
+        "pruned_checkpoints": pruned,
+        "full_vacuum": vacuumed,
+        "released_pages": released,
+        "bytes_before": size_before,
+        "bytes_after": file_bytes(path),
+    }
+    print(f"[RETENTION] expired {len(expired)} threads, pruned {pruned} checkpoints, "
+          f"{size_before} -> {report['bytes_after']} bytes")
+    return report
+
+
+def file_bytes(path: str) -> int:
+    """
+    Size of the database including its WAL and shared-memory files.
+    """
+    return sum(os.path.getsize(p) for p in (path, path + "-wal", path + "-shm") if os.path.exists(p))
+
+
+def stats(path: str, top: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Storage used by the checkpoint database: totals and per-thread bytes of
+    checkpoint and write payloads, largest threads first.
+    """
+    conn = connect(path)
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        rows = conn.execute(
+            "SELECT thread_id, SUM(checkpoints), SUM(checkpoint_bytes), SUM(writes), SUM(write_bytes) FROM ("
+            " SELECT thread_id, COUNT(*) AS checkpoints,"
+            "  SUM(LENGTH(checkpoint) + LENGTH(metadata)) AS checkpoint_bytes, 0 AS writes, 0 AS write_bytes"
+            "  FROM checkpoints GROUP BY thread_id"
+            " UNION ALL"
+            " SELECT thread_id, 0, 0, COUNT(*), SUM(LENGTH(value)) FROM writes GROUP BY thread_id)"
+            " GROUP BY thread_id ORDER BY SUM(checkpoint_bytes) + SUM(write_bytes) DESC"
+            + (" LIMIT ?" if top else ""),
+            (top,) if top else (),
+        ).fetchall()
+        totals = conn.execute(
+            "SELECT (SELECT COUNT(*) FROM checkpoints),"
+            " (SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints),"
+            " (SELECT COUNT(*) FROM writes), (SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes),"
+            " (SELECT COUNT(DISTINCT thread_id) FROM checkpoints),"
+            " (SELECT COUNT(*) FROM message_blobs), (SELECT COALESCE(SUM(LENGTH(blob)), 0) FROM message_blobs)"
+        ).fetchone()
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    finally:
+        conn.close()
+
+    return {
+        "threads": [
+            {"thread_id": t, "checkpoints": c, "checkpoint_bytes": cb, "writes": w, "write_bytes": wb,
+             "bytes": cb + wb}
+            for t, c, cb, w, wb in rows
+        ],
+        "thread_count": totals[4],
+        "checkpoints": totals[0],
+        "checkpoint_bytes": totals[1],
+        "writes": totals[2],
+        "write_bytes": totals[3],
+        "messages": totals[5],
+        "message_bytes": totals[6],
+        "file_bytes": file_bytes(path),
+        "free_bytes": free * page_size,
+        "allocated_bytes": pages * page_size,
+        "incremental_vacuum": auto_vacuum == 2,
+    }
@@ -0,0 +1,164 @@
+"""
+Compressed serializer for checkpoints.
+
+LangGraph's JsonPlusSerializer packs state with ormsgpack; `ZstdSerializer`
+wraps it and compresses the packed bytes with zstandard, optionally with a
+dictionary trained on this deployment's checkpoints (the system prompts,
+previews and message text repeat across every conversation). Compressed
+payloads are tagged "<type>+zstd", so rows written before compression, or
+with compression turned off, stay readable.
+
+Dictionaries live as `<dict_id>.zdict` files in one directory. The active one
+is set with CHECKPOINT_ZSTD_DICT; every dictionary in its directory is loaded
+for reading, so rows compressed with an older dictionary still decode.
+
+Settings (environment):
+    CHECKPOINT_SERDE       "zstd" (default) or "msgpack" (uncompressed)
+    CHECKPOINT_ZSTD_LEVEL  compression level (default 3)
+    CHECKPOINT_ZSTD_DICT   path of the dictionary used for new rows (optional)
+"""
+
+import glob
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import zstandard
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+SUFFIX = "+zstd"
+DEFAULT_LEVEL = 3
+# Smaller payloads (nulls, short channel writes) gain nothing from compression
+MIN_COMPRESS_BYTES = 128
+DICT_EXT = ".zdict"
+
+
+def load_dictionaries(path: Optional[str]) -> Tuple[Optional[zstandard.ZstdCompressionDict],
+                                                      Dict[int, zstandard.ZstdCompressionDict]]:
+    """
+    The dictionary at `path` and every dictionary next to it, by dict id.
+    """
+    if not path:
+        return None, {}
+    known = {}
+    for file in glob.glob(os.path.join(os.path.dirname(path) or ".", "*" + DICT_EXT)):
+        with open(file, "rb") as f:
+            d = zstandard.ZstdCompressionDict(f.read())
+        known[d.dict_id()] = d
+    with open(path, "rb") as f:
+        active = zstandard.ZstdCompressionDict(f.read())
+    known[active.dict_id()] = active
+    return active, known
+
+
+class ZstdSerializer(SerializerProtocol):
+    """
+    JsonPlusSerializer output compressed with zstandard. With
+    `compress=False` it writes plain msgpack but still reads compressed rows.
+    """
+
+    def __init__(self, level: int = DEFAULT_LEVEL, compress: bool = True,
+                 dictionary: Optional[zstandard.ZstdCompressionDict] = None,
+                 known_dictionaries: Optional[Dict[int, zstandard.ZstdCompressionDict]] = None,
+                 inner: Optional[SerializerProtocol] = None):
+        self.inner = inner or JsonPlusSerializer()
+        self.level = level
+        self.compress = compress
+        self.dictionary = dictionary
+        self.known_dictionaries = dict(known_dictionaries or {})
+        if dictionary is not None:
+            self.known_dictionaries[dictionary.dict_id()] = dictionary
+        # zstandard (de)compressors must not be shared between threads
+        self._local = threading.local()
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = zstandard.ZstdCompressor(level=self.level, dict_data=self.dictionary)
+            self._local.compressor = compressor
+        return compressor
+
+    def _decompressor(self, dict_id: int) -> zstandard.ZstdDecompressor:
+        cache = getattr(self._local, "decompressors", None)
+        if cache is None:
+            cache = self._local.decompressors = {}
+        decompressor = cache.get(dict_id)
+        if decompressor is None:
+            if dict_id and dict_id not in self.known_dictionaries:
+                raise ValueError(f"Checkpoint was compressed with unknown zstd dictionary {dict_id}")
+            decompressor = zstandard.ZstdDecompressor(dict_data=self.known_dictionaries.get(dict_id))
+            cache[dict_id] = decompressor
+        return decompressor
+
+    def pack(self, type_: str, data: bytes) -> Tuple[str, bytes]:
+        """
+        Compress an already serialized (type, bytes) pair.
+        """
+        if not self.compress or type_.endswith(SUFFIX) or len(data) < MIN_COMPRESS_BYTES:
+            return type_, data
+        return type_ + SUFFIX, self._compressor().compress(data)
+
+    def unpack(self, type_: str, data: bytes) -> Tuple[str, bytes]:
+        """
+        Undo `pack`; uncompressed pairs are returned unchanged.
+        """
+        if not type_.endswith(SUFFIX):
+            return type_, data
+        dict_id = zstandard.get_frame_parameters(data).dict_id
+        return type_[:-len(SUFFIX)], self._decompressor(dict_id).decompress(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        return self.pack(*self.inner.dumps_typed(obj))
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        return self.inner.loads_typed(self.unpack(*data))
+
+    # SerializerProtocol's untyped pair, used by nothing in the savers here
+    def dumps(self, obj: Any) -> bytes:
+        return self.inner.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(data)
+
+
+_serde: Optional[SerializerProtocol] = None
+_lock = threading.Lock()
+
+
+def get_serde() -> SerializerProtocol:
+    """
+    The checkpoint serializer configured by CHECKPOINT_SERDE. Even the
+    uncompressed setting reads compressed rows, so it can be switched back.
+    """
+    global _serde
+    if _serde is None:
+        with _lock:
+            if _serde is None:
+                dictionary, known = load_dictionaries(os.getenv("CHECKPOINT_ZSTD_DICT"))
+                _serde = ZstdSerializer(
+                    level=int(os.getenv("CHECKPOINT_ZSTD_LEVEL", DEFAULT_LEVEL)),
+                    compress=os.getenv("CHECKPOINT_SERDE", "zstd") != "msgpack",
+                    dictionary=dictionary,
+                    known_dictionaries=known,
+                )
+    return _serde
+
+
+def reset() -> None:
+    global _serde
+    with _lock:
+        _serde = None
+
+
+def train_dictionary(samples: Iterable[bytes], size: int, directory: str) -> str:
+    """
+    Train a zstd dictionary on serialized checkpoint payloads and save it as
+    `<directory>/<dict_id>.zdict`. Returns the file path.
+    """
+    dictionary = zstandard.train_dictionary(size, list(samples))
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{dictionary.dict_id()}{DICT_EXT}")
+    with open(path, "wb") as f:
+        f.write(dictionary.as_bytes())
+    return path
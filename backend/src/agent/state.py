@@ -1,3 +1,5 @@
+import functools
+import inspect
 from typing import Dict, Any, Optional, TypedDict, Literal, List
 from typing_extensions import Annotated
 from langchain_core.messages import AnyMessage
@@ -15,7 +17,8 @@ class AgentState(TypedDict, total=False):
 
     # Core
     user_prompt: str
-    intent: Optional[Literal["email", "linkedin", "chat", "booking"]]
+    intent: Optional[Literal["email", "linkedin", "chat", "calendar"]]
+    slots_prefilled: bool     # intent node already extracted this turn's channel fields
 
     # ----- Email (minimal) -----
     to: Optional[str]
@@ -41,10 +44,6 @@ class AgentState(TypedDict, total=False):
     calendar_description: Optional[str]   # Event description
     calendar_start: Optional[str]         # ISO 8601 start datetime
     calendar_end: Optional[str]           # ISO 8601 end datetime
-    calendar_timezone: Optional[str]      # e.g., "Asia/Kolkata"
-    calendar_location: Optional[str]      # optional event location
-    calendar_attendees: Optional[List[str]] # optional list of emails
-
 
     # ----- UI / Human-in-the-loop -----
     preview: Optional[str]
@@ -57,15 +56,9 @@ class AgentState(TypedDict, total=False):
     result: Optional[Dict[str, Any]]
     error: Optional[str]
 
-    # ----- Booking (movies/events) -----
-    movie_title: Optional[str]
-    city: Optional[str]
-    date: Optional[str]
-    num_seats: Optional[int]
-    seat_category: Optional[str]  # e.g., premium, regular
-    showtime_id: Optional[str]
-    hold_id: Optional[str]
-    order_id: Optional[str]
+
+# Channels of the graph state (anything else a node returns is dropped)
+STATE_KEYS = frozenset(AgentState.__annotations__)
 
 
 def create_initial_state(user_prompt: str) -> AgentState:
@@ -75,9 +68,9 @@ def create_initial_state(user_prompt: str) -> AgentState:
         "awaiting": "decision",
         "needs_input": False,
         # LinkedIn defaults
-        "li_hashtags": [],
-        "li_mentions": [],
-        "li_urls": [],
+        "hashtags": [],
+        "mentions": [],
+        "urls": [],
         "tone": "professional",
         "length": "medium",
         "audience": None,
@@ -86,7 +79,33 @@ def create_initial_state(user_prompt: str) -> AgentState:
         "calendar_description": None,
         "calendar_start": None,
         "calendar_end": None,
-        "calendar_timezone": "Asia/Kolkata",
-        "calendar_location": None,
-        "calendar_attendees": [],
     }
+
+
+def changes(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The state keys whose value in `after` differs from `before`: what a node
+    returns as its update, so unchanged channels are not written again.
+    """
+    return {
+        key: value for key, value in after.items()
+        if key in STATE_KEYS and (key not in before or (before[key] is not value and before[key] != value))
+    }
+
+
+def delta_step(fn):
+    """
+    Wrap a stage that updates a copy of the state and returns it (sync or
+    async), so it returns `changes()` instead. Used for the compose nodes'
+    tasks, whose results are checkpointed.
+    """
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def astep(state: Dict[str, Any], *args):
+            return changes(state, await fn(dict(state), *args))
+        return astep
+
+    @functools.wraps(fn)
+    def step(state: Dict[str, Any], *args):
+        return changes(state, fn(dict(state), *args))
+    return step
@@ -0,0 +1,249 @@
+"""
+Per-thread leases, so only one run or resume touches a conversation at a time.
+
+Two resumes of the same thread_id (a double click, a client retry) would
+otherwise both resume the same checkpoint: every LLM call runs twice and the
+email can go out twice. `thread_lease()` / `athread_lease()` take a lease row
+in the `thread_leases` table of the thread's checkpoint file, which every web
+process and worker shares; unrelated threads take unrelated rows and never
+wait on each other.
+
+A lease expires THREAD_LEASE_TTL seconds after it was last renewed. One
+renewer thread per process renews every lease the process holds each third
+of that while the runs last, so a lease left by a crashed process frees itself. A caller that finds the thread leased either
+queues behind the holder for up to `wait` seconds or, with `wait=0`, gets
+`ThreadBusy` at once (the views answer 409).
+
+Settings (environment):
+    THREAD_LEASE_TTL           seconds a lease lives without renewal (default 120)
+    THREAD_LOCK_WAIT           seconds a new prompt queues behind a busy thread (default 10)
+    THREAD_RESUME_LOCK_WAIT    seconds a resume queues behind a busy thread (default 0)
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional, Tuple
+
+from src.agent.checkpointer import busy_timeout_ms, pragmas, shard_index
+
+DEFAULT_TTL = 120
+DEFAULT_WAIT = 10
+DEFAULT_RESUME_WAIT = 0
+# How often a waiter retries a busy thread
+POLL_INTERVAL = 0.05
+# Seconds a rejected caller is told to wait before retrying
+RETRY_AFTER = 1
+
+
+class ThreadBusy(Exception):
+    """
+    Another run holds the thread's lease.
+    """
+
+    def __init__(self, thread_id: str, retry_after: int = RETRY_AFTER):
+        super().__init__(f"Thread {thread_id} is busy with another request")
+        self.thread_id = thread_id
+        self.retry_after = retry_after
+
+
+def lease_ttl() -> float:
+    return float(os.getenv("THREAD_LEASE_TTL", DEFAULT_TTL))
+
+
+def lock_wait() -> float:
+    return float(os.getenv("THREAD_LOCK_WAIT", DEFAULT_WAIT))
+
+
+def resume_lock_wait() -> float:
+    return float(os.getenv("THREAD_RESUME_LOCK_WAIT", DEFAULT_RESUME_WAIT))
+
+
+class LeaseStore:
+    """
+    Lease rows in one checkpoint database file. Every statement runs in
+    autocommit mode, so a lease is visible to other processes at once.
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, timeout=busy_timeout_ms() / 1000, check_same_thread=False,
+                                    isolation_level=None)
+        for pragma in pragmas():
+            self.conn.execute(pragma)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS thread_leases ("
+            "thread_id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.lock = threading.Lock()
+
+    def try_acquire(self, thread_id: str, owner: str, ttl: float) -> bool:
+        """
+        Take the lease unless someone else holds an unexpired one.
+        """
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO thread_leases (thread_id, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE thread_leases.expires_at < ?",
+                (thread_id, owner, now + ttl, now),
+            )
+        return cursor.rowcount == 1
+
+    def renew(self, thread_id: str, owner: str, ttl: float) -> bool:
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE thread_leases SET expires_at = ? WHERE thread_id = ? AND owner = ?",
+                (time.time() + ttl, thread_id, owner),
+            )
+        return cursor.rowcount == 1
+
+    def release(self, thread_id: str, owner: str) -> None:
+        with self.lock:
+            self.conn.execute("DELETE FROM thread_leases WHERE thread_id = ? AND owner = ?", (thread_id, owner))
+
+    def holder(self, thread_id: str) -> Optional[str]:
+        """
+        Owner of the thread's unexpired lease, if any.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT owner FROM thread_leases WHERE thread_id = ? AND expires_at >= ?",
+                (thread_id, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+_lock = threading.Lock()
+_stores: Dict[str, LeaseStore] = {}
+# Notified whenever this process releases a lease, so local waiters retry at once
+_released = threading.Condition()
+# Leases this process holds: owner -> (store, thread_id, ttl, monotonic time of the next renewal)
+_held: Dict[str, Tuple[LeaseStore, str, float, float]] = {}
+# Guards _held; notified when a lease is added so the renewer recomputes its sleep
+_renewals = threading.Condition()
+_renewer: Optional[threading.Thread] = None
+
+
+def store_for(thread_id: str) -> LeaseStore:
+    """
+    Lease store in the checkpoint file (shard) that holds `thread_id`.
+    """
+    from src.agent.registry import checkpoint_db_paths
+
+    paths = checkpoint_db_paths()
+    path = paths[shard_index(thread_id, len(paths))]
+    store = _stores.get(path)
+    if store is None:
+        with _lock:
+            store = _stores.get(path)
+            if store is None:
+                store = _stores[path] = LeaseStore(path)
+    return store
+
+
+def reset() -> None:
+    """
+    Close every lease store (tests, or after CHECKPOINT_DB changes).
+    """
+    with _renewals:
+        _held.clear()
+    with _lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
+
+
+def _renew_held() -> None:
+    """
+    Body of the renewer thread: renew each held lease a third of its TTL
+    after the last renewal, sleeping until the next one is due.
+    """
+    while True:
+        with _renewals:
+            now = time.monotonic()
+            due = [(owner, lease) for owner, lease in _held.items() if lease[3] <= now]
+            if not due:
+                next_at = min((lease[3] for lease in _held.values()), default=None)
+                _renewals.wait(None if next_at is None else next_at - now)
+                continue
+            for owner, (store, thread_id, ttl, _) in due:
+                _held[owner] = (store, thread_id, ttl, now + ttl / 3)
+
+        for owner, (store, thread_id, ttl, _) in due:
+            try:
+                renewed = store.renew(thread_id, owner, ttl)
+            except sqlite3.Error as e:
+                print(f"[LEASE] Could not renew the lease on thread {thread_id} - {e}")
+                continue
+            if not renewed:
+                with _renewals:
+                    lost = _held.pop(owner, None) is not None
+                if lost:  # not just released while we renewed it
+                    print(f"[LEASE] Lost the lease on thread {thread_id}")
+
+
+def _hold(store: LeaseStore, thread_id: str, owner: str, ttl: float) -> None:
+    global _renewer
+    with _renewals:
+        _held[owner] = (store, thread_id, ttl, time.monotonic() + ttl / 3)
+        if _renewer is None:
+            _renewer = threading.Thread(target=_renew_held, name="lease-renewer", daemon=True)
+            _renewer.start()
+        _renewals.notify()
+
+
+def _release(store: LeaseStore, thread_id: str, owner: str) -> None:
+    with _renewals:
+        _held.pop(owner, None)
+    store.release(thread_id, owner)
+    with _released:
+        _released.notify_all()
+
+
+@contextmanager
+def thread_lease(thread_id: str, wait: Optional[float] = None):
+    """
+    Hold `thread_id`'s lease for the block. Waits up to `wait` seconds
+    (default THREAD_LOCK_WAIT) for a busy thread, then raises ThreadBusy.
+    """
+    store, owner, ttl = store_for(thread_id), f"{os.getpid()}:{uuid.uuid4().hex}", lease_ttl()
+    deadline = time.monotonic() + (lock_wait() if wait is None else wait)
+    while not store.try_acquire(thread_id, owner, ttl):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ThreadBusy(thread_id)
+        with _released:
+            _released.wait(min(POLL_INTERVAL, remaining))
+    _hold(store, thread_id, owner, ttl)
+    try:
+        yield
+    finally:
+        _release(store, thread_id, owner)
+
+
+@asynccontextmanager
+async def athread_lease(thread_id: str, wait: Optional[float] = None):
+    """
+    Async variant of `thread_lease`: waits without blocking the event loop.
+    """
+    store, owner, ttl = store_for(thread_id), f"{os.getpid()}:{uuid.uuid4().hex}", lease_ttl()
+    deadline = time.monotonic() + (lock_wait() if wait is None else wait)
+    while not await asyncio.to_thread(store.try_acquire, thread_id, owner, ttl):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ThreadBusy(thread_id)
+        await asyncio.sleep(min(POLL_INTERVAL, remaining))
+    _hold(store, thread_id, owner, ttl)
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(_release, store, thread_id, owner)
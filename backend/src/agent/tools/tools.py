@@ -1,29 +1,17 @@
 import os
+import asyncio
+import httpx
 import requests
-from email.mime.text import MIMEText
-import smtplib
 from dotenv import load_dotenv
 load_dotenv()
-try:
-    from langchain.tools import tool
-except Exception:
-    from langchain_core.tools import tool
-
-
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
+from langchain_core.tools import StructuredTool
+
+
 from email.mime.text import MIMEText
 import base64
-import os
-import json
 from ..utility_cred.creds import ensure_valid_and_persist
 
-@tool("send_mail")
-def send_email_tool(to: str, subject: str, body: str, user_id: int = None) -> dict:
+def _send_email(to: str, subject: str, body: str, user_id: int = None) -> dict:
     '''
         send mail using oauth credentials
     '''
@@ -36,6 +24,9 @@ def send_email_tool(to: str, subject: str, body: str, user_id: int = None) -> di
         return {"status": "error", "message": "no credentials found for user/service"}
 
     try:
+        # googleapiclient's discovery module is slow to import; load it on first send
+        from googleapiclient.discovery import build
+
         service = build("gmail", "v1", credentials=creds)
 
         msg = MIMEText(body)
@@ -55,8 +46,21 @@ def send_email_tool(to: str, subject: str, body: str, user_id: int = None) -> di
     except Exception as exc:
         return {"status":"error", "message": str(exc)}
 
-@tool("set_event")
-def set_event_tool(summary, description, start, end, user_id):
+
+async def _asend_email(to: str, subject: str, body: str, user_id: int = None) -> dict:
+    # The Gmail client and the credential lookup (Django ORM) are blocking;
+    # run them on a worker thread so the event loop stays free.
+    return await asyncio.to_thread(_send_email, to, subject, body, user_id)
+
+
+send_email_tool = StructuredTool.from_function(
+    func=_send_email,
+    coroutine=_asend_email,
+    name="send_mail",
+)
+
+
+def _set_event(summary, description, start, end, user_id):
     """
         Creates an event in calender using OAuth connectivity.
     """
@@ -66,6 +70,8 @@ def set_event_tool(summary, description, start, end, user_id):
     if not creds:
         return {"status": "error", "message": "no credentials found for user/service"}
     try:
+        from googleapiclient.discovery import build
+
         service = build('calendar', 'v3', credentials=creds)
         print("[CALENDER SERVICE BUILD")
 
@@ -83,22 +89,31 @@ def set_event_tool(summary, description, start, end, user_id):
     except Exception as exc:
             return {"status":"error", "message": str(exc)}
 
-@tool("post_linkedin_text")
-def post_linkedin_text(text: str) -> dict:
-    """
-    Publish a PUBLIC text-only LinkedIn post via UGC API.
 
-    Env required:
-      - LINKEDIN_ACCESS_TOKEN
-      - LINKEDIN_PERSON_URN (e.g., 'urn:li:person:XXXX')
+async def _aset_event(summary, description, start, end, user_id):
+    return await asyncio.to_thread(_set_event, summary, description, start, end, user_id)
+
+
+set_event_tool = StructuredTool.from_function(
+    func=_set_event,
+    coroutine=_aset_event,
+    name="set_event",
+)
+
+
+LINKEDIN_UGC_URL = "https://api.linkedin.com/v2/ugcPosts"
+
+
+def _linkedin_request(text: str):
+    """
+    Build headers and payload for a text-only UGC post, or an error result
+    when the LinkedIn env vars are missing.
     """
-    print("[POST_LINKEDIN_TEXT] Posting LinkedIn text", text)
     access_token = os.getenv("LINKEDIN_ACCESS_TOKEN")
     author_urn = os.getenv("LINKEDIN_PERSON_URN")
     if not access_token or not author_urn:
-        return {"status": "error", "message": "Missing LINKEDIN_ACCESS_TOKEN or LINKEDIN_PERSON_URN"}
+        return None, None, {"status": "error", "message": "Missing LINKEDIN_ACCESS_TOKEN or LINKEDIN_PERSON_URN"}
 
-    url = "https://api.linkedin.com/v2/ugcPosts"
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json",
@@ -115,12 +130,51 @@ def post_linkedin_text(text: str) -> dict:
         },
         "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"},
     }
+    return headers, payload, None
+
+
+def _linkedin_result(status_code: int, text: str) -> dict:
+    if status_code in (200, 201):
+        return {"status": "success", "message": "LinkedIn text post published"}
+    return {"status": "error", "message": f"{status_code}: {text}"}
+
+
+def _post_linkedin_text(text: str) -> dict:
+    """
+    Publish a PUBLIC text-only LinkedIn post via UGC API.
+
+    Env required:
+      - LINKEDIN_ACCESS_TOKEN
+      - LINKEDIN_PERSON_URN (e.g., 'urn:li:person:XXXX')
+    """
+    print("[POST_LINKEDIN_TEXT] Posting LinkedIn text", text)
+    headers, payload, err = _linkedin_request(text)
+    if err:
+        return err
 
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=30)
-        if resp.status_code in (200, 201):
-            return {"status": "success", "message": "LinkedIn text post published"}
-        return {"status": "error", "message": f"{resp.status_code}: {resp.text}"}
+        resp = requests.post(LINKEDIN_UGC_URL, headers=headers, json=payload, timeout=30)
+        return _linkedin_result(resp.status_code, resp.text)
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+
+async def _apost_linkedin_text(text: str) -> dict:
+    print("[POST_LINKEDIN_TEXT] Posting LinkedIn text", text)
+    headers, payload, err = _linkedin_request(text)
+    if err:
+        return err
+
+    try:
+        async with httpx.AsyncClient(timeout=30) as client:
+            resp = await client.post(LINKEDIN_UGC_URL, headers=headers, json=payload)
+        return _linkedin_result(resp.status_code, resp.text)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+post_linkedin_text = StructuredTool.from_function(
+    func=_post_linkedin_text,
+    coroutine=_apost_linkedin_text,
+    name="post_linkedin_text",
+)